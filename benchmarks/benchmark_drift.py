@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_drift
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Micro-benchmark of the drift tracking.
+
+Time the drift measurement of :py:class:`pysemimaginggui.drift.DriftTracker` from the half spectrum already computed
+by the live FFT, and the alignment of the spectrum, for the region sizes of the GUI and script defaults. The target is
+below 5 ms per 800x560 frame.
+
+Run from the project folder with ``python -m benchmarks.benchmark_drift``.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import timeit
+
+# Third party modules.
+import numpy as np
+import scipy.fft
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.drift import DriftTracker
+
+# Globals and constants variables.
+#: Region (width, height) of ``TkMainGui`` and ``sem_video`` (800x560) and of ``live_fft`` (790x550).
+REGION_SIZES = [(800, 560), (790, 550)]
+NUMBER_REPEATS = 20
+
+
+def time_ms(function):
+    return min(timeit.repeat(function, number=1, repeat=NUMBER_REPEATS)) * 1.0e3
+
+
+def run_benchmark():
+    random = np.random.RandomState(0)
+    for width, height in REGION_SIZES:
+        frame = random.randint(0, 256, size=(height, width)).astype(np.float32)
+        spectrum = scipy.fft.rfft2(frame).astype(np.complex64)
+
+        print("Region {}x{}".format(width, height))
+        tracker = DriftTracker((height, width))
+        tracker.update(spectrum)
+        update_ms = time_ms(lambda: tracker.update(spectrum))
+        print("  drift measurement:               {:8.3f} ms".format(update_ms))
+
+        align_ms = time_ms(lambda: tracker.align(spectrum))
+        print("  spectrum alignment:              {:8.3f} ms".format(align_ms))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    run_benchmark()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_locator
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Benchmark of the template locator used to find the PC-SEM window.
+
+The ``test_data/su8230`` screen grabs are searched for the pause and run toolbar templates in one pass with
+:py:class:`pysemimaginggui.locator.TemplateLocator` and, if ``pyscreeze`` (used by ``pyautogui.locateOnScreen``) is
+installed, once per template with ``pyscreeze.locate``. A synthetic 4K dual monitor screen is also searched to
+measure the time on the largest screens.
+
+Run from the project folder with ``python -m benchmarks.benchmark_locator``.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import glob
+import timeit
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui import get_current_module_path
+from pysemimaginggui.locator import TemplateLocator, load_gray_image
+
+# Globals and constants variables.
+#: (width, height) of two 4K monitors side by side.
+DUAL_4K_SIZE = (7680, 2160)
+NUMBER_REPEATS = 3
+PNG_SIGNATURE = b"\x89PNG"
+#: Toolbar templates above the micrograph, the other ``pcsem_*`` images are screen grabs of the pane layouts.
+TEMPLATE_FILE_NAMES = ["pcsem_pause.png", "pcsem_run.png"]
+
+
+def time_s(function):
+    return min(timeit.repeat(function, number=1, repeat=NUMBER_REPEATS))
+
+
+def is_png_file(file_path):
+    """Return ``False`` for the git LFS pointers of the images not yet fetched."""
+    with open(file_path, "rb") as image_file:
+        return image_file.read(len(PNG_SIGNATURE)) == PNG_SIGNATURE
+
+
+def get_test_data_files(pattern):
+    path = get_current_module_path(__file__, "../test_data/su8230")
+    file_paths = sorted(glob.glob(os.path.join(path, pattern)))
+    missing_file_paths = [file_path for file_path in file_paths if not is_png_file(file_path)]
+    for file_path in missing_file_paths:
+        print("Skip {}: not a PNG file, fetch it with git lfs pull".format(os.path.basename(file_path)))
+    return [file_path for file_path in file_paths if file_path not in missing_file_paths]
+
+
+def benchmark_fixtures():
+    template_paths = [file_path for file_name in TEMPLATE_FILE_NAMES for file_path in get_test_data_files(file_name)]
+    screen_paths = get_test_data_files("screengrab_*.png")
+    if not template_paths or not screen_paths:
+        return
+
+    templates = dict((os.path.basename(file_path), file_path) for file_path in template_paths)
+    locator = TemplateLocator(templates)
+    try:
+        import pyscreeze
+    except ImportError:  # pragma: no cover
+        pyscreeze = None
+
+    for screen_path in screen_paths:
+        screen = load_gray_image(screen_path)
+        print("Screen {} {}x{}".format(os.path.basename(screen_path), screen.shape[1], screen.shape[0]))
+        for match in locator.locate_all(screen):
+            print("  {:24s} ({:5d}, {:5d}) confidence {:.3f}".format(match.name, match.left, match.top,
+                                                                    match.confidence))
+        locator_s = time_s(lambda: locator.locate_all(screen))
+        print("  TemplateLocator, all templates:  {:8.3f} s".format(locator_s))
+
+        if pyscreeze is not None:
+            def locate_each():
+                return [pyscreeze.locate(file_path, screen_path, grayscale=True) for file_path in template_paths]
+            pyscreeze_s = time_s(locate_each)
+            print("  pyscreeze.locate per template:   {:8.3f} s".format(pyscreeze_s))
+
+
+def benchmark_dual_4k():
+    random = np.random.RandomState(0)
+    width, height = DUAL_4K_SIZE
+    screen = random.randint(0, 256, size=(height // 8, width // 8)).astype(np.float32)
+    screen = np.repeat(np.repeat(screen, 8, axis=0), 8, axis=1)
+
+    templates = {}
+    for name, (top, left, template_height, template_width) in [("pause", (1600, 5000, 24, 330)),
+                                                               ("run", (200, 300, 24, 330)),
+                                                               ("handle", (900, 2000, 40, 40))]:
+        templates[name] = screen[top:top + template_height, left:left + template_width].copy()
+
+    locator = TemplateLocator(templates)
+    print("Synthetic screen {}x{}".format(width, height))
+    for match in locator.locate_all(screen):
+        print("  {:24s} ({:5d}, {:5d}) confidence {:.3f}".format(match.name, match.left, match.top, match.confidence))
+    locator_s = time_s(lambda: locator.locate_all(screen))
+    print("  TemplateLocator, all templates:  {:8.3f} s".format(locator_s))
+
+
+def run_benchmark():
+    benchmark_fixtures()
+    benchmark_dual_4k()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    run_benchmark()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_log_power
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Micro-benchmark of the FFT display post-processing.
+
+Compare the original four-step sequence (``fft2``, ``fftshift``, ``abs**2``, ``log10``) with the
+:py:class:`pysemimaginggui.power_spectrum.LogPowerKernel` for the region sizes of the GUI and script defaults. The real
+FFT of the ``scipy.fft`` fallback, which allocates its output, is also compared with ``numpy.fft`` writing in a
+preallocated buffer and, if it is installed, with the ``pyfftw`` plan of the engine.
+
+Run from the project folder with ``python -m benchmarks.benchmark_log_power``.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import timeit
+
+# Third party modules.
+import numpy as np
+from scipy.fftpack import fft2, fftshift
+import scipy.fft
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.power_spectrum import LogPowerKernel, PowerSpectrumEngine, numba, pyfftw
+
+# Globals and constants variables.
+#: Region (width, height) of ``TkMainGui`` and ``sem_video`` (800x560) and of ``live_fft`` (790x550).
+REGION_SIZES = [(800, 560), (790, 550)]
+NUMBER_REPEATS = 20
+
+
+def time_ms(function):
+    return min(timeit.repeat(function, number=1, repeat=NUMBER_REPEATS)) * 1.0e3
+
+
+def four_step(frame):
+    fft_image = fft2(frame)
+    fft_image = fftshift(fft_image)
+    fft_image = np.abs(fft_image) ** 2
+    return np.log10(fft_image)
+
+
+def run_benchmark():
+    random = np.random.RandomState(0)
+    for width, height in REGION_SIZES:
+        frame = random.randint(0, 256, size=(height, width)).astype(np.float32)
+        spectrum = scipy.fft.rfft2(frame)
+        full_spectrum = fft2(frame)
+        out = np.empty((height, width), dtype=np.float32)
+
+        print("Region {}x{}".format(width, height))
+        fft_scipy_ms = time_ms(lambda: scipy.fft.rfft2(frame, workers=1))
+        print("  FFT, scipy.fft, new array:       {:8.3f} ms".format(fft_scipy_ms))
+
+        spectrum_buffer = np.empty(spectrum.shape, dtype=np.complex64)
+        fft_numpy_ms = time_ms(lambda: np.fft.rfft2(frame, out=spectrum_buffer))
+        print("  FFT, numpy.fft, in a buffer:     {:8.3f} ms".format(fft_numpy_ms))
+
+        if pyfftw is not None:
+            fftw_engine = PowerSpectrumEngine((height, width), workers=1, use_fftw=True)
+            fft_fftw_ms = time_ms(lambda: fftw_engine.transform(frame))
+            print("  FFT, pyfftw, in a buffer:        {:8.3f} ms".format(fft_fftw_ms))
+
+        post_four_step_ms = time_ms(lambda: np.log10(np.abs(fftshift(full_spectrum)) ** 2))
+        print("  post-processing, four-step:      {:8.3f} ms".format(post_four_step_ms))
+
+        kernel = LogPowerKernel((height, width), use_numba=False)
+        post_fused_ms = time_ms(lambda: kernel(spectrum, out))
+        print("  post-processing, fused NumPy:    {:8.3f} ms".format(post_fused_ms))
+
+        if numba is not None:
+            kernel = LogPowerKernel((height, width), use_numba=True)
+            kernel(spectrum, out)
+            post_numba_ms = time_ms(lambda: kernel(spectrum, out))
+            print("  post-processing, fused numba:    {:8.3f} ms".format(post_numba_ms))
+
+        total_four_step_ms = time_ms(lambda: four_step(frame))
+        print("  total, fftpack four-step:        {:8.3f} ms".format(total_four_step_ms))
+
+        engine = PowerSpectrumEngine((height, width))
+        total_engine_ms = time_ms(lambda: engine.compute_log_power(frame, out))
+        print("  total, PowerSpectrumEngine:      {:8.3f} ms".format(total_engine_ms))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    run_benchmark()
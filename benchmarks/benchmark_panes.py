@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_panes
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Benchmark of the capture and analysis of the panes of the dual and quad views.
+
+Time one grab and one :py:class:`pysemimaginggui.fft_analysis.FftAnalysis` per pane against one grab of the union of
+the panes, split in views, and :py:class:`pysemimaginggui.fft_analysis.MultiPaneFftAnalysis` with one batched FFT.
+The frames are grabbed from the synthetic frame source, the screen grabs add their own overhead per call.
+
+Run from the project folder with ``python -m benchmarks.benchmark_panes``.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import timeit
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_source import create_frame_source, BACKEND_SYNTHETIC
+from pysemimaginggui.fft_analysis import FftAnalysis, MultiPaneFftAnalysis
+from pysemimaginggui.panes import PaneLayout
+
+# Globals and constants variables.
+#: (width, height) of a pane of the dual and quad views and gap in pixels between the panes.
+PANE_SIZE = (640, 480)
+PANE_GAP = 4
+#: Number of (columns, rows) of the layouts.
+LAYOUTS = [(2, 1), (2, 2)]
+NUMBER_REPEATS = 20
+
+
+def time_ms(function):
+    return min(timeit.repeat(function, number=1, repeat=NUMBER_REPEATS)) * 1.0e3
+
+
+def get_pane_regions(number_columns, number_rows):
+    width, height = PANE_SIZE
+    return [(column * (width + PANE_GAP), row * (height + PANE_GAP), width, height)
+            for row in range(number_rows) for column in range(number_columns)]
+
+
+def run_benchmark():
+    for number_columns, number_rows in LAYOUTS:
+        regions = get_pane_regions(number_columns, number_rows)
+        layout = PaneLayout(regions)
+        print("{} panes {}x{}, union {}x{}".format(layout.number_panes, PANE_SIZE[0], PANE_SIZE[1],
+                                                   layout.region[2], layout.region[3]))
+
+        frame_sources = [create_frame_source(BACKEND_SYNTHETIC, region) for region in regions]
+        fft_analysis = FftAnalysis(layout.pane_shape)
+        results = [fft_analysis.create_result() for _region in regions]
+
+        def analyse_each():
+            for frame_source, out in zip(frame_sources, results):
+                fft_analysis(frame_source.grab(), out)
+
+        each_ms = time_ms(analyse_each)
+        print("  one grab and FFT per pane:       {:8.3f} ms".format(each_ms))
+
+        union_source = create_frame_source(BACKEND_SYNTHETIC, layout.region)
+        multi_pane_analysis = MultiPaneFftAnalysis(layout)
+        out = multi_pane_analysis.create_result()
+        union_ms = time_ms(lambda: multi_pane_analysis(union_source.grab(), out))
+        print("  one grab and batched FFT:        {:8.3f} ms".format(union_ms))
+
+        for frame_source in frame_sources + [union_source]:
+            frame_source.close()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    run_benchmark()
@@ -73,3 +73,21 @@ def get_current_module_path(module_filepath, relative_path=""):
     file_path = os.path.normpath(file_path)
 
     return file_path
+
+
+def get_user_data_path(relative_path=""):
+    """
+    Return the folder where the project keeps data between sessions, e.g. caches, and create it if needed.
+
+    :param str relative_path: Optional parameter to return a path relative to the user data folder
+    :return: a path in the ``.pysemimaginggui`` folder of the user home folder
+    :rtype: str
+    """
+    base_path = os.path.join(os.path.expanduser("~"), ".pysemimaginggui")
+    if not os.path.isdir(base_path):
+        os.makedirs(base_path)
+
+    file_path = os.path.normpath(os.path.join(base_path, relative_path))
+    logging.debug(file_path)
+
+    return file_path
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.apodization
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Apodization windows applied to the micrograph before the FFT.
+
+Without window, the discontinuity between the opposite edges of the micrograph gives a bright cross in the FFT. The
+2D windows are computed once per (height, width, window type) and kept in a small least recently used cache.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import logging
+import threading
+from collections import OrderedDict
+
+# Third party modules.
+import numpy as np
+import scipy.signal.windows
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+WINDOW_NONE = "none"
+WINDOW_HANN = "hann"
+WINDOW_TUKEY = "tukey"
+WINDOW_BLACKMAN = "blackman"
+
+#: Fraction of the Tukey window inside the cosine tapers.
+TUKEY_ALPHA = 0.25
+#: Maximum number of windows kept in the cache.
+CACHE_SIZE = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_window_types():
+    return [WINDOW_NONE, WINDOW_HANN, WINDOW_TUKEY, WINDOW_BLACKMAN]
+
+
+def _create_window_1d(length, window_type):
+    if window_type == WINDOW_HANN:
+        return scipy.signal.windows.hann(length, sym=False)
+    elif window_type == WINDOW_TUKEY:
+        return scipy.signal.windows.tukey(length, alpha=TUKEY_ALPHA, sym=False)
+    elif window_type == WINDOW_BLACKMAN:
+        return scipy.signal.windows.blackman(length, sym=False)
+    else:
+        raise ValueError("Unknown window type: {}".format(window_type))
+
+
+def create_window(shape, window_type):
+    """
+    Create the separable 2D window.
+
+    :param tuple shape: (height, width) of the micrograph
+    :param str window_type: one of :py:func:`get_window_types`
+    :return: read-only ``float32`` window
+    """
+    height, width = shape
+    window = np.outer(_create_window_1d(height, window_type), _create_window_1d(width, window_type))
+    window = window.astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def get_window(shape, window_type):
+    """
+    Return the cached 2D window, ``None`` for :py:data:`WINDOW_NONE`.
+
+    :param tuple shape: (height, width) of the micrograph
+    :param str window_type: one of :py:func:`get_window_types`
+    :return: read-only ``float32`` window shared by all callers
+    """
+    if window_type is None or window_type == WINDOW_NONE:
+        return None
+
+    key = (tuple(shape), window_type)
+    with _cache_lock:
+        window = _cache.get(key)
+        if window is not None:
+            _cache.move_to_end(key)
+            return window
+
+    logging.debug("Create %s window %s", window_type, shape)
+    window = create_window(shape, window_type)
+
+    with _cache_lock:
+        _cache[key] = window
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return window
+
+
+def apply_window(image, window_type):
+    """
+    Multiply the ``float32`` *image* by the window in place.
+
+    :return: *image*
+    """
+    window = get_window(image.shape, window_type)
+    if window is not None:
+        np.multiply(image, window, out=image)
+    return image
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.change_detection
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Detection of the changed frames.
+
+In slow scan or when the microscope is paused, most of the captured frames are identical to the previous one. A
+:py:class:`ChangeDetector` compares each frame with the last stored frame, either with a checksum of the frame or with
+the mean absolute difference of the pixels of each block, the difference downsampled, so the recorders only store and
+encode the frames that changed. The absolute differences of the pixels are summed, opposite changes in a block do not
+cancel, and with a threshold of 0 a change of one pixel is detected.
+"""
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import zlib
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+#: Exact comparison with a CRC-32 checksum of the full frame.
+METHOD_HASH = "hash"
+#: Comparison of the mean absolute difference of the pixels of each block.
+METHOD_DIFFERENCE = "difference"
+
+#: Size in pixels of the square blocks compared by :py:data:`METHOD_DIFFERENCE`.
+DEFAULT_STEP = 4
+#: Largest mean absolute difference in gray levels of the pixels of a block of an unchanged frame.
+DEFAULT_THRESHOLD = 0
+
+
+def get_methods():
+    return [METHOD_DIFFERENCE, METHOD_HASH]
+
+
+class ChangeDetector(object):
+    """
+    Compare the frames with a reference frame, the last stored frame.
+
+    :param tuple shape: (height, width) of the frames
+    :param str method: :py:data:`METHOD_DIFFERENCE` or :py:data:`METHOD_HASH`
+    :param int step: size in pixels of the square blocks compared by :py:data:`METHOD_DIFFERENCE`, the last blocks
+        are smaller when the frame size is not a multiple of *step*
+    :param float threshold: largest mean absolute difference in gray levels of the pixels of a block of an unchanged
+        frame
+    """
+    def __init__(self, shape, method=METHOD_DIFFERENCE, step=DEFAULT_STEP, threshold=DEFAULT_THRESHOLD):
+        if method not in get_methods():
+            raise ValueError("Unknown change detection method: {}".format(method))
+
+        self.shape = tuple(shape)
+        self.method = method
+        self.step = step
+        self.threshold = threshold
+
+        height, width = self.shape
+        self._row_indices = np.arange(0, height, step)
+        self._column_indices = np.arange(0, width, step)
+        # The last blocks are smaller when the frame size is not a multiple of the step.
+        self._block_areas = np.outer(np.diff(np.append(self._row_indices, height)),
+                                     np.diff(np.append(self._column_indices, width)))
+        self._difference = np.zeros(self.shape, dtype=np.int16)
+        self._row_sums = np.zeros((len(self._row_indices), width), dtype=np.int32)
+        self._block_sums = np.zeros_like(self._block_areas, dtype=np.int32)
+        self._reference = np.zeros(self.shape, dtype=np.uint8)
+        self._reference_checksum = None
+        self._has_reference = False
+
+    def _get_checksum(self, frame):
+        return zlib.crc32(np.ascontiguousarray(frame, dtype=np.uint8))
+
+    def _compute_block_differences(self, frame):
+        """Return the sums of the absolute differences with the reference frame of the pixels of each block."""
+        np.subtract(frame, self._reference, out=self._difference, dtype=np.int16)
+        np.abs(self._difference, out=self._difference)
+        np.add.reduceat(self._difference, self._row_indices, axis=0, dtype=np.int32, out=self._row_sums)
+        np.add.reduceat(self._row_sums, self._column_indices, axis=1, out=self._block_sums)
+        return self._block_sums
+
+    def is_changed(self, frame):
+        """Return ``True`` if *frame* differs from the reference frame, always for the first frame."""
+        if not self._has_reference:
+            return True
+
+        if self.method == METHOD_HASH:
+            return self._get_checksum(frame) != self._reference_checksum
+
+        # The threshold of the mean is scaled by the area of each block.
+        return bool(np.any(self._compute_block_differences(frame) > self.threshold * self._block_areas))
+
+    def update(self, frame):
+        """Use *frame* as the reference frame."""
+        if self.method == METHOD_HASH:
+            self._reference_checksum = self._get_checksum(frame)
+        else:
+            np.copyto(self._reference, frame)
+        self._has_reference = True
+
+    def reset(self):
+        self._has_reference = False
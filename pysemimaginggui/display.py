@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.display
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Fast display of the live images.
+
+Each update of a matplotlib ``imshow`` normalizes the array, applies the colormap in floating point and draws the
+figure with Agg, which costs more than the FFT at the region sizes of the GUI. The :py:class:`LutRenderer` scales the
+image to ``uint8`` indices in preallocated buffers and converts them to RGB with a 256 entries colormap table. The
+:py:class:`TkImageView` pastes the RGB image in a Tk ``PhotoImage``. The image is reduced to the size of the widget
+when it is smaller than the region, the maximum of each block is kept by default so the thin spots of a spectrum are
+not lost.
+
+The :py:class:`AutoContrast` selects the display limits from percentiles of a strided subsample of the image, so a
+hot DC bin or a few saturated pixels do not set the scale. The limits are smoothed in time and only recomputed every
+few frames or when the mean of the image moves, so the live view does not flicker.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import math
+import six
+if six.PY3:
+    from tkinter import ttk
+    from tkinter import BOTH
+elif six.PY2:  # pragma: no cover
+    import ttk
+    from Tkinter import BOTH
+
+# Third party modules.
+import numpy as np
+import matplotlib
+from PIL import Image
+
+try:
+    from PIL import ImageTk
+except ImportError:  # pragma: no cover
+    ImageTk = None
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+DISPLAY_TK = "tk"
+DISPLAY_MATPLOTLIB = "matplotlib"
+
+DOWNSAMPLE_STRIDE = "stride"
+DOWNSAMPLE_MAXIMUM = "maximum"
+DOWNSAMPLE_MEAN = "mean"
+
+#: Colormap of the matplotlib ``imshow`` default.
+DEFAULT_COLORMAP = "viridis"
+LUT_SIZE = 256
+
+DEFAULT_LOW_PERCENTILE = 1.0
+DEFAULT_HIGH_PERCENTILE = 99.5
+DEFAULT_CONTRAST_STEP = 8
+DEFAULT_CONTRAST_INTERVAL_FRAMES = 10
+DEFAULT_CONTRAST_SMOOTHING = 0.3
+#: Change of the mean, in fraction of the display range, that recomputes the limits without smoothing.
+DEFAULT_CONTRAST_SHIFT = 0.1
+
+_luts = {}
+
+
+def get_live_displays():
+    return [DISPLAY_TK, DISPLAY_MATPLOTLIB]
+
+
+def get_default_live_display():
+    return DISPLAY_TK if ImageTk is not None else DISPLAY_MATPLOTLIB
+
+
+def get_downsamples():
+    return [DOWNSAMPLE_STRIDE, DOWNSAMPLE_MAXIMUM, DOWNSAMPLE_MEAN]
+
+
+def get_colormap_lut(name):
+    """Return the ``uint8`` RGB table, shape (256, 3), of the matplotlib colormap *name*."""
+    lut = _luts.get(name)
+    if lut is None:
+        colormap = matplotlib.colormaps[name]
+        lut = np.ascontiguousarray(colormap(np.linspace(0.0, 1.0, LUT_SIZE), bytes=True)[:, :3])
+        _luts[name] = lut
+    return lut
+
+
+def get_downsample_factor(shape, display_size):
+    """Return the smallest integer factor that reduces the image *shape* to fit in *display_size* (height, width)."""
+    if display_size is None:
+        return 1
+    factor = 1
+    for length, display_length in zip(shape, display_size):
+        if display_length > 0:
+            factor = max(factor, int(math.ceil(length / float(display_length))))
+    return factor
+
+
+class LutRenderer(object):
+    """
+    Render images of a fixed size to RGB ``uint8`` with a colormap table.
+
+    :param tuple shape: (height, width) of the images
+    :param str colormap: matplotlib colormap name
+    :param str downsample: reduction of the image larger than the display, one of :py:func:`get_downsamples`
+    :param tuple display_size: (height, width) of the display, the image is not reduced when ``None``
+    """
+    def __init__(self, shape, colormap=DEFAULT_COLORMAP, downsample=DOWNSAMPLE_MAXIMUM, display_size=None):
+        if downsample not in get_downsamples():
+            raise ValueError("Unknown downsample: {}".format(downsample))
+        self.shape = tuple(shape)
+        self.downsample = downsample
+        self.lut = get_colormap_lut(colormap)
+        self.factor = None
+        self.display_size = None
+        self.set_display_size(display_size)
+
+    def set_colormap(self, colormap):
+        self.lut = get_colormap_lut(colormap)
+
+    def set_display_size(self, display_size):
+        """Select the display (height, width), the buffers are only reallocated when the reduction changes."""
+        self.display_size = display_size
+        factor = get_downsample_factor(self.shape, display_size)
+        if factor == self.factor:
+            return
+
+        self.factor = factor
+        height, width = self.shape
+        self.output_shape = (height // factor, width // factor)
+        self._reduced = np.zeros(self.output_shape, dtype=np.float32)
+        self._scaled = np.zeros(self.output_shape, dtype=np.float32)
+        self._index = np.zeros(self.output_shape, dtype=np.uint8)
+        self.rgb = np.zeros(self.output_shape + (3,), dtype=np.uint8)
+
+    def set_shape(self, shape):
+        """Render images of a new (height, width)."""
+        self.shape = tuple(shape)
+        self.factor = None
+        self.set_display_size(self.display_size)
+
+    def reduce(self, image):
+        """Return *image* reduced by :py:attr:`factor`, a view or a buffer overwritten by the next call."""
+        factor = self.factor
+        if factor == 1:
+            return image
+
+        height, width = self.output_shape
+        if self.downsample == DOWNSAMPLE_STRIDE:
+            return image[:height * factor:factor, :width * factor:factor]
+
+        # One pass over the block offsets, each on a strided view, is faster than a reduction over the block axes.
+        reduced = self._reduced
+        reduce_function = np.maximum if self.downsample == DOWNSAMPLE_MAXIMUM else np.add
+        np.copyto(reduced, image[:height * factor:factor, :width * factor:factor], casting="unsafe")
+        for row in range(factor):
+            for column in range(factor):
+                if row or column:
+                    reduce_function(reduced, image[row:height * factor:factor, column:width * factor:factor],
+                                    out=reduced, casting="unsafe")
+        if self.downsample == DOWNSAMPLE_MEAN:
+            np.multiply(reduced, 1.0 / (factor * factor), out=reduced)
+        return reduced
+
+    def render(self, image, minimum=None, maximum=None):
+        """
+        Render *image* with the colormap between *minimum* and *maximum*.
+
+        :param image: 2D image of :py:attr:`shape`
+        :param float minimum: value of the first color, the minimum of the image when ``None``
+        :param float maximum: value of the last color, the maximum of the image when ``None``
+        :return: RGB ``uint8`` image, shape (height, width, 3) of :py:attr:`output_shape`, :py:attr:`rgb` overwritten
+            by the next call
+        """
+        reduced = self.reduce(image)
+        if minimum is None:
+            minimum = float(reduced.min())
+        if maximum is None:
+            maximum = float(reduced.max())
+        scale = (LUT_SIZE - 1) / (maximum - minimum) if maximum > minimum else 0.0
+
+        scaled = self._scaled
+        np.subtract(reduced, minimum, out=scaled, casting="unsafe")
+        np.multiply(scaled, scale, out=scaled)
+        np.clip(scaled, 0.0, LUT_SIZE - 1, out=scaled)
+        np.copyto(self._index, scaled, casting="unsafe")
+        np.take(self.lut, self._index, axis=0, out=self.rgb, mode="clip")
+        return self.rgb
+
+
+class AutoContrast(object):
+    """
+    Display limits from the percentiles of a subsample of the images.
+
+    :param float low_percentile: percentile of the first color
+    :param float high_percentile: percentile of the last color
+    :param int step: the subsample is every *step* pixel of every *step* row
+    :param int interval_frames: the limits are recomputed every *interval_frames* frames
+    :param float smoothing: weight of the new limits, 1 is no smoothing
+    :param float shift: change of the subsample mean, in fraction of the display range, that recomputes the limits
+        immediately and without smoothing
+    """
+    def __init__(self, low_percentile=DEFAULT_LOW_PERCENTILE, high_percentile=DEFAULT_HIGH_PERCENTILE,
+                 step=DEFAULT_CONTRAST_STEP, interval_frames=DEFAULT_CONTRAST_INTERVAL_FRAMES,
+                 smoothing=DEFAULT_CONTRAST_SMOOTHING, shift=DEFAULT_CONTRAST_SHIFT):
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.step = step
+        self.interval_frames = interval_frames
+        self.smoothing = smoothing
+        self.shift = shift
+
+        self.minimum = None
+        self.maximum = None
+        self.count = 0
+        self.computed_count = 0
+        self._mean = None
+        self._sample = None
+        self._clipped = None
+
+    def reset(self):
+        self.minimum = None
+        self.maximum = None
+        self.count = 0
+        self._mean = None
+
+    def compute_limits(self, sample):
+        """Return the low and high percentiles of *sample*, partially sorted in a preallocated buffer."""
+        if self._sample is None or self._sample.shape != (sample.size,):
+            self._sample = np.zeros(sample.size, dtype=np.float32)
+        values = self._sample
+        np.copyto(values.reshape(sample.shape), sample, casting="unsafe")
+
+        last_id = values.size - 1
+        low_id = int(round(self.low_percentile / 100.0 * last_id))
+        high_id = int(round(self.high_percentile / 100.0 * last_id))
+        values.partition((low_id, high_id))
+        self.computed_count += 1
+        return float(values[low_id]), float(values[high_id])
+
+    def compute_mean(self, sample):
+        """Return the mean of *sample* clipped to the limits, so the outliers do not move it."""
+        if self._clipped is None or self._clipped.shape != sample.shape:
+            self._clipped = np.zeros(sample.shape, dtype=np.float32)
+        np.clip(sample, self.minimum, self.maximum, out=self._clipped, casting="unsafe")
+        return float(self._clipped.mean(dtype=np.float64))
+
+    def update(self, image):
+        """
+        Return the display limits of *image*.
+
+        :return: (minimum, maximum), also :py:attr:`minimum` and :py:attr:`maximum`
+        """
+        sample = image[::self.step, ::self.step]
+        self.count += 1
+        if self.minimum is None:
+            self.minimum, self.maximum = self.compute_limits(sample)
+            self._mean = self.compute_mean(sample)
+            return self.minimum, self.maximum
+
+        mean = self.compute_mean(sample)
+        if abs(mean - self._mean) > self.shift * (self.maximum - self.minimum):
+            self.minimum, self.maximum = self.compute_limits(sample)
+            self._mean = self.compute_mean(sample)
+        elif self.count % self.interval_frames == 0:
+            minimum, maximum = self.compute_limits(sample)
+            self.minimum += self.smoothing * (minimum - self.minimum)
+            self.maximum += self.smoothing * (maximum - self.maximum)
+            self._mean = self.compute_mean(sample)
+        return self.minimum, self.maximum
+
+
+class TkImageView(object):
+    """
+    Show the images rendered by a :py:class:`LutRenderer` in a Tk label, reduced to the size of the label.
+
+    :param parent: Tk parent widget, the label fills it
+    :param renderer: :py:class:`LutRenderer`
+    """
+    def __init__(self, parent, renderer):
+        if ImageTk is None:
+            raise ImportError("PIL.ImageTk is required for the Tk image view")
+        self.renderer = renderer
+        self.label = ttk.Label(parent)
+        self.label.pack(fill=BOTH, expand=True)
+        self.label.bind("<Configure>", self._on_configure)
+        self._photo = None
+
+    def _on_configure(self, event):
+        if self._photo is not None:
+            self.renderer.set_display_size((event.height, event.width))
+
+    def show(self, image, minimum=None, maximum=None):
+        """Render *image* and paste it in the photo image of the label."""
+        if image.shape != self.renderer.shape:
+            self.renderer.set_shape(image.shape)
+        rgb = self.renderer.render(image, minimum, maximum)
+        height, width = rgb.shape[:2]
+        if self._photo is None or (self._photo.height(), self._photo.width()) != (height, width):
+            self._photo = ImageTk.PhotoImage("RGB", (width, height), master=self.label)
+            self.label.configure(image=self._photo)
+        self._photo.paste(Image.frombuffer("RGB", (width, height), rgb, "raw", "RGB", 0, 1))
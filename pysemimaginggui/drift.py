@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.drift
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Drift of the image measured by phase correlation.
+
+The drift between two successive frames is the position of the peak of the inverse transform of their normalized
+cross power spectrum. The normalization is regularized so the frequencies without signal, e.g. above the resolution
+of a slightly blurred image, do not add their noise to the peak. The half spectrum of the frame is the one already
+computed for the live FFT, the measurement only costs the normalization and one inverse FFT per frame. The peak is
+refined to a fraction of pixel with a parabola through its neighbours. Only the mean, the zero frequency, is not
+used: the frequencies of the two axes hold the drift of the horizontal and vertical structures, e.g. stripes, the
+drift along the stripes is undefined. A lattice has a correlation peak for each lattice vector, the peak of the
+smallest shift is selected: the drift between two frames must be smaller than half the lattice period.
+
+The cumulative drift aligns the spectrum of each frame on the first one with a phase ramp, an exact sub-pixel shift,
+before it is integrated, so the average of the frames stays sharp.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+import scipy.fft
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.power_spectrum import get_default_workers
+
+# Globals and constants variables.
+MINIMUM_MAGNITUDE = 1.0e-12
+DEFAULT_REGULARIZATION = 100.0
+#: The local maxima of the correlation higher than this fraction of the maximum are equivalent peaks, the smallest
+#: shift is selected.
+PEAK_TOLERANCE = 0.9
+
+
+def get_peak_offset(minus, center, plus):
+    """Return the offset, between -0.5 and 0.5, of the maximum of the parabola through three equidistant values."""
+    curvature = minus - 2.0 * center + plus
+    if curvature >= 0.0:
+        return 0.0
+    return min(max(0.5 * (minus - plus) / curvature, -0.5), 0.5)
+
+
+class DriftTracker(object):
+    """
+    Measure the drift between successive frames from their half spectra.
+
+    The shifts are in pixels, (x, y) with x to the right and y down, positive when the image moves in that direction.
+
+    :param tuple shape: (height, width) of the frames
+    :param float regularization: the cross power spectrum is divided by its magnitude plus *regularization* times
+        its mean magnitude. 0 is the classic phase correlation, which amplifies the noise of the frequencies without
+        signal as much as the others, larger values weight the frequencies by their signal.
+    :param int workers: number of threads used by the inverse FFT, all the processors when ``None``
+    """
+    def __init__(self, shape, regularization=DEFAULT_REGULARIZATION, workers=None):
+        self.shape = tuple(shape)
+        self.regularization = regularization
+        self.workers = get_default_workers() if workers is None else workers
+
+        height, width = self.shape
+        spectrum_shape = (height, width // 2 + 1)
+        self._previous = np.zeros(spectrum_shape, dtype=np.complex64)
+        self._cross = np.zeros(spectrum_shape, dtype=np.complex64)
+        self._magnitude = np.zeros(spectrum_shape, dtype=np.float32)
+        self._candidates = np.zeros(self.shape, dtype=bool)
+        self.aligned = np.zeros(spectrum_shape, dtype=np.complex64)
+
+        # Phase of one pixel shift of each frequency, for the alignment.
+        self._phase_y = (2.0 * np.pi * np.fft.fftfreq(height)).astype(np.float32)
+        self._phase_x = (2.0 * np.pi * np.fft.rfftfreq(width)).astype(np.float32)
+        self._ramp_y = np.zeros((height, 1), dtype=np.complex64)
+        self._ramp_x = np.zeros((1, width // 2 + 1), dtype=np.complex64)
+
+        self.shift = np.zeros(2, dtype=np.float64)
+        self.position = np.zeros(2, dtype=np.float64)
+        self.peak = 0.0
+        self.count = 0
+
+    def reset(self):
+        """Restart the tracking at the next frame, the position of the next frame is zero."""
+        self.shift[...] = 0.0
+        self.position[...] = 0.0
+        self.peak = 0.0
+        self.count = 0
+
+    def update(self, spectrum):
+        """
+        Measure the drift of a frame from the previous one.
+
+        :param spectrum: half spectrum of the frame, shape (height, width//2 + 1), e.g.
+            :py:meth:`pysemimaginggui.power_spectrum.PowerSpectrumEngine.transform`
+        :return: the (x, y) shift from the previous frame, :py:attr:`shift`, zero for the first frame. The cumulative
+            drift is :py:attr:`position` and the height of the correlation peak, larger for a more reliable
+            measurement, :py:attr:`peak`.
+        """
+        if self.count == 0:
+            np.copyto(self._previous, spectrum)
+            self.count = 1
+            return self.shift
+
+        cross = self._cross
+        magnitude = self._magnitude
+        np.conjugate(self._previous, out=cross)
+        np.multiply(cross, spectrum, out=cross)
+        np.abs(cross, out=magnitude)
+        np.add(magnitude, self.regularization * float(magnitude.mean(dtype=np.float64)) + MINIMUM_MAGNITUDE,
+               out=magnitude)
+        np.divide(cross, magnitude, out=cross)
+        # Only the mean is removed, the frequencies of the axes hold the drift of the horizontal and vertical
+        # structures, e.g. the scan lines or a grid.
+        cross[0, 0] = 0.0
+        np.copyto(self._previous, spectrum)
+
+        correlation = scipy.fft.irfft2(cross, s=self.shape, workers=self.workers)
+        height, width = self.shape
+        row, column = self._find_peak(correlation)
+        self.peak = float(correlation[row, column])
+
+        offset_y = get_peak_offset(float(correlation[row - 1, column]), self.peak,
+                                   float(correlation[(row + 1) % height, column]))
+        offset_x = get_peak_offset(float(correlation[row, column - 1]), self.peak,
+                                   float(correlation[row, (column + 1) % width]))
+        # The shifts larger than half the frame are the opposite shifts.
+        self.shift[0] = (column + width // 2) % width - width // 2 + offset_x
+        self.shift[1] = (row + height // 2) % height - height // 2 + offset_y
+        self.position += self.shift
+        self.count += 1
+        return self.shift
+
+    def _find_peak(self, correlation):
+        height, width = self.shape
+        peak_id = np.argmax(correlation)
+        np.greater_equal(correlation, PEAK_TOLERANCE * correlation.flat[peak_id], out=self._candidates)
+        candidate_ids = np.flatnonzero(self._candidates)
+        if len(candidate_ids) > 1:
+            rows, columns = np.divmod(candidate_ids, width)
+            values = correlation.flat[candidate_ids]
+            is_maximum = (values >= correlation[rows - 1, columns]) & \
+                (values >= correlation[(rows + 1) % height, columns]) & \
+                (values >= correlation[rows, columns - 1]) & \
+                (values >= correlation[rows, (columns + 1) % width])
+            candidate_ids, rows, columns = candidate_ids[is_maximum], rows[is_maximum], columns[is_maximum]
+            rows = (rows + height // 2) % height - height // 2
+            columns = (columns + width // 2) % width - width // 2
+            peak_id = candidate_ids[np.argmin(rows * rows + columns * columns)]
+        return np.divmod(peak_id, width)
+
+    def align(self, spectrum, out=None):
+        """
+        Shift the half spectrum of a frame by minus the cumulative drift, on the first frame.
+
+        :param spectrum: half spectrum of the frame
+        :param out: output half spectrum, :py:attr:`aligned` when ``None``
+        :return: the aligned half spectrum
+        """
+        if out is None:
+            out = self.aligned
+
+        position_x, position_y = self.position
+        np.exp(1j * position_y * self._phase_y[:, np.newaxis], out=self._ramp_y)
+        np.exp(1j * position_x * self._phase_x[np.newaxis, :], out=self._ramp_x)
+        np.multiply(spectrum, self._ramp_y, out=out)
+        np.multiply(out, self._ramp_x, out=out)
+        return out
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.ffmpeg_recorder
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Record the captured frames with ffmpeg without matplotlib.
+
+The gray frames are written as they are captured, ``gray`` rawvideo at the region resolution, on the standard input
+of ffmpeg. The frames arrive late and in bursts when they are queued before ffmpeg, so the video is not timed by their
+arrival: each frame is sent in an IVF stream, the simplest container read by ffmpeg with a timestamp per frame, with
+its capture timestamp in milliseconds. The video has a variable frame rate, each frame is displayed from its capture
+time until the next frame, and a frame that is not written, e.g. an unchanged frame, is neither piped nor encoded.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import logging
+import struct
+import subprocess
+import threading
+import time
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.scheduler import FrameScheduler
+
+# Globals and constants variables.
+DEFAULT_CODEC = "libx264"
+#: Frame rate of the time base of the frame timestamps, in milliseconds.
+TIME_BASE_RATE = 1000
+#: IVF file header: signature, version, header size, FourCC of 8-bit gray raw frames, width, height, time base rate and
+#: scale, number of frames (unknown in a pipe) and unused.
+IVF_HEADER = struct.Struct("<4sHH4sHHIIII")
+#: IVF frame header: frame size in bytes and timestamp in the time base.
+IVF_FRAME_HEADER = struct.Struct("<IQ")
+#: Interval of the checks of the stop event and of the progress reports of :py:func:`record_shared_frames`.
+POLL_INTERVAL_S = 0.05
+
+
+def get_default_ffmpeg_path():
+    """Return the ffmpeg executable configured for matplotlib, e.g. by the GUI ffmpeg setup."""
+    import matplotlib
+    return matplotlib.rcParams["animation.ffmpeg_path"]
+
+
+class FfmpegRecorder(object):
+    """
+    Pipe gray ``uint8`` frames to ffmpeg, each at its capture time.
+
+    :param str file_path: video file path
+    :param tuple shape: (height, width) of the frames
+    :param str ffmpeg_path: ffmpeg executable, the matplotlib ``animation.ffmpeg_path`` when ``None``
+    :param str codec: video codec
+    :param list extra_args: extra output arguments of ffmpeg
+    """
+    def __init__(self, file_path, shape, ffmpeg_path=None, codec=DEFAULT_CODEC, extra_args=None):
+        self.file_path = file_path
+        self.shape = tuple(shape)
+        self.ffmpeg_path = ffmpeg_path if ffmpeg_path is not None else get_default_ffmpeg_path()
+        self.codec = codec
+        self.extra_args = list(extra_args) if extra_args is not None else []
+
+        #: Number of frames written.
+        self.frame_count = 0
+        self._process = None
+        self._first_timestamp = None
+        self._last_pts = None
+
+    def get_command(self):
+        height, width = self.shape
+        # The output keeps the timestamps and the time base of the input frames.
+        command = [self.ffmpeg_path, "-y", "-nostats", "-loglevel", "error",
+                   "-f", "ivf", "-i", "-",
+                   "-vsync", "vfr", "-enc_time_base", "-1",
+                   "-vcodec", self.codec]
+        if self.codec == DEFAULT_CODEC:
+            # Most players only decode the 4:2:0 H.264 videos, which need even dimensions.
+            command.extend(["-pix_fmt", "yuv420p"])
+            if width % 2 or height % 2:
+                command.extend(["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"])
+        command.extend(self.extra_args)
+        command.append(self.file_path)
+        return command
+
+    @property
+    def is_open(self):
+        return self._process is not None
+
+    @property
+    def bytes_written(self):
+        """Current size of the video file."""
+        try:
+            return os.path.getsize(self.file_path)
+        except OSError:
+            return 0
+
+    def open(self):
+        command = self.get_command()
+        logging.debug("ffmpeg command: %s", command)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.frame_count = 0
+        self._first_timestamp = None
+        self._last_pts = None
+
+        height, width = self.shape
+        self._write(IVF_HEADER.pack(b"DKIF", 0, IVF_HEADER.size, b"Y800", width, height, TIME_BASE_RATE, 1, 0, 0))
+
+    def get_pts(self, timestamp):
+        """Return the timestamp in the video of the frame captured at *timestamp*, in milliseconds."""
+        return int(round((timestamp - self._first_timestamp) * TIME_BASE_RATE))
+
+    def write(self, frame, timestamp=None):
+        """
+        Write one frame, displayed in the video from its capture time until the next frame.
+
+        Frames less than a millisecond apart are kept, each one a millisecond after the previous one.
+
+        :param frame: gray ``uint8`` frame of :py:attr:`shape`
+        :param float timestamp: capture time in seconds, e.g. :py:func:`time.monotonic`, the current time when ``None``
+        """
+        if frame.shape != self.shape:
+            raise ValueError("Frame shape {} different from the recorder shape {}".format(frame.shape, self.shape))
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+
+        pts = self.get_pts(timestamp)
+        if self._last_pts is not None and pts <= self._last_pts:
+            pts = self._last_pts + 1
+        self._last_pts = pts
+
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        self._write(IVF_FRAME_HEADER.pack(frame.nbytes, pts))
+        self._write(memoryview(frame).cast("B"))
+        self.frame_count += 1
+
+    def _write(self, data):
+        try:
+            self._process.stdin.write(data)
+        except (IOError, OSError):
+            raise RuntimeError("ffmpeg stopped: {}".format(self._abort()))
+
+    def close(self):
+        """Flush the frames and wait for ffmpeg to finish the video."""
+        if self._process is None:
+            return
+
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+        errors = process.stderr.read().decode("utf-8", "replace").strip()
+        return_code = process.wait()
+        process.stderr.close()
+        logging.info("ffmpeg recorded %i frames in %s", self.frame_count, self.file_path)
+        if return_code != 0:
+            raise RuntimeError("ffmpeg error {}: {}".format(return_code, errors))
+
+    def _abort(self):
+        process, self._process = self._process, None
+        process.kill()
+        errors = process.stderr.read().decode("utf-8", "replace").strip()
+        process.wait()
+        process.stderr.close()
+        return errors
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def record_frames(frame_source, recorder, number_frames, frame_interval_s, stop_event=None, scheduler=None,
+                  pause_detector=None):
+    """
+    Capture frames at a fixed interval and write them to *recorder*.
+
+    The captures follow the absolute deadlines of a :py:class:`pysemimaginggui.scheduler.FrameScheduler`, the missed
+    slots are skipped and each frame is written with its actual capture time.
+
+    :param frame_source: :py:class:`pysemimaginggui.frame_source.FrameSource`
+    :param recorder: open recorder with a ``write(frame, timestamp)`` method
+    :param int number_frames: number of frames to record, until *stop_event* is set when ``None``
+    :param float frame_interval_s: capture interval in seconds
+    :param stop_event: :py:class:`threading.Event` that stops the recording
+    :param scheduler: :py:class:`pysemimaginggui.scheduler.FrameScheduler`, e.g. to read its statistics during the
+        recording, a new scheduler of *frame_interval_s* when ``None``
+    :param pause_detector: function called before each capture, no frame is recorded while it returns ``True``, e.g.
+        :py:meth:`pysemimaginggui.run_state.RunStateDetector.is_paused`
+    :return: number of recorded frames
+    """
+    if scheduler is None:
+        scheduler = FrameScheduler(frame_interval_s)
+    frame_id = 0
+    while number_frames is None or frame_id < number_frames:
+        if not scheduler.wait(stop_event):
+            break
+        if pause_detector is not None and pause_detector():
+            continue
+        try:
+            frame = frame_source.grab()
+        except StopIteration:
+            break
+        recorder.write(frame, scheduler.mark())
+        frame_id += 1
+    logging.info("Capture timing: %s", scheduler.statistics())
+    return frame_id
+
+
+def record_shared_frames(capture, recorder, number_frames, stop_event=None, progress=None):
+    """
+    Write the frames of a running capture to *recorder*, e.g. the capture of the live view.
+
+    The frames are written by the capture thread, the recorder must return quickly, e.g. a
+    :py:class:`pysemimaginggui.recording.AsyncFrameWriter`.
+
+    :param capture: started :py:class:`pysemimaginggui.pipeline.SharedCapture`
+    :param recorder: open recorder with a ``write(frame, timestamp)`` method
+    :param int number_frames: number of frames to record, until *stop_event* is set when ``None``
+    :param stop_event: :py:class:`threading.Event` that stops the recording
+    :param progress: function called with the number of recorded frames at each check of *stop_event*, e.g.
+        :py:meth:`pysemimaginggui.jobs.Job.report`
+    :return: number of recorded frames
+    """
+    done_event = threading.Event()
+    frame_counts = [0]
+
+    def write(frame, timestamp):
+        recorder.write(frame, timestamp)
+        frame_counts[0] += 1
+        if number_frames is not None and frame_counts[0] >= number_frames:
+            done_event.set()
+
+    # The consumer is removed at the end of the capture or after a recorder error.
+    capture.add_consumer(write, done_event.set)
+    try:
+        while not done_event.wait(POLL_INTERVAL_S):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if progress is not None:
+                progress(frame_counts[0])
+    finally:
+        capture.remove_consumer(write)
+    logging.info("Capture timing: %s", capture.scheduler.statistics())
+    return frame_counts[0]
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.fft_analysis
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Live analysis of the micrograph FFT computed by the pipeline compute thread.
+
+All the results of a frame are stored in one NumPy structured array, so they go through the pipeline ring buffer
+together. Each field is a view, e.g. ``result["log_power"]``. The panes of the dual and quad layouts are analysed
+together by :py:class:`MultiPaneFftAnalysis`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.power_spectrum import get_power_spectrum_engine, BatchPowerSpectrumEngine
+from pysemimaginggui.radial_profile import get_radial_profile
+from pysemimaginggui.focus_metrics import get_focus_metrics, METRIC_NAMES
+from pysemimaginggui.apodization import WINDOW_NONE
+from pysemimaginggui.integration import create_integrator, INTEGRATION_NONE, DOMAIN_IMAGE, DOMAIN_SPECTRUM, \
+    DEFAULT_NUMBER_FRAMES
+from pysemimaginggui.drift import DriftTracker
+
+# Globals and constants variables.
+
+
+class FftAnalysis(object):
+    """
+    Compute the log power spectrum, the radially averaged PSD and the focus metrics of a frame.
+
+    With the drift tracking, the drift is measured from the spectrum of each frame. The integration of the frames is
+    then done on their spectra aligned on the first frame, the spectrum of the average of the aligned frames, and the
+    focus metrics use the current frame.
+
+    :param tuple shape: (height, width) of the frames
+    :param str window_type: apodization window, see :py:mod:`pysemimaginggui.apodization`
+    :param str integration: integration method of the frames, see :py:mod:`pysemimaginggui.integration`
+    :param str integration_domain: integration of the frames before the FFT, :py:data:`DOMAIN_IMAGE`, or of the power
+        spectra, :py:data:`DOMAIN_SPECTRUM`
+    :param int number_frames: number of integrated frames
+    :param bool drift_tracking: measure the drift and align the integrated frames
+    """
+    def __init__(self, shape, window_type=WINDOW_NONE, integration=INTEGRATION_NONE, integration_domain=DOMAIN_IMAGE,
+                 number_frames=DEFAULT_NUMBER_FRAMES, drift_tracking=False):
+        self.shape = tuple(shape)
+        self.engine = get_power_spectrum_engine(self.shape, window_type=window_type)
+        self.radial_profile = get_radial_profile(self.shape)
+        self.focus_metrics = get_focus_metrics(self.shape)
+        self.integration = None
+        self.integration_domain = None
+        self.number_frames = None
+        self.integrator = None
+        self.drift_tracker = None
+        self.set_integration(integration, integration_domain, number_frames, drift_tracking)
+
+        self.result_dtype = np.dtype([
+            ("log_power", np.float32, self.shape),
+            ("radial_profile", np.float32, (self.radial_profile.number_bins,)),
+            ("focus_metrics", np.float32, (len(METRIC_NAMES),)),
+            ("drift", np.float32, (2,)),
+            ("drift_position", np.float32, (2,)),
+            ("frame", np.uint8, self.shape),
+        ])
+
+    def set_window(self, window_type):
+        self.engine.set_window(window_type)
+
+    def set_integration(self, integration, integration_domain=DOMAIN_IMAGE, number_frames=DEFAULT_NUMBER_FRAMES,
+                        drift_tracking=False):
+        """Select the integration, a new integrator is only created when the settings change."""
+        settings = (integration, integration_domain, number_frames)
+        if settings == (self.integration, self.integration_domain, self.number_frames) and \
+                drift_tracking == (self.drift_tracker is not None):
+            return
+
+        spectrum_shape = self.engine.power.shape
+        if integration_domain == DOMAIN_SPECTRUM:
+            shape = spectrum_shape
+        elif integration_domain == DOMAIN_IMAGE and drift_tracking:
+            # The aligned complex half spectra are integrated as their real and imaginary parts.
+            shape = (spectrum_shape[0], spectrum_shape[1] * 2)
+        elif integration_domain == DOMAIN_IMAGE:
+            shape = self.shape
+        else:
+            raise ValueError("Unknown integration domain: {}".format(integration_domain))
+        integrator = create_integrator(integration, shape, number_frames)
+        drift_tracker = DriftTracker(self.shape, workers=self.engine.workers) if drift_tracking else None
+        with self.engine.lock:
+            self.integrator = integrator
+            self.drift_tracker = drift_tracker
+            self.integration, self.integration_domain, self.number_frames = settings
+
+    def create_result(self):
+        """Return a new result array, a 0-d structured array of :py:attr:`result_dtype`."""
+        return np.zeros((), dtype=self.result_dtype)
+
+    def __call__(self, frame, out):
+        """
+        Analyse *frame*, used as the process of a :py:class:`pysemimaginggui.pipeline.LivePipeline`.
+
+        :param frame: gray frame
+        :param out: result array from :py:meth:`create_result`, it also holds a copy of *frame* for the live view
+        """
+        out["frame"] = frame
+        engine = self.engine
+        with engine.lock:
+            integrator = self.integrator
+            drift_tracker = self.drift_tracker
+            if drift_tracker is not None:
+                spectrum = engine.transform(frame)
+                out["drift"] = drift_tracker.update(spectrum)
+                out["drift_position"] = drift_tracker.position
+                if integrator is not None and self.integration_domain == DOMAIN_IMAGE:
+                    aligned = drift_tracker.align(spectrum)
+                    spectrum = integrator(aligned.view(np.float32)).view(np.complex64)
+            else:
+                if integrator is not None and self.integration_domain == DOMAIN_IMAGE:
+                    frame = integrator(frame)
+                spectrum = engine.transform(frame)
+
+            if integrator is not None and self.integration_domain == DOMAIN_SPECTRUM:
+                power = integrator(engine.compute_power())
+                engine.log_power_kernel.from_power(power, out["log_power"])
+            else:
+                engine.log_power_kernel(spectrum, out["log_power"])
+                power = engine.compute_power(spectrum)
+            self.radial_profile.compute(power, out["radial_profile"])
+            self.focus_metrics.compute(frame, power, out["focus_metrics"])
+        return out
+
+
+class MultiPaneFftAnalysis(object):
+    """
+    Compute the results of :py:class:`FftAnalysis` for each pane of a layout with one batched FFT.
+
+    The frames are the union of the panes, see :py:class:`pysemimaginggui.panes.PaneLayout`. The radial PSD and the
+    focus metrics have one row per pane and the log power spectrum of each pane is written at the place of the pane,
+    so the spectra are displayed like the panes. The drift is not tracked.
+
+    :param layout: :py:class:`pysemimaginggui.panes.PaneLayout`
+    :param str window_type: apodization window, see :py:mod:`pysemimaginggui.apodization`
+    :param str integration: integration method of the frames, see :py:mod:`pysemimaginggui.integration`
+    :param str integration_domain: integration of the frames before the FFT, :py:data:`DOMAIN_IMAGE`, or of the power
+        spectra, :py:data:`DOMAIN_SPECTRUM`
+    :param int number_frames: number of integrated frames
+    :param bool drift_tracking: not used, the drift of the panes is not tracked
+    """
+    def __init__(self, layout, window_type=WINDOW_NONE, integration=INTEGRATION_NONE, integration_domain=DOMAIN_IMAGE,
+                 number_frames=DEFAULT_NUMBER_FRAMES, drift_tracking=False):
+        self.layout = layout
+        self.shape = layout.shape
+        self.engine = BatchPowerSpectrumEngine(layout.number_panes, layout.pane_shape)
+        self.engine.set_window(window_type)
+        self.radial_profile = get_radial_profile(layout.pane_shape)
+        self.focus_metrics = get_focus_metrics(layout.pane_shape)
+        self.integration = None
+        self.integration_domain = None
+        self.number_frames = None
+        self.integrator = None
+        self.drift_tracker = None
+        self.set_integration(integration, integration_domain, number_frames, drift_tracking)
+
+        number_panes = layout.number_panes
+        self.result_dtype = np.dtype([
+            ("log_power", np.float32, self.shape),
+            ("radial_profile", np.float32, (number_panes, self.radial_profile.number_bins)),
+            ("focus_metrics", np.float32, (number_panes, len(METRIC_NAMES))),
+            ("drift", np.float32, (2,)),
+            ("drift_position", np.float32, (2,)),
+            ("frame", np.uint8, self.shape),
+        ])
+
+    def set_window(self, window_type):
+        self.engine.set_window(window_type)
+
+    def set_integration(self, integration, integration_domain=DOMAIN_IMAGE, number_frames=DEFAULT_NUMBER_FRAMES,
+                        drift_tracking=False):
+        """Select the integration of the frames or of the power spectra of the panes, see :py:class:`FftAnalysis`."""
+        settings = (integration, integration_domain, number_frames)
+        if settings == (self.integration, self.integration_domain, self.number_frames):
+            return
+
+        if integration_domain == DOMAIN_SPECTRUM:
+            shape = self.engine.power.shape
+        elif integration_domain == DOMAIN_IMAGE:
+            shape = self.shape
+        else:
+            raise ValueError("Unknown integration domain: {}".format(integration_domain))
+        integrator = create_integrator(integration, shape, number_frames)
+        with self.engine.lock:
+            self.integrator = integrator
+            self.integration, self.integration_domain, self.number_frames = settings
+
+    def create_result(self):
+        """Return a new result array, a 0-d structured array of :py:attr:`result_dtype`."""
+        return np.zeros((), dtype=self.result_dtype)
+
+    def __call__(self, frame, out):
+        """
+        Analyse the panes of *frame*, used as the process of a :py:class:`pysemimaginggui.pipeline.LivePipeline`.
+
+        :param frame: gray frame of the union of the panes
+        :param out: result array from :py:meth:`create_result`
+        """
+        out["frame"] = frame
+        engine = self.engine
+        with engine.lock:
+            integrator = self.integrator
+            if integrator is not None and self.integration_domain == DOMAIN_IMAGE:
+                frame = integrator(frame)
+            panes = self.layout.split(frame)
+            spectrum = engine.transform(panes)
+            power = engine.compute_power(spectrum)
+
+            # The spectra are written in the views of their pane in the log power of the union.
+            log_powers = self.layout.split(out["log_power"])
+            if integrator is not None and self.integration_domain == DOMAIN_SPECTRUM:
+                power = integrator(power)
+                for pane_power, log_power in zip(power, log_powers):
+                    engine.log_power_kernel.from_power(pane_power, log_power)
+            else:
+                for pane_spectrum, log_power in zip(spectrum, log_powers):
+                    engine.log_power_kernel(pane_spectrum, log_power)
+
+            for pane_id, pane in enumerate(panes):
+                self.radial_profile.compute(power[pane_id], out["radial_profile"][pane_id])
+                self.focus_metrics.compute(pane, power[pane_id], out["focus_metrics"][pane_id])
+        return out
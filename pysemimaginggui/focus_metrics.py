@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.focus_metrics
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Live focus, astigmatism and signal-to-noise metrics.
+
+The spectral metrics are computed from the half power spectrum already computed for the live FFT. All the sums over
+the spectrum are weighted sums, so the weights are computed once per region geometry and the sums of a frame are one
+matrix-vector product.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import threading
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+HIGH_FREQUENCY_RATIO = "high_frequency_ratio"
+GRADIENT_VARIANCE = "gradient_variance"
+ELLIPTICITY = "ellipticity"
+ORIENTATION = "orientation_deg"
+SNR = "snr_dB"
+
+#: Order of the metrics in the metrics arrays.
+METRIC_NAMES = [HIGH_FREQUENCY_RATIO, GRADIENT_VARIANCE, ELLIPTICITY, ORIENTATION, SNR]
+
+#: Spatial frequencies (cycles per pixel) above this value are the high frequencies of the sharpness ratio.
+HIGH_FREQUENCY_CUTOFF = 0.15
+#: Band of the signal used for the astigmatism and the SNR.
+SIGNAL_BAND = (0.0, 0.25)
+#: Band near the Nyquist frequency used as the noise floor.
+NOISE_BAND = (0.4, 0.5)
+
+_SUM_TOTAL = 0
+_SUM_HIGH_FREQUENCY = 1
+_SUM_SIGNAL = 2
+_SUM_NOISE = 3
+_SUM_XX = 4
+_SUM_YY = 5
+_SUM_XY = 6
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class FocusMetrics(object):
+    """
+    Compute the focus metrics of a frame and its half power spectrum.
+
+    * high frequency ratio: fraction of the power above :py:data:`HIGH_FREQUENCY_CUTOFF`, increases with sharpness;
+    * gradient variance: variance of the horizontal and vertical pixel differences, increases with sharpness;
+    * ellipticity: 1 - minor/major axis of the spectrum second moments in the signal band, 0 without astigmatism;
+    * orientation: angle of the major axis of the spectrum in degrees, counterclockwise from the x axis;
+    * SNR: ratio of the mean power of the signal band over the noise floor power in dB.
+
+    The DC bins closer than two frequency steps to the origin are not used.
+
+    :param tuple shape: (height, width) of the frames
+    """
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        height, width = self.shape
+
+        frequency_y = np.fft.fftfreq(height)[:, np.newaxis]
+        frequency_x = np.fft.rfftfreq(width)[np.newaxis, :]
+        # The image rows go down, the orientation is measured with y up.
+        frequency_y = -frequency_y
+        radius = np.sqrt(frequency_y ** 2 + frequency_x ** 2)
+
+        weights = np.full(radius.shape, 2.0)
+        weights[:, 0] = 1.0
+        if width % 2 == 0:
+            weights[:, -1] = 1.0
+        weights[radius < 2.0 / min(height, width)] = 0.0
+
+        signal_mask = (radius >= SIGNAL_BAND[0]) & (radius < SIGNAL_BAND[1])
+        noise_mask = (radius >= NOISE_BAND[0]) & (radius <= NOISE_BAND[1])
+        signal_weights = weights * signal_mask
+
+        sum_weights = np.zeros((7,) + radius.shape)
+        sum_weights[_SUM_TOTAL] = weights * (radius <= 0.5)
+        sum_weights[_SUM_HIGH_FREQUENCY] = weights * ((radius >= HIGH_FREQUENCY_CUTOFF) & (radius <= 0.5))
+        sum_weights[_SUM_SIGNAL] = signal_weights
+        sum_weights[_SUM_NOISE] = weights * noise_mask
+        sum_weights[_SUM_XX] = signal_weights * frequency_x ** 2
+        sum_weights[_SUM_YY] = signal_weights * frequency_y ** 2
+        # The opposite frequency of the other half has the same x*y product.
+        sum_weights[_SUM_XY] = signal_weights * frequency_x * frequency_y
+        self._sum_weights = np.ascontiguousarray(sum_weights.reshape(7, -1), dtype=np.float32)
+
+        self._signal_count = max(signal_weights.sum(), 1.0)
+        self._noise_count = max(sum_weights[_SUM_NOISE].sum(), 1.0)
+
+        self._sums = np.zeros(7, dtype=np.float32)
+        self._gradient_x = np.zeros((height, width - 1), dtype=np.float32)
+        self._gradient_y = np.zeros((height - 1, width), dtype=np.float32)
+        self.metrics = np.zeros(len(METRIC_NAMES), dtype=np.float32)
+
+    def compute(self, frame, power, out=None):
+        """
+        Compute the metrics.
+
+        :param frame: gray frame
+        :param power: half power spectrum of the frame, shape (height, width//2 + 1)
+        :param out: output array of ``len(METRIC_NAMES)`` values, :py:attr:`metrics` when ``None``
+        :return: the metrics in the order of :py:data:`METRIC_NAMES`
+        """
+        if out is None:
+            out = self.metrics
+
+        sums = np.dot(self._sum_weights, power.reshape(-1), out=self._sums)
+        total = max(float(sums[_SUM_TOTAL]), 1.0e-30)
+        signal = max(float(sums[_SUM_SIGNAL]), 1.0e-30)
+
+        out[0] = sums[_SUM_HIGH_FREQUENCY] / total
+        out[1] = self._compute_gradient_variance(frame)
+
+        moment_xx = sums[_SUM_XX] / signal
+        moment_yy = sums[_SUM_YY] / signal
+        moment_xy = sums[_SUM_XY] / signal
+        half_trace = 0.5 * (moment_xx + moment_yy)
+        half_difference = np.hypot(0.5 * (moment_xx - moment_yy), moment_xy)
+        major = half_trace + half_difference
+        minor = max(half_trace - half_difference, 0.0)
+        out[2] = 1.0 - np.sqrt(minor / major) if major > 0.0 else 0.0
+        out[3] = 0.5 * np.degrees(np.arctan2(2.0 * moment_xy, moment_xx - moment_yy))
+
+        noise_mean = max(float(sums[_SUM_NOISE]) / self._noise_count, 1.0e-30)
+        signal_mean = signal / self._signal_count
+        out[4] = 10.0 * np.log10(max(signal_mean / noise_mean, 1.0e-30))
+        return out
+
+    def _compute_gradient_variance(self, frame):
+        variance = 0.0
+        for gradient, first, second in ((self._gradient_x, frame[:, 1:], frame[:, :-1]),
+                                        (self._gradient_y, frame[1:, :], frame[:-1, :])):
+            np.subtract(first, second, out=gradient, dtype=np.float32)
+            flat_gradient = gradient.reshape(-1)
+            mean = flat_gradient.sum(dtype=np.float64) / flat_gradient.size
+            variance += float(np.dot(flat_gradient, flat_gradient)) / flat_gradient.size - mean * mean
+        return variance
+
+
+class MetricsHistory(object):
+    """
+    Rolling time series of the metrics in preallocated arrays.
+
+    :param int length: number of samples kept
+    :param int number_metrics: number of metrics per sample
+    """
+    def __init__(self, length=200, number_metrics=len(METRIC_NAMES)):
+        self.length = length
+        self._times = np.zeros(length, dtype=np.float64)
+        self._values = np.zeros((length, number_metrics), dtype=np.float32)
+        self._count = 0
+        self.times = np.zeros(length, dtype=np.float64)
+        self.values = np.zeros((length, number_metrics), dtype=np.float32)
+
+    def __len__(self):
+        return min(self._count, self.length)
+
+    def append(self, timestamp, metrics):
+        slot = self._count % self.length
+        self._times[slot] = timestamp
+        self._values[slot] = metrics
+        self._count += 1
+
+    def get_series(self):
+        """
+        Return the samples in time order.
+
+        :return: times and values, views of :py:attr:`times` and :py:attr:`values` valid until the next call
+        """
+        number_samples = len(self)
+        start = self._count % self.length if self._count > self.length else 0
+        first_part = number_samples - start
+        self.times[:first_part] = self._times[start:number_samples]
+        self.times[first_part:number_samples] = self._times[:start]
+        self.values[:first_part] = self._values[start:number_samples]
+        self.values[first_part:number_samples] = self._values[:start]
+        return self.times[:number_samples], self.values[:number_samples]
+
+
+def get_focus_metrics(shape):
+    """Return the focus metrics of the frame *shape*, created at the first call for each shape."""
+    key = tuple(shape)
+    with _metrics_lock:
+        focus_metrics = _metrics.get(key)
+        if focus_metrics is None:
+            focus_metrics = FocusMetrics(key)
+            _metrics[key] = focus_metrics
+    return focus_metrics
@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.frame_source
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Frame sources used to capture the micrograph region.
+
+Every source returns the region as a 2D ``uint8`` gray NumPy array. The array is a buffer owned by the source and it is
+overwritten by the next :py:meth:`FrameSource.grab`, copy it if the frame has to be kept.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import glob
+import logging
+import time
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_store import FrameStoreReader, FRAME_STORE_EXTENSION
+
+# Globals and constants variables.
+#: Fixed point luminance weights used by PIL for the ``"L"`` mode (ITU-R 601-2).
+_LUMA_WEIGHTS = (19595, 38470, 7471)
+
+BACKEND_AUTO = "auto"
+BACKEND_PYAUTOGUI = "pyautogui"
+BACKEND_MSS = "mss"
+BACKEND_REPLAY = "replay"
+BACKEND_SYNTHETIC = "synthetic"
+
+
+class GrayConverter(object):
+    """
+    Convert RGB(A) pixels to gray ``uint8`` in preallocated buffers.
+
+    The conversion gives the same values as PIL ``convert("L")`` without creating a PIL image.
+
+    :param tuple shape: (height, width) of the frames
+    :param tuple channels: index of the red, green and blue channels in the last axis
+    """
+    def __init__(self, shape, channels=(0, 1, 2)):
+        self.shape = tuple(shape)
+        self.channels = channels
+        self._accumulator = np.empty(self.shape, dtype=np.uint32)
+        self._scratch = np.empty(self.shape, dtype=np.uint32)
+
+    def convert(self, pixels, out):
+        if pixels.ndim == 2:
+            np.copyto(out, pixels, casting="unsafe")
+            return out
+
+        accumulator = self._accumulator
+        scratch = self._scratch
+        red, green, blue = (pixels[..., channel] for channel in self.channels)
+        np.multiply(red, np.uint32(_LUMA_WEIGHTS[0]), out=accumulator)
+        np.multiply(green, np.uint32(_LUMA_WEIGHTS[1]), out=scratch)
+        np.add(accumulator, scratch, out=accumulator)
+        np.multiply(blue, np.uint32(_LUMA_WEIGHTS[2]), out=scratch)
+        np.add(accumulator, scratch, out=accumulator)
+        np.add(accumulator, np.uint32(0x8000), out=accumulator)
+        np.right_shift(accumulator, np.uint32(16), out=accumulator)
+        np.copyto(out, accumulator, casting="unsafe")
+        return out
+
+
+class FrameSource(object):
+    """
+    Base class of the frame sources.
+
+    :param tuple region: (x, y, width, height) of the captured region, same convention as ``pyautogui.screenshot``
+    """
+    name = None
+
+    def __init__(self, region):
+        self.region = None
+        self._frame = None
+        self.set_region(region)
+
+    @property
+    def shape(self):
+        """(height, width) of the frames returned by :py:meth:`grab`."""
+        return self._frame.shape
+
+    def set_region(self, region):
+        x, y, width, height = (int(value) for value in region)
+        self.region = (x, y, width, height)
+        if self._frame is None or self._frame.shape != (height, width):
+            self._frame = np.zeros((height, width), dtype=np.uint8)
+            self._allocate()
+
+    def _allocate(self):
+        """Allocate the buffers that depend on the region size."""
+        pass
+
+    def grab(self):
+        """
+        Capture one frame.
+
+        :return: gray frame, overwritten by the next call
+        :rtype: :py:class:`numpy.ndarray` of ``uint8``
+        """
+        raise NotImplementedError
+
+    def interrupt(self):
+        """Stop a :py:meth:`grab` waiting for a frame, called from another thread."""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class PyAutoGuiFrameSource(FrameSource):
+    """
+    Screen capture with ``pyautogui.screenshot``, the original capture method.
+
+    pyautogui always builds a PIL image, only the gray conversion is done in NumPy.
+    """
+    name = BACKEND_PYAUTOGUI
+
+    def __init__(self, region):
+        import pyautogui
+        self._pyautogui = pyautogui
+        self._converter = None
+        FrameSource.__init__(self, region)
+
+    def _allocate(self):
+        self._converter = GrayConverter(self._frame.shape)
+
+    def grab(self):
+        image = self._pyautogui.screenshot(region=self.region)
+        return self._converter.convert(np.asarray(image), self._frame)
+
+
+class MssFrameSource(FrameSource):
+    """
+    Fast X11 (and Windows/macOS) screen capture with the ``mss`` package.
+
+    The ``mss`` instance is kept for the life of the source, so the display connection and its shared-memory
+    segment (MIT-SHM) are reused for every frame. The BGRA buffer returned by ``mss`` is viewed as a NumPy array
+    without copy. The ``mss`` instance is created by the first :py:meth:`grab`, in the capturing thread, because
+    ``mss`` instances cannot be shared between threads.
+    """
+    name = BACKEND_MSS
+
+    def __init__(self, region):
+        import mss
+        self._mss_module = mss
+        self._sct = None
+        self._monitor = None
+        self._converter = None
+        FrameSource.__init__(self, region)
+
+    def set_region(self, region):
+        FrameSource.set_region(self, region)
+        x, y, width, height = self.region
+        self._monitor = {"left": x, "top": y, "width": width, "height": height}
+
+    def _allocate(self):
+        self._converter = GrayConverter(self._frame.shape, channels=(2, 1, 0))
+
+    def grab(self):
+        if self._sct is None:
+            self._sct = self._mss_module.mss()
+
+        screenshot = self._sct.grab(self._monitor)
+        height, width = self._frame.shape
+        pixels = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+        return self._converter.convert(pixels, self._frame)
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Replay recorded frames, useful without a display.
+
+    The frames of a frame store are replayed at maximum speed, one frame per :py:meth:`grab`, or in real time, where
+    :py:meth:`grab` returns the frame captured at the time elapsed since the first grab, like a screen capture.
+
+    :param frames: folder of images, list of image file paths, ``.npy`` stack file, 3D array (frame, row, column),
+        frame store folder or :py:class:`pysemimaginggui.frame_store.FrameStoreReader`
+    :param tuple region: (x, y, width, height) cropped from each frame, the full frame when ``None``
+    :param bool loop: restart at the first frame after the last one, otherwise raise :py:class:`StopIteration`
+    :param bool realtime: follow the frame timestamps of a frame store, the frames without timestamps are replayed one
+        per :py:meth:`grab`
+    :param clock: monotonic clock in seconds used by the real-time replay
+    """
+    name = BACKEND_REPLAY
+
+    def __init__(self, frames, region=None, loop=True, realtime=False, clock=time.monotonic):
+        self.loop = loop
+        self.realtime = realtime
+        self.clock = clock
+        self.frame_index = 0
+        self.timestamps = None
+        self._stack = None
+        self._file_paths = None
+        self._converter = None
+        self._start_time = None
+
+        if isinstance(frames, str) and frames.rstrip("/\\").endswith(FRAME_STORE_EXTENSION):
+            frames = FrameStoreReader(frames)
+        if isinstance(frames, FrameStoreReader):
+            self._stack = frames
+            self.timestamps = frames.timestamps
+        elif isinstance(frames, np.ndarray):
+            self._stack = frames
+        elif isinstance(frames, (list, tuple)):
+            self._file_paths = list(frames)
+        elif os.path.isdir(frames):
+            self._file_paths = sorted(glob.glob(os.path.join(frames, "*.png")))
+        elif frames.endswith(".npy"):
+            self._stack = np.load(frames, mmap_mode="r")
+        else:
+            self._file_paths = [frames]
+
+        # Only a frame store has the capture times of its frames.
+        self.realtime = realtime and self.timestamps is not None
+
+        if isinstance(self._stack, np.ndarray) and self._stack.ndim == 2:
+            self._stack = self._stack[np.newaxis]
+        if self.number_frames == 0:
+            raise ValueError("No frame to replay from {}".format(frames))
+
+        if region is None:
+            height, width = self._read(0).shape[:2]
+            region = (0, 0, width, height)
+        FrameSource.__init__(self, region)
+
+    @property
+    def number_frames(self):
+        if self._stack is not None:
+            return len(self._stack)
+        return len(self._file_paths)
+
+    def _allocate(self):
+        self._converter = GrayConverter(self._frame.shape)
+
+    def _read(self, index):
+        if self._stack is not None:
+            return self._stack[index]
+
+        from PIL import Image
+        image = Image.open(self._file_paths[index])
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        return np.asarray(image)
+
+    def grab(self):
+        if self.realtime:
+            self._update_realtime_index()
+        elif self.frame_index >= self.number_frames:
+            if not self.loop:
+                raise StopIteration("No more frame to replay")
+            self.frame_index = 0
+
+        x, y, width, height = self.region
+        pixels = self._read(self.frame_index)[y:y + height, x:x + width]
+        if not self.realtime:
+            self.frame_index += 1
+        return self._converter.convert(pixels, self._frame)
+
+    def _update_realtime_index(self):
+        now = self.clock()
+        if self._start_time is None:
+            self._start_time = now - (self.timestamps[self.frame_index] - self.timestamps[0])
+
+        elapsed_s = now - self._start_time
+        if elapsed_s > self.timestamps[-1] - self.timestamps[0] and self.frame_index == self.number_frames - 1:
+            if not self.loop:
+                raise StopIteration("No more frame to replay")
+            self._start_time = now
+            elapsed_s = 0.0
+
+        index = int(np.searchsorted(self.timestamps, self.timestamps[0] + elapsed_s, side="right")) - 1
+        self.frame_index = min(max(index, 0), self.number_frames - 1)
+
+    def close(self):
+        if isinstance(self._stack, FrameStoreReader):
+            self._stack.close()
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Generate a noisy drifting lattice image, used to run the pipeline without a microscope or a display.
+
+    :param tuple region: only the width and height are used
+    :param float period_pixel: lattice period in pixels
+    :param float noise: standard deviation of the Gaussian noise in gray levels
+    :param tuple drift_pixel: lattice shift (x, y) in pixels between frames
+    :param int seed: seed of the random generator
+    """
+    name = BACKEND_SYNTHETIC
+
+    def __init__(self, region, period_pixel=12.0, noise=20.0, drift_pixel=(0.25, 0.1), seed=None):
+        self.period_pixel = period_pixel
+        self.noise = noise
+        self.drift_pixel = drift_pixel
+        self.frame_index = 0
+        self._random = np.random.default_rng(seed)
+        FrameSource.__init__(self, region)
+
+    def _allocate(self):
+        height, width = self._frame.shape
+        wave_number = 2.0 * np.pi / self.period_pixel
+        self._x_phase = (wave_number * np.arange(width, dtype=np.float32))[np.newaxis, :]
+        self._y_phase = (wave_number * np.arange(height, dtype=np.float32))[:, np.newaxis]
+        self._x_wave = np.empty((1, width), dtype=np.float32)
+        self._y_wave = np.empty((height, 1), dtype=np.float32)
+        self._image = np.empty((height, width), dtype=np.float32)
+        self._noise = np.empty((height, width), dtype=np.float32)
+
+    def grab(self):
+        wave_number = 2.0 * np.pi / self.period_pixel
+        np.add(self._x_phase, wave_number * self.drift_pixel[0] * self.frame_index, out=self._x_wave)
+        np.cos(self._x_wave, out=self._x_wave)
+        np.add(self._y_phase, wave_number * self.drift_pixel[1] * self.frame_index, out=self._y_wave)
+        np.cos(self._y_wave, out=self._y_wave)
+        self.frame_index += 1
+
+        image = self._image
+        np.multiply(self._x_wave, self._y_wave, out=image)
+        image *= 50.0
+        image += 128.0
+        if self.noise > 0.0:
+            self._random.standard_normal(dtype=np.float32, out=self._noise)
+            self._noise *= self.noise
+            image += self._noise
+        np.clip(image, 0.0, 255.0, out=image)
+        np.copyto(self._frame, image, casting="unsafe")
+        return self._frame
+
+
+_BACKENDS = {
+    BACKEND_PYAUTOGUI: PyAutoGuiFrameSource,
+    BACKEND_MSS: MssFrameSource,
+    BACKEND_SYNTHETIC: SyntheticFrameSource,
+}
+
+
+def is_backend_available(backend):
+    if backend == BACKEND_PYAUTOGUI:
+        module_name = "pyautogui"
+    elif backend == BACKEND_MSS:
+        module_name = "mss"
+    else:
+        return backend in (BACKEND_AUTO, BACKEND_REPLAY, BACKEND_SYNTHETIC)
+
+    try:
+        __import__(module_name)
+    except Exception as message:
+        logging.debug("Frame source backend %s not available: %s", backend, message)
+        return False
+    return True
+
+
+def get_screen_backends():
+    """Return the names of the backends that can be selected from the GUI."""
+    return [BACKEND_AUTO, BACKEND_MSS, BACKEND_PYAUTOGUI, BACKEND_SYNTHETIC]
+
+
+def create_frame_source(backend, region, **kwargs):
+    """
+    Create a frame source.
+
+    With the ``"auto"`` backend, ``mss`` is used if it is installed, otherwise ``pyautogui``.
+
+    :param str backend: one of ``"auto"``, ``"mss"``, ``"pyautogui"``, ``"replay"`` or ``"synthetic"``
+    :param tuple region: (x, y, width, height) of the captured region
+    :param kwargs: extra parameters of the backend, ``frames`` is required for ``"replay"``
+    :rtype: :py:class:`FrameSource`
+    """
+    if backend == BACKEND_AUTO:
+        backend = BACKEND_MSS if is_backend_available(BACKEND_MSS) else BACKEND_PYAUTOGUI
+
+    logging.debug("create_frame_source: %s %s", backend, region)
+    if backend == BACKEND_REPLAY:
+        frames = kwargs.pop("frames")
+        return ReplayFrameSource(frames, region=region, **kwargs)
+
+    try:
+        frame_source_class = _BACKENDS[backend]
+    except KeyError:
+        raise ValueError("Unknown frame source backend: {}".format(backend))
+
+    return frame_source_class(region, **kwargs)
+
+
+def get_screen_region(backend=BACKEND_AUTO):
+    """Return the (x, y, width, height) region of the whole screen, all the monitors with ``mss``."""
+    if backend == BACKEND_AUTO:
+        backend = BACKEND_MSS if is_backend_available(BACKEND_MSS) else BACKEND_PYAUTOGUI
+
+    if backend == BACKEND_MSS:
+        import mss
+        with mss.mss() as sct:
+            monitor = sct.monitors[0]
+        return monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+
+    import pyautogui
+    width, height = pyautogui.size()
+    return 0, 0, width, height
+
+
+def grab_screen(backend=BACKEND_AUTO):
+    """
+    Grab the whole screen once.
+
+    :return: gray screen image and its (x, y, width, height) region
+    """
+    region = get_screen_region(backend)
+    with create_frame_source(backend, region) as frame_source:
+        screen = frame_source.grab()
+    return screen, region
@@ -0,0 +1,475 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.frame_store
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Lossless store of the captured frames.
+
+A frame store is a folder with:
+
+* ``meta.json``: frame shape and data type, chunk size, compression and number of frames;
+* ``timestamps.bin``: capture time of each frame in seconds, little-endian ``float64`` appended frame by frame;
+* ``offsets.bin``: byte offset and size of each frame in its chunk file, appended chunk by chunk;
+* ``chunk_000000.npy``, ...: chunks of :py:data:`DEFAULT_CHUNK_SIZE` frames, memory-mapped ``.npy`` stacks written
+  in place, or chunks of compressed frames (``.zst``, ``.blosc`` or ``.zlib``) written in one sequential write.
+
+The frames are compressed one by one, so :py:class:`FrameStoreReader` reads and decompresses only the frames
+requested. The ``.npy`` chunks always have the chunk size, the frames after the number of frames of the last chunk are
+unused. The number of frames is also the length of the index files, which stay valid if the acquisition is
+interrupted.
+
+The frames are copied in the current chunk by the capture thread; full chunks are flushed or compressed and written
+by a background thread, so the capture does not wait for the disk.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+# Third party modules.
+import numpy as np
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+try:
+    import blosc
+except ImportError:  # pragma: no cover
+    blosc = None
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+FORMAT_VERSION = 1
+FRAME_STORE_EXTENSION = ".frames"
+META_FILE_NAME = "meta.json"
+TIMESTAMPS_FILE_NAME = "timestamps.bin"
+TIMESTAMP_DTYPE = np.dtype("<f8")
+OFFSETS_FILE_NAME = "offsets.bin"
+OFFSET_DTYPE = np.dtype([("offset", "<u8"), ("size", "<u8")])
+#: Number of frames per chunk file, 256 frames of 800x560 pixels are 115 MB.
+DEFAULT_CHUNK_SIZE = 256
+#: Number of full chunks waiting for the background writer before the capture waits.
+MAXIMUM_PENDING_CHUNKS = 2
+#: Maximum number of chunk files kept open by a :py:class:`FrameStoreReader`.
+CHUNK_CACHE_SIZE = 8
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_BLOSC = "blosc"
+COMPRESSION_ZLIB = "zlib"
+
+_CHUNK_EXTENSIONS = {
+    COMPRESSION_NONE: ".npy",
+    COMPRESSION_ZSTD: ".zst",
+    COMPRESSION_BLOSC: ".blosc",
+    COMPRESSION_ZLIB: ".zlib",
+}
+
+
+def get_compressions():
+    """Return the compressions available with the installed modules."""
+    compressions = [COMPRESSION_NONE]
+    if zstandard is not None:
+        compressions.append(COMPRESSION_ZSTD)
+    if blosc is not None:
+        compressions.append(COMPRESSION_BLOSC)
+    compressions.append(COMPRESSION_ZLIB)
+    return compressions
+
+
+def get_default_compression():
+    """Return the fastest lossless compression available, ``zstd`` or ``blosc``, otherwise no compression."""
+    for compression in (COMPRESSION_ZSTD, COMPRESSION_BLOSC):
+        if compression in get_compressions():
+            return compression
+    return COMPRESSION_NONE
+
+
+def compress(data, compression, item_size=1):
+    """Compress the bytes-like *data* of a chunk."""
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=1).compress(data)
+    elif compression == COMPRESSION_BLOSC:
+        return blosc.compress(data, typesize=item_size, cname="lz4", clevel=5, shuffle=blosc.SHUFFLE)
+    elif compression == COMPRESSION_ZLIB:
+        return zlib.compress(data, 1)
+    raise ValueError("Unknown compression: {}".format(compression))
+
+
+def decompress(data, compression):
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif compression == COMPRESSION_BLOSC:
+        return blosc.decompress(data)
+    elif compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    raise ValueError("Unknown compression: {}".format(compression))
+
+
+def get_chunk_file_path(path, chunk_id, compression):
+    return os.path.join(path, "chunk_{:06d}{}".format(chunk_id, _CHUNK_EXTENSIONS[compression]))
+
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE_NAME), "r") as meta_file:
+        return json.load(meta_file)
+
+
+class FrameStoreWriter(object):
+    """
+    Append frames and their timestamps to a frame store folder.
+
+    :param str path: frame store folder, created if needed, it must not contain a frame store
+    :param tuple shape: (height, width) of the frames
+    :param dtype: data type of the frames
+    :param int chunk_size: number of frames per chunk file
+    :param str compression: one of :py:func:`get_compressions`
+    """
+    def __init__(self, path, shape, dtype=np.uint8, chunk_size=DEFAULT_CHUNK_SIZE, compression=COMPRESSION_NONE):
+        if compression not in get_compressions():
+            raise ValueError("Compression not available: {}".format(compression))
+
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.compression = compression
+
+        self.frame_count = 0
+        self._compressed_bytes = 0
+        self._chunk = None
+        self._chunk_id = 0
+        self._timestamps_file = None
+        self._offsets_file = None
+        self._free_chunks = None
+        self._pending_chunks = None
+        self._thread = None
+        self.error = None
+
+    @property
+    def is_open(self):
+        return self._timestamps_file is not None
+
+    @property
+    def bytes_written(self):
+        """Size of the frames in the store, the compressed size of the written chunks with a compression."""
+        if self.compression == COMPRESSION_NONE:
+            return self.frame_count * self.dtype.itemsize * int(np.prod(self.shape))
+        return self._compressed_bytes
+
+    def get_meta(self):
+        return {
+            "version": FORMAT_VERSION,
+            "shape": list(self.shape),
+            "dtype": self.dtype.str,
+            "chunk_size": self.chunk_size,
+            "compression": self.compression,
+            "number_frames": self.frame_count,
+        }
+
+    def open(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        if os.path.isfile(os.path.join(self.path, META_FILE_NAME)):
+            raise IOError("A frame store already exists in {}".format(self.path))
+
+        self.frame_count = 0
+        self._compressed_bytes = 0
+        self._chunk_id = 0
+        self.error = None
+        self._write_meta()
+        self._timestamps_file = open(os.path.join(self.path, TIMESTAMPS_FILE_NAME), "wb")
+        self._offsets_file = open(os.path.join(self.path, OFFSETS_FILE_NAME), "wb")
+
+        self._pending_chunks = queue.Queue(MAXIMUM_PENDING_CHUNKS)
+        if self.compression != COMPRESSION_NONE:
+            # The chunk buffers are reused, a new buffer is only taken when the writer released one.
+            self._free_chunks = queue.Queue()
+            for _chunk_id in range(MAXIMUM_PENDING_CHUNKS + 1):
+                self._free_chunks.put(np.empty((self.chunk_size,) + self.shape, dtype=self.dtype))
+        self._thread = threading.Thread(target=self._write_loop, name="frame_store")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, frame, timestamp):
+        """
+        Copy one frame in the store.
+
+        :param frame: frame of :py:attr:`shape`
+        :param float timestamp: capture time in seconds
+        """
+        if self.error is not None:
+            raise IOError("Frame store writer error: {}".format(self.error))
+        if frame.shape != self.shape:
+            raise ValueError("Frame shape {} different from the store shape {}".format(frame.shape, self.shape))
+
+        if self._chunk is None:
+            self._chunk = self._new_chunk()
+        slot = self.frame_count % self.chunk_size
+        self._chunk[slot] = frame
+        self._timestamps_file.write(np.array(timestamp, dtype=TIMESTAMP_DTYPE).tobytes())
+        self.frame_count += 1
+
+        if slot == self.chunk_size - 1:
+            self._pending_chunks.put((self._chunk_id, self._chunk, self.chunk_size))
+            self._chunk = None
+            self._chunk_id += 1
+
+    def close(self):
+        """Write the last chunk, wait for the background writer and update the number of frames."""
+        if self._timestamps_file is None:
+            return
+
+        if self._chunk is not None:
+            self._pending_chunks.put((self._chunk_id, self._chunk, self.frame_count % self.chunk_size))
+            self._chunk = None
+        self._pending_chunks.put(None)
+        self._thread.join()
+        self._thread = None
+        self._free_chunks = None
+
+        self._timestamps_file.close()
+        self._timestamps_file = None
+        self._offsets_file.close()
+        self._offsets_file = None
+        self._write_meta()
+        logging.info("Frame store %s: %i frames", self.path, self.frame_count)
+        if self.error is not None:
+            raise IOError("Frame store writer error: {}".format(self.error))
+
+    def _new_chunk(self):
+        if self.compression == COMPRESSION_NONE:
+            file_path = get_chunk_file_path(self.path, self._chunk_id, self.compression)
+            return np.lib.format.open_memmap(file_path, mode="w+", dtype=self.dtype,
+                                             shape=(self.chunk_size,) + self.shape)
+        return self._free_chunks.get()
+
+    def _write_meta(self):
+        file_path = os.path.join(self.path, META_FILE_NAME)
+        with open(file_path + ".tmp", "w") as meta_file:
+            json.dump(self.get_meta(), meta_file, indent=2)
+        os.replace(file_path + ".tmp", file_path)
+
+    def _write_loop(self):
+        while True:
+            item = self._pending_chunks.get()
+            if item is None:
+                break
+            chunk_id, chunk, number_frames = item
+            try:
+                self._write_chunk(chunk_id, chunk, number_frames)
+            except Exception as message:
+                logging.exception("Frame store write error")
+                self.error = message
+            if self._free_chunks is not None:
+                self._free_chunks.put(chunk)
+            del item, chunk
+
+    def _write_chunk(self, chunk_id, chunk, number_frames):
+        frame_size = chunk[0].nbytes
+        offsets = np.zeros(number_frames, dtype=OFFSET_DTYPE)
+        if self.compression == COMPRESSION_NONE:
+            chunk.flush()
+            offsets["offset"] = chunk.offset + frame_size * np.arange(number_frames)
+            offsets["size"] = frame_size
+        else:
+            frames_data = [compress(memoryview(frame.reshape(-1)).cast("B"), self.compression, self.dtype.itemsize)
+                           for frame in chunk[:number_frames]]
+            offsets["size"] = [len(frame_data) for frame_data in frames_data]
+            offsets["offset"][1:] = np.cumsum(offsets["size"][:-1])
+            file_path = get_chunk_file_path(self.path, chunk_id, self.compression)
+            with open(file_path, "wb") as chunk_file:
+                chunk_file.write(b"".join(frames_data))
+
+        self._offsets_file.write(offsets.tobytes())
+        self._offsets_file.flush()
+        if self.compression != COMPRESSION_NONE:
+            self._compressed_bytes += int(offsets["size"].sum())
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class FrameStoreReader(object):
+    """
+    Random access to the frames of a frame store.
+
+    The index files and the ``.npy`` chunks are memory-mapped, a frame is only read when it is accessed. Only the
+    :py:data:`CHUNK_CACHE_SIZE` chunks used last are kept open, a long acquisition does not exhaust the file
+    descriptors::
+
+        stack = FrameStoreReader("acquisition.frames")
+        frame = stack[1000]
+        frames = stack[1000:1200:10]
+        frame = stack[stack.find_frame(12.5)]
+
+    :param str path: frame store folder
+    """
+    def __init__(self, path):
+        self.path = path
+        meta = read_meta(path)
+        self.shape = tuple(meta["shape"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.chunk_size = meta["chunk_size"]
+        self.compression = meta["compression"]
+
+        timestamps = self._map_index(TIMESTAMPS_FILE_NAME, TIMESTAMP_DTYPE)
+        offsets = self._map_index(OFFSETS_FILE_NAME, OFFSET_DTYPE)
+        # The last frames of an interrupted acquisition are only in the timestamps.
+        number_frames = min(len(timestamps), len(offsets))
+        self.timestamps = timestamps[:number_frames]
+        self.offsets = offsets[:number_frames]
+
+        self._chunks = OrderedDict()
+        self._chunk_files = OrderedDict()
+
+    def _map_index(self, file_name, dtype):
+        file_path = os.path.join(self.path, file_name)
+        if os.path.getsize(file_path) < dtype.itemsize:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def duration_s(self):
+        if len(self) == 0:
+            return 0.0
+        return float(self.timestamps[-1] - self.timestamps[0])
+
+    def __getitem__(self, key):
+        """
+        Return a frame for an integer index, a new stack of the selected frames for a slice or a list of indices.
+
+        The frame of an uncompressed store is a read-only view of the memory-mapped chunk.
+        """
+        if isinstance(key, slice):
+            indices = range(*key.indices(len(self)))
+        elif isinstance(key, (list, tuple, np.ndarray)):
+            indices = key
+        else:
+            return self.get_frame(key)
+
+        frames = np.empty((len(indices),) + self.shape, dtype=self.dtype)
+        for frame_id, index in enumerate(indices):
+            self.get_frame(index, frames[frame_id])
+        return frames
+
+    def get_frame(self, index, out=None):
+        """
+        Read one frame.
+
+        :param int index: frame index, negative values count from the end
+        :param out: array receiving the frame, a new array or a view when ``None``
+        """
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Frame index out of range: {}".format(index))
+
+        chunk_id, slot = divmod(index, self.chunk_size)
+        if self.compression == COMPRESSION_NONE:
+            frame = self._get_chunk(chunk_id)[slot]
+        else:
+            offset, size = self.offsets[index]
+            chunk_file = self._get_chunk_file(chunk_id)
+            chunk_file.seek(int(offset))
+            data = decompress(chunk_file.read(int(size)), self.compression)
+            frame = np.frombuffer(data, dtype=self.dtype).reshape(self.shape)
+
+        if out is None:
+            return frame
+        np.copyto(out, frame)
+        return out
+
+    def find_frame(self, time_s, relative=True):
+        """
+        Return the index of the frame captured at *time_s*, the last frame captured before it.
+
+        :param float time_s: time in seconds
+        :param bool relative: *time_s* is relative to the first frame, otherwise it is a capture timestamp
+        """
+        if len(self) == 0:
+            raise IndexError("No frame in {}".format(self.path))
+        if relative:
+            time_s += self.timestamps[0]
+        index = int(np.searchsorted(self.timestamps, time_s, side="right")) - 1
+        return min(max(index, 0), len(self) - 1)
+
+    def _get_chunk(self, chunk_id):
+        chunk = self._chunks.get(chunk_id)
+        if chunk is not None:
+            self._chunks.move_to_end(chunk_id)
+            return chunk
+
+        chunk = np.load(get_chunk_file_path(self.path, chunk_id, self.compression), mmap_mode="r")
+        self._chunks[chunk_id] = chunk
+        # The map of an evicted chunk is closed with the last view of its frames.
+        while len(self._chunks) > CHUNK_CACHE_SIZE:
+            self._chunks.popitem(last=False)
+        return chunk
+
+    def _get_chunk_file(self, chunk_id):
+        chunk_file = self._chunk_files.get(chunk_id)
+        if chunk_file is not None:
+            self._chunk_files.move_to_end(chunk_id)
+            return chunk_file
+
+        chunk_file = open(get_chunk_file_path(self.path, chunk_id, self.compression), "rb")
+        self._chunk_files[chunk_id] = chunk_file
+        while len(self._chunk_files) > CHUNK_CACHE_SIZE:
+            _chunk_id, evicted_file = self._chunk_files.popitem(last=False)
+            evicted_file.close()
+        return chunk_file
+
+    def close(self):
+        for chunk_file in self._chunk_files.values():
+            chunk_file.close()
+        self._chunk_files = OrderedDict()
+        self._chunks = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.integration
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Live integration of the frames.
+
+The fast scan images are noisy. The integrators average the successive frames, or their power spectra, in a
+preallocated ``float32`` accumulator updated in place, without allocation per frame:
+
+* :py:class:`RunningMeanIntegrator`: mean of the last N frames;
+* :py:class:`ExponentialIntegrator`: exponential moving average;
+* :py:class:`KalmanIntegrator`: recursive filter with a gain for each pixel, which follows the pixels that change
+  more than the noise, e.g. when the stage moves, and averages the others.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+INTEGRATION_NONE = "none"
+INTEGRATION_RUNNING_MEAN = "running mean"
+INTEGRATION_EXPONENTIAL = "exponential"
+INTEGRATION_KALMAN = "kalman"
+
+#: Integration of the frames, the spectrum of the averaged image.
+DOMAIN_IMAGE = "image"
+#: Integration of the power spectra, the average of the spectra of the frames.
+DOMAIN_SPECTRUM = "spectrum"
+
+DEFAULT_NUMBER_FRAMES = 8
+
+
+def get_integration_methods():
+    return [INTEGRATION_NONE, INTEGRATION_RUNNING_MEAN, INTEGRATION_EXPONENTIAL, INTEGRATION_KALMAN]
+
+
+def get_integration_domains():
+    return [DOMAIN_IMAGE, DOMAIN_SPECTRUM]
+
+
+class FrameIntegrator(object):
+    """
+    Base class of the integrators.
+
+    :param tuple shape: shape of the integrated arrays
+    """
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.accumulator = np.zeros(self.shape, dtype=np.float32)
+        self.count = 0
+
+    def reset(self):
+        """Restart the integration at the next frame."""
+        self.count = 0
+
+    def __call__(self, frame):
+        """
+        Add *frame* to the integration.
+
+        :return: the integrated frame, :py:attr:`accumulator` overwritten by the next call
+        """
+        if self.count == 0:
+            self._start(frame)
+        else:
+            self._update(frame)
+        self.count += 1
+        return self.accumulator
+
+    def _start(self, frame):
+        np.copyto(self.accumulator, frame, casting="unsafe")
+
+    def _update(self, frame):
+        raise NotImplementedError
+
+
+class RunningMeanIntegrator(FrameIntegrator):
+    """
+    Mean of the last *number_frames* frames.
+
+    The sum is updated with the new frame and the oldest one, kept in a ring of preallocated frames. The sum is
+    recomputed from the ring once per turn so the ``float32`` rounding errors do not accumulate.
+
+    :param tuple shape: shape of the integrated arrays
+    :param int number_frames: number of averaged frames
+    """
+    def __init__(self, shape, number_frames=DEFAULT_NUMBER_FRAMES):
+        if number_frames < 1:
+            raise ValueError("The number of averaged frames must be at least 1")
+        FrameIntegrator.__init__(self, shape)
+        self.number_frames = number_frames
+        self._frames = np.zeros((number_frames,) + self.shape, dtype=np.float32)
+        self._sum = np.zeros(self.shape, dtype=np.float32)
+
+    def _start(self, frame):
+        self._sum[...] = 0.0
+        self._update(frame)
+
+    def _update(self, frame):
+        slot = self.count % self.number_frames
+        oldest = self._frames[slot]
+        if self.count >= self.number_frames:
+            np.subtract(self._sum, oldest, out=self._sum)
+        np.copyto(oldest, frame, casting="unsafe")
+        if slot == self.number_frames - 1:
+            np.sum(self._frames, axis=0, out=self._sum)
+        else:
+            np.add(self._sum, oldest, out=self._sum)
+
+        number_frames = min(self.count + 1, self.number_frames)
+        np.multiply(self._sum, np.float32(1.0 / number_frames), out=self.accumulator)
+
+
+class ExponentialIntegrator(FrameIntegrator):
+    """
+    Exponential moving average, ``accumulator += alpha * (frame - accumulator)``.
+
+    :param tuple shape: shape of the integrated arrays
+    :param float alpha: weight of the new frame, ``2 / (N + 1)`` gives the same noise as the mean of N frames
+    """
+    def __init__(self, shape, alpha=2.0 / (DEFAULT_NUMBER_FRAMES + 1)):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("The weight of the new frame must be in (0, 1]: {}".format(alpha))
+        FrameIntegrator.__init__(self, shape)
+        self.alpha = alpha
+        self._scratch = np.zeros(self.shape, dtype=np.float32)
+
+    def _update(self, frame):
+        np.subtract(frame, self.accumulator, out=self._scratch, casting="unsafe")
+        np.multiply(self._scratch, np.float32(self.alpha), out=self._scratch)
+        np.add(self.accumulator, self._scratch, out=self.accumulator)
+
+
+class KalmanIntegrator(FrameIntegrator):
+    """
+    Recursive (Kalman) filter of each pixel with a constant value model.
+
+    Each pixel has an estimate and its variance. The variance grows by the process noise at each frame and the gain of
+    the new frame is ``variance / (variance + measurement_noise)``. When a pixel differs from its estimate by more than
+    *reset_sigma* times the expected deviation, its variance is reset to the measurement noise, so it follows the
+    change within a few frames while the static pixels keep averaging. The smallest gain is about
+    ``sqrt(process_noise / measurement_noise)``.
+
+    :param tuple shape: shape of the integrated arrays
+    :param float alpha: smallest gain, the weight of the new frame of the equivalent exponential average
+    :param float measurement_noise: variance of the noise of a frame, estimated from the difference of the first two
+        frames when ``None``
+    :param float reset_sigma: deviation in standard deviations that resets the variance of a pixel
+    """
+    def __init__(self, shape, alpha=2.0 / (DEFAULT_NUMBER_FRAMES + 1), measurement_noise=None, reset_sigma=3.0):
+        FrameIntegrator.__init__(self, shape)
+        self.alpha = alpha
+        self.measurement_noise = measurement_noise
+        self.reset_sigma = reset_sigma
+        self.variance = np.zeros(self.shape, dtype=np.float32)
+        self._innovation = np.zeros(self.shape, dtype=np.float32)
+        self._square = np.zeros(self.shape, dtype=np.float32)
+        self._scratch = np.zeros(self.shape, dtype=np.float32)
+        self._reset = np.zeros(self.shape, dtype=bool)
+        self._noise = measurement_noise
+
+    def _start(self, frame):
+        FrameIntegrator._start(self, frame)
+        self._noise = self.measurement_noise
+        self.variance[...] = self._noise if self._noise is not None else 0.0
+
+    def _update(self, frame):
+        variance = self.variance
+        innovation = self._innovation
+        scratch = self._scratch
+
+        np.subtract(frame, self.accumulator, out=innovation, casting="unsafe")
+        np.multiply(innovation, innovation, out=self._square)
+        if self._noise is None:
+            # The difference of two frames has twice the variance of the noise.
+            self._noise = max(float(self._square.mean()) / 2.0, 1.0e-6)
+            variance[...] = self._noise
+        noise = np.float32(self._noise)
+
+        np.add(variance, np.float32(self._noise * self.alpha * self.alpha), out=variance)
+        np.add(variance, noise, out=scratch)
+        np.multiply(scratch, np.float32(self.reset_sigma * self.reset_sigma), out=scratch)
+        np.greater(self._square, scratch, out=self._reset)
+        np.copyto(variance, noise, where=self._reset)
+
+        # Gain, then estimate and variance update.
+        np.add(variance, noise, out=scratch)
+        np.divide(variance, scratch, out=scratch)
+        np.multiply(innovation, scratch, out=innovation)
+        np.add(self.accumulator, innovation, out=self.accumulator)
+        np.subtract(np.float32(1.0), scratch, out=scratch)
+        np.multiply(variance, scratch, out=variance)
+
+
+def create_integrator(method, shape, number_frames=DEFAULT_NUMBER_FRAMES):
+    """
+    Create an integrator.
+
+    :param str method: one of :py:func:`get_integration_methods`
+    :param tuple shape: shape of the integrated arrays
+    :param int number_frames: number of averaged frames, or the equivalent for the exponential and Kalman filters
+    :return: the integrator, ``None`` for :py:data:`INTEGRATION_NONE`
+    """
+    if method == INTEGRATION_NONE:
+        return None
+    if method == INTEGRATION_RUNNING_MEAN:
+        return RunningMeanIntegrator(shape, number_frames)
+    if method == INTEGRATION_EXPONENTIAL:
+        return ExponentialIntegrator(shape, 2.0 / (number_frames + 1))
+    if method == INTEGRATION_KALMAN:
+        return KalmanIntegrator(shape, 2.0 / (number_frames + 1))
+    raise ValueError("Unknown integration method: {}".format(method))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.jobs
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Background jobs of the GUI.
+
+The long operations, e.g. the search of the PC-SEM window and the video recording, run in worker threads so the Tk
+event loop keeps running. The workers only put their progress and their end in a thread-safe queue; the Tk thread
+polls the queue with ``root.after`` and calls the callbacks of the jobs, the only place where the widgets are updated.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import logging
+import threading
+from collections import OrderedDict
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+EVENT_PROGRESS = "progress"
+EVENT_DONE = "done"
+
+
+class Job(object):
+    """
+    Function run by a worker thread.
+
+    The function is called as ``function(job)``, its return value is :py:attr:`result`. It reports its progress with
+    :py:meth:`report` and returns early when :py:attr:`is_cancelled`, e.g. by passing :py:attr:`cancel_event` as the
+    stop event of a recording.
+
+    :param str name: name of the job, only one job of a name runs at a time in a :py:class:`JobManager`
+    :param function: function of the job
+    :param events: queue of the progress and end events
+    :param on_progress: called by :py:meth:`JobManager.poll` as ``on_progress(job, text, fraction)``
+    :param on_done: called by :py:meth:`JobManager.poll` as ``on_done(job)`` after the end of the function
+    """
+    def __init__(self, name, function, events, on_progress=None, on_done=None):
+        self.name = name
+        self.function = function
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self._events = events
+        self._thread = None
+
+    @property
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def report(self, text, fraction=None):
+        """
+        Report the progress, called by the function of the job.
+
+        :param str text: status of the job
+        :param float fraction: completed fraction between 0 and 1, ``None`` when unknown
+        """
+        self._events.put((self, EVENT_PROGRESS, (text, fraction)))
+
+    def _run(self):
+        try:
+            self.result = self.function(self)
+        except Exception as message:
+            logging.exception("Job %s error", self.name)
+            self.error = message
+        finally:
+            self._events.put((self, EVENT_DONE, None))
+
+
+class JobManager(object):
+    """
+    Start the background jobs and dispatch their events in the Tk thread.
+
+    A job is running from :py:meth:`start` until :py:meth:`poll` handles its end, so the state seen by the GUI does
+    not change between two polls.
+    """
+    def __init__(self):
+        self.events = queue.Queue()
+        self.jobs = OrderedDict()
+
+    @property
+    def running_names(self):
+        return list(self.jobs)
+
+    def is_running(self, name):
+        return name in self.jobs
+
+    def get(self, name):
+        """Return the running job *name* or ``None``."""
+        return self.jobs.get(name)
+
+    def start(self, name, function, on_progress=None, on_done=None):
+        """
+        Start a job, see :py:class:`Job`.
+
+        :return: the started :py:class:`Job`
+        """
+        if name in self.jobs:
+            raise ValueError("Job already running: {}".format(name))
+        job = Job(name, function, self.events, on_progress, on_done)
+        self.jobs[name] = job
+        job.start()
+        return job
+
+    def cancel(self, name=None):
+        """Cancel the job *name*, all the running jobs when ``None``."""
+        for job in list(self.jobs.values()):
+            if name is None or job.name == name:
+                job.cancel()
+
+    def poll(self):
+        """
+        Call the callbacks of the queued events, called by the Tk thread.
+
+        Only the last progress of each job is reported, the progress of a finished job is not.
+
+        :return: number of handled events
+        """
+        progresses = OrderedDict()
+        finished_jobs = []
+        number_events = 0
+        while True:
+            try:
+                job, event, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            number_events += 1
+            if event == EVENT_PROGRESS:
+                progresses[job] = value
+            else:
+                finished_jobs.append(job)
+
+        for job, (text, fraction) in progresses.items():
+            if job not in finished_jobs and job.on_progress is not None:
+                job.on_progress(job, text, fraction)
+        for job in finished_jobs:
+            if self.jobs.get(job.name) is job:
+                del self.jobs[job.name]
+            if job.on_done is not None:
+                job.on_done(job)
+        return number_events
+
+    def stop(self, timeout=None):
+        """Cancel all the jobs and wait for their end, e.g. when the GUI is closed."""
+        jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel()
+        for job in jobs:
+            job.join(timeout)
+        self.poll()
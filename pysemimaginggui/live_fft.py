@@ -32,16 +32,19 @@ import logging
 import os.path
 
 # Third party modules.
-import pyautogui
 from PIL import Image, ImageOps
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from scipy.fftpack import fft2, fftshift
 
 # Local modules.
 
 # Project modules.
+from pysemimaginggui.frame_source import create_frame_source, BACKEND_AUTO, BACKEND_REPLAY
+from pysemimaginggui.power_spectrum import get_power_spectrum_engine
+from pysemimaginggui.apodization import WINDOW_NONE
+from pysemimaginggui.locator import locate_on_screen
+from pysemimaginggui.display import AutoContrast
 
 # Globals and constants variables.
 
@@ -49,54 +52,44 @@ from scipy.fftpack import fft2, fftshift
 def find_micrograph():
     micrograph_location = (20, 200)
     path = os.path.join("data/images", "SU8230")
-    file_path = os.path.join(path, "pc_sem_su8230_pause.png")
-    logging.debug("pause file_path: %s (is file %s)", file_path, os.path.isfile(file_path))
-    pause_location = pyautogui.locateOnScreen(file_path)
-    logging.debug(pause_location)
-    if pause_location is not None:
-        micrograph_location = (pause_location[0], pause_location[1]+pause_location[3])
-
-    file_path = os.path.join(path, "pc_sem_su8230_run.png")
-    logging.debug("pause file_path: %s (is file %s)", file_path, os.path.isfile(file_path))
-    run_location = pyautogui.locateOnScreen(file_path)
-    logging.debug(run_location)
-    if run_location is not None:
-        micrograph_location = (run_location[0], run_location[1]+run_location[3])
+    file_paths = [os.path.join(path, "pc_sem_su8230_pause.png"), os.path.join(path, "pc_sem_su8230_run.png")]
+    logging.debug("file_paths: %s", file_paths)
+    location = locate_on_screen(file_paths)
+    logging.debug(location)
+    if location is not None:
+        micrograph_location = (location.left, location.top+location.height)
 
     logging.info(micrograph_location)
     return micrograph_location
 
 
-def display_fft(micrograph_location):
+def display_fft(micrograph_location, frame_source=None, window_type=WINDOW_NONE):
     fig = plt.figure()
 
-    top_pixel = micrograph_location[0]+2
-    left_pixel = micrograph_location[1]+2
-    width_pixel = 800-10
-    height_pixel = 560-10
-    micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-    micrograph_image = micrograph_image.convert("L")
-    micrograph_image = fft2(micrograph_image)
-    micrograph_image = fftshift(micrograph_image)
-    micrograph_image = np.abs(micrograph_image) ** 2
-    micrograph_image = np.log10(micrograph_image)
-
-    fft_image = plt.imshow(micrograph_image, animated=True, cmap=plt.cm.Greys)
+    if frame_source is None:
+        top_pixel = micrograph_location[0]+2
+        left_pixel = micrograph_location[1]+2
+        width_pixel = 800-10
+        height_pixel = 560-10
+        frame_source = create_frame_source(BACKEND_AUTO, (top_pixel, left_pixel, width_pixel, height_pixel))
+    fig.canvas.mpl_connect('close_event', lambda event: frame_source.close())
+
+    power_spectrum_engine = get_power_spectrum_engine(frame_source.shape, window_type=window_type)
+    micrograph_image = power_spectrum_engine.compute_log_power(frame_source.grab())
+    auto_contrast = AutoContrast()
+    minimum, maximum = auto_contrast.update(micrograph_image)
+
+    fft_image = plt.imshow(micrograph_image, animated=True, cmap=plt.cm.Greys, vmin=minimum, vmax=maximum)
     plt.xticks([])
     plt.yticks([])
 
     plt.tight_layout()
 
     def updatefig(*args):
-        micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-        micrograph_image = micrograph_image.convert("L")
-
-        micrograph_image = fft2(micrograph_image)
-        micrograph_image = fftshift(micrograph_image)
-        micrograph_image = np.abs(micrograph_image) ** 2
-        micrograph_image = np.log10(micrograph_image)
+        micrograph_image = power_spectrum_engine.compute_log_power(frame_source.grab())
 
         fft_image.set_array(micrograph_image)
+        fft_image.set_clim(*auto_contrast.update(micrograph_image))
         return fft_image,
 
     interval_ms = 20
@@ -105,11 +98,19 @@ def display_fft(micrograph_location):
     plt.show()
 
 
-def run_live_fft():
-    micrograph_location = find_micrograph()
+def run_live_fft(frame_source=None, window_type=WINDOW_NONE):
+    if frame_source is None:
+        micrograph_location = find_micrograph()
+    else:
+        micrograph_location = None
 
-    display_fft(micrograph_location)
+    display_fft(micrograph_location, frame_source, window_type)
 
 
 if __name__ == "__main__":
-    run_live_fft()
+    import sys
+    if len(sys.argv) > 1:
+        # Replay a recorded frame store in real time, e.g. python -m pysemimaginggui.live_fft acquisition.frames
+        run_live_fft(create_frame_source(BACKEND_REPLAY, None, frames=sys.argv[1], realtime=True))
+    else:
+        run_live_fft()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.live_view
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Persistent live view embedded in the main window.
+
+The micrograph, its FFT and the plots of the radial PSD, the focus metrics and the drift are side by side in one Tk
+frame created once per session. They are all fed by the results of one
+:py:class:`pysemimaginggui.pipeline.LivePipeline`, each result holds the captured frame and its analysis. The images
+are rendered with :py:class:`pysemimaginggui.display.TkImageView`, or in the matplotlib figure when the Tk display is
+not selected. The figure is drawn once, then only its animated artists are redrawn over the saved background
+(blitting).
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import six
+if six.PY3:
+    from tkinter import ttk
+    from tkinter import N, W, E, S
+elif six.PY2:  # pragma: no cover
+    import ttk
+    from Tkinter import N, W, E, S
+
+# Third party modules.
+import numpy as np
+from matplotlib.figure import Figure
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.focus_metrics import MetricsHistory, METRIC_NAMES, HIGH_FREQUENCY_RATIO, ELLIPTICITY, SNR
+from pysemimaginggui.display import LutRenderer, TkImageView, AutoContrast, get_default_live_display, DISPLAY_TK
+
+# Globals and constants variables.
+#: Initial range of the cumulative drift plot, and of the drift vector of one frame, in pixels.
+DRIFT_LIMIT_PX = 5.0
+DRIFT_VECTOR_LIMIT_PX = 2.0
+#: (height, width) of the image panels, the images are reduced to fit.
+PANEL_SIZE = (400, 560)
+#: Size in inches of the figure of the plots only, and of the figure with the images.
+PLOTS_FIGURE_SIZE = (4.0, 4.2)
+IMAGES_FIGURE_SIZE = (11.0, 4.2)
+#: Relative heights of the radial PSD, metrics and drift plots and of the text of the last result.
+PLOTS_HEIGHT_RATIOS = (2.0, 2.0, 2.0, 2.0)
+
+
+def get_profile_limits(radial_profile):
+    """Return the y limits of the radial PSD plot, one decade around the profiles without the DC bin."""
+    minimum = max(radial_profile[..., 1:].min(), 1.0e-3)
+    maximum = max(radial_profile.max(), minimum)
+    return minimum / 10.0, maximum * 10.0
+
+
+def format_focus_metrics(focus_metrics):
+    """Return the text of the focus metrics, a short line per pane for the metrics of several panes."""
+    focus_metrics = np.atleast_2d(focus_metrics)
+    if len(focus_metrics) == 1:
+        return "HF ratio: {:.4f}\nGradient variance: {:.1f}\nEllipticity: {:.3f} at {:.0f} deg\nSNR: {:.1f} dB".format(
+            *focus_metrics[0])
+
+    lines = []
+    for pane_id, metrics in enumerate(focus_metrics):
+        lines.append("Pane {}: HF {:.4f}, ellipticity {:.3f}, SNR {:.1f} dB".format(
+            pane_id + 1, metrics[METRIC_NAMES.index(HIGH_FREQUENCY_RATIO)], metrics[METRIC_NAMES.index(ELLIPTICITY)],
+            metrics[METRIC_NAMES.index(SNR)]))
+    return "\n".join(lines)
+
+
+class LivePlots(object):
+    """
+    Plots of the live session in a matplotlib figure, updated by blitting.
+
+    With several panes, the radial PSD and the metrics of each pane are plotted with the color of the pane.
+
+    :param figure: :py:class:`matplotlib.figure.Figure` with its canvas, e.g. ``FigureCanvasTkAgg``
+    :param bool show_images: also show the micrograph and its FFT in the figure
+    """
+    def __init__(self, figure, show_images=False):
+        self.figure = figure
+        self.canvas = figure.canvas
+        self.show_images = show_images
+
+        if show_images:
+            grid = figure.add_gridspec(4, 3, height_ratios=PLOTS_HEIGHT_RATIOS)
+            plot_column = 2
+            self.image_axes = figure.add_subplot(grid[:, 0])
+            self.image = self.image_axes.imshow(np.zeros((2, 2)), cmap="gray", animated=True)
+            self.fft_axes = figure.add_subplot(grid[:, 1])
+            self.fft_image = self.fft_axes.imshow(np.zeros((2, 2)), animated=True)
+            for axes in [self.image_axes, self.fft_axes]:
+                axes.set_xticks([])
+                axes.set_yticks([])
+        else:
+            grid = figure.add_gridspec(4, 1, height_ratios=PLOTS_HEIGHT_RATIOS)
+            plot_column = 0
+            self.image_axes = self.image = self.fft_axes = self.fft_image = None
+
+        self.profile_axes = figure.add_subplot(grid[0, plot_column])
+        self.profile_line, = self.profile_axes.semilogy([], [], color="C0", animated=True)
+        self.profile_axes.set_xlabel("Spatial frequency (1/pixel)")
+        self.profile_axes.set_ylabel("Radial PSD")
+
+        self.metrics_axes = figure.add_subplot(grid[1, plot_column])
+        self.sharpness_line, = self.metrics_axes.plot([], [], color="C0", animated=True, label="Relative sharpness")
+        self.ellipticity_line, = self.metrics_axes.plot([], [], "--", color="C0", animated=True, label="Ellipticity")
+        # Lines of the first pane, then of the other panes of the layout.
+        self.profile_lines = [self.profile_line]
+        self.sharpness_lines = [self.sharpness_line]
+        self.ellipticity_lines = [self.ellipticity_line]
+        self.metrics_axes.set_ylim(0.0, 1.05)
+        self.metrics_axes.legend(loc="upper left", fontsize="x-small")
+
+        # Cumulative drift in time and the drift of the last frame as a vector in the inset.
+        self.drift_axes = figure.add_subplot(grid[2, plot_column])
+        self.drift_x_line, = self.drift_axes.plot([], [], animated=True, label="x")
+        self.drift_y_line, = self.drift_axes.plot([], [], animated=True, label="y")
+        self.drift_axes.set_xlabel("Time (s)")
+        self.drift_axes.set_ylabel("Drift (pixel)")
+        self.drift_axes.legend(loc="upper left", fontsize="x-small")
+        vector_axes = self.drift_axes.inset_axes([0.7, 0.05, 0.25, 0.4])
+        self.vector_line, = vector_axes.plot([0.0, 0.0], [0.0, 0.0], "-o", markevery=[1], animated=True)
+        vector_axes.set_xlim(-DRIFT_VECTOR_LIMIT_PX, DRIFT_VECTOR_LIMIT_PX)
+        vector_axes.set_ylim(DRIFT_VECTOR_LIMIT_PX, -DRIFT_VECTOR_LIMIT_PX)
+        vector_axes.set_aspect("equal")
+        vector_axes.set_xticks([])
+        vector_axes.set_yticks([])
+
+        # Values of the last result below the plots.
+        text_axes = figure.add_subplot(grid[3, plot_column])
+        text_axes.axis("off")
+        self.metrics_text = text_axes.text(0.0, 1.0, "", transform=text_axes.transAxes, animated=True,
+                                           verticalalignment="top", fontsize="x-small")
+
+        self.metrics_history = MetricsHistory()
+        self.drift_history = MetricsHistory(number_metrics=2)
+        figure.tight_layout()
+
+        self._background = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    @property
+    def artists(self):
+        artists = self.profile_lines + self.sharpness_lines + self.ellipticity_lines + \
+            [self.metrics_text, self.drift_x_line, self.drift_y_line, self.vector_line]
+        if self.show_images:
+            artists = [self.image, self.fft_image] + artists
+        return artists
+
+    @property
+    def number_panes(self):
+        return len(self.profile_lines)
+
+    def start(self, frequencies, frame_interval_s, number_panes=1):
+        """
+        Clear the plots of a new live session.
+
+        :param frequencies: spatial frequencies of the radial PSD bins
+        :param float frame_interval_s: capture interval, the time axes show the length of the histories
+        :param int number_panes: number of panes of the results
+        """
+        self._set_number_panes(number_panes)
+        self.metrics_history = MetricsHistory(number_metrics=number_panes * len(METRIC_NAMES))
+        self.drift_history = MetricsHistory(number_metrics=2)
+        history_duration_s = self.metrics_history.length * frame_interval_s
+        for line in self.profile_lines:
+            line.set_data(frequencies, np.ones_like(frequencies))
+        self.profile_axes.set_xlim(frequencies[0], frequencies[-1])
+        for line in self.sharpness_lines + self.ellipticity_lines + [self.drift_x_line, self.drift_y_line]:
+            line.set_data([], [])
+        self.vector_line.set_data([0.0, 0.0], [0.0, 0.0])
+        self.metrics_text.set_text("")
+        self.metrics_axes.set_xlim(-history_duration_s, 0.0)
+        self.drift_axes.set_xlim(-history_duration_s, 0.0)
+        self.drift_axes.set_ylim(-DRIFT_LIMIT_PX, DRIFT_LIMIT_PX)
+        self.canvas.draw_idle()
+
+    def _set_number_panes(self, number_panes):
+        for line in self.profile_lines[1:] + self.sharpness_lines[1:] + self.ellipticity_lines[1:]:
+            line.remove()
+        del self.profile_lines[1:], self.sharpness_lines[1:], self.ellipticity_lines[1:]
+
+        for pane_id in range(1, number_panes):
+            color = "C{}".format(pane_id)
+            self.profile_lines.extend(self.profile_axes.semilogy([], [], color=color, animated=True))
+            self.sharpness_lines.extend(self.metrics_axes.plot([], [], color=color, animated=True))
+            self.ellipticity_lines.extend(self.metrics_axes.plot([], [], "--", color=color, animated=True))
+
+        legend = self.profile_axes.get_legend()
+        if legend is not None:
+            legend.remove()
+        if number_panes > 1:
+            self.profile_axes.legend(self.profile_lines, ["Pane {}".format(pane_id + 1)
+                                                          for pane_id in range(number_panes)],
+                                     loc="upper right", fontsize="x-small")
+
+    def show_image(self, image, minimum, maximum):
+        self._set_image(self.image, image, minimum, maximum)
+
+    def show_fft(self, log_power, minimum, maximum):
+        self._set_image(self.fft_image, log_power, minimum, maximum)
+
+    def _set_image(self, axes_image, image, minimum, maximum):
+        if axes_image.get_array().shape != image.shape:
+            height, width = image.shape
+            axes_image.set_extent((-0.5, width - 0.5, height - 0.5, -0.5))
+            axes_image.axes.set_xlim(-0.5, width - 0.5)
+            axes_image.axes.set_ylim(height - 0.5, -0.5)
+            self.canvas.draw_idle()
+        axes_image.set_data(image)
+        axes_image.set_clim(minimum, maximum)
+
+    def show_result(self, result, timestamp, drift_tracking=False):
+        """
+        Show the radial PSD, the focus metrics and the drift of a result.
+
+        :param result: result of :py:class:`pysemimaginggui.fft_analysis.FftAnalysis`, or of
+            :py:class:`pysemimaginggui.fft_analysis.MultiPaneFftAnalysis` with one row per pane
+        :param float timestamp: capture time of the frame of the result
+        :param bool drift_tracking: the drift of the result is measured
+        """
+        radial_profiles = np.atleast_2d(result["radial_profile"])
+        focus_metrics = np.atleast_2d(result["focus_metrics"])
+        for line, radial_profile in zip(self.profile_lines, radial_profiles):
+            line.set_ydata(radial_profile)
+        minimum, maximum = self.profile_axes.get_ylim()
+        if radial_profiles[:, 1:].min() < minimum or radial_profiles.max() > maximum:
+            self.profile_axes.set_ylim(*get_profile_limits(radial_profiles))
+            self.canvas.draw_idle()
+
+        self.metrics_history.append(timestamp, focus_metrics.reshape(-1))
+        times, values = self.metrics_history.get_series()
+        times = times - timestamp
+        values = values.reshape(len(times), -1, len(METRIC_NAMES))
+        for pane_id, (sharpness_line, ellipticity_line) in enumerate(zip(self.sharpness_lines,
+                                                                          self.ellipticity_lines)):
+            sharpness = values[:, pane_id, METRIC_NAMES.index(HIGH_FREQUENCY_RATIO)]
+            sharpness_line.set_data(times, sharpness / max(sharpness.max(), 1.0e-30))
+            ellipticity_line.set_data(times, values[:, pane_id, METRIC_NAMES.index(ELLIPTICITY)])
+        text = format_focus_metrics(focus_metrics)
+
+        if drift_tracking:
+            drift = result["drift"]
+            self.drift_history.append(timestamp, result["drift_position"])
+            times, positions = self.drift_history.get_series()
+            times = times - timestamp
+            self.drift_x_line.set_data(times, positions[:, 0])
+            self.drift_y_line.set_data(times, positions[:, 1])
+            self.vector_line.set_data([0.0, drift[0]], [0.0, drift[1]])
+            limit = max(np.abs(positions).max(), DRIFT_LIMIT_PX)
+            if limit > self.drift_axes.get_ylim()[1]:
+                self.drift_axes.set_ylim(-2.0 * limit, 2.0 * limit)
+                self.canvas.draw_idle()
+            text += "\ndrift: {:+.2f}, {:+.2f} px".format(drift[0], drift[1])
+        self.metrics_text.set_text(text)
+
+    def show_message(self, text):
+        self.metrics_text.set_text(text)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.figure.draw_artist(artist)
+
+    def blit(self):
+        """Redraw the animated artists over the background saved at the last full draw."""
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.figure.bbox)
+
+
+class LiveView(ttk.Frame):
+    """
+    Micrograph, FFT and plots of the live session side by side.
+
+    :param parent: Tk parent widget
+    :param str live_display: display of the images, see :py:func:`pysemimaginggui.display.get_live_displays`
+    """
+    def __init__(self, parent, live_display=DISPLAY_TK):
+        # Imported here, the plots and the module do not need Tk.
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        ttk.Frame.__init__(self, parent)
+        self.live_display = live_display
+        self.use_tk_display = live_display == DISPLAY_TK and get_default_live_display() == DISPLAY_TK
+        self.image_contrast = AutoContrast()
+        self.fft_contrast = AutoContrast()
+
+        if self.use_tk_display:
+            self.image_view = TkImageView(self._create_panel(0), LutRenderer(PANEL_SIZE, "gray",
+                                                                             display_size=PANEL_SIZE))
+            self.fft_view = TkImageView(self._create_panel(1), LutRenderer(PANEL_SIZE, display_size=PANEL_SIZE))
+            figure = Figure(figsize=PLOTS_FIGURE_SIZE)
+            plots_column = 2
+        else:
+            self.image_view = self.fft_view = None
+            figure = Figure(figsize=IMAGES_FIGURE_SIZE)
+            plots_column = 0
+
+        self.canvas = FigureCanvasTkAgg(figure, master=self)
+        self.canvas.get_tk_widget().grid(column=plots_column, row=0, sticky=(N, W, E, S))
+        self.plots = LivePlots(figure, show_images=not self.use_tk_display)
+        self.canvas.draw()
+
+    def _create_panel(self, column):
+        panel = ttk.Frame(self)
+        panel.grid(column=column, row=0, sticky=(N, W, E, S))
+        self.columnconfigure(column, weight=1)
+        return panel
+
+    def start(self, frequencies, frame_interval_s, number_panes=1):
+        """Clear the view for a new live session, see :py:meth:`LivePlots.start`."""
+        self.image_contrast.reset()
+        self.fft_contrast.reset()
+        self.plots.start(frequencies, frame_interval_s, number_panes)
+
+    def show_frame(self, frame):
+        """Show a captured frame in the micrograph panel."""
+        minimum, maximum = self.image_contrast.update(frame)
+        if self.image_view is not None:
+            self.image_view.show(frame, minimum, maximum)
+        else:
+            self.plots.show_image(frame, minimum, maximum)
+            self.plots.blit()
+
+    def show_result(self, result, timestamp, drift_tracking=False):
+        """Show the frame, the FFT and the plots of a result of :py:class:`pysemimaginggui.fft_analysis.FftAnalysis`."""
+        frame = result["frame"]
+        log_power = result["log_power"]
+        image_limits = self.image_contrast.update(frame)
+        fft_limits = self.fft_contrast.update(log_power)
+        if self.use_tk_display:
+            self.image_view.show(frame, *image_limits)
+            self.fft_view.show(log_power, *fft_limits)
+        else:
+            self.plots.show_image(frame, *image_limits)
+            self.plots.show_fft(log_power, *fft_limits)
+        self.plots.show_result(result, timestamp, drift_tracking)
+        self.plots.blit()
+
+    def show_message(self, text):
+        self.plots.show_message(text)
+        self.plots.blit()
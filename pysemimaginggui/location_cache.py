@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.location_cache
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Persistent location of the PC-SEM window between sessions.
+
+The template match of each instrument and screen geometry is saved in the user data folder. The next session first
+grabs only the template box at the saved location and compares it with the template, then searches a small
+neighbourhood around it and only then the full screen. The same check follows the window when it is moved during a
+live session. The panes of the dual and quad layouts are all located on one grab of the full screen.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os
+import json
+import logging
+import threading
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui import get_user_data_path
+from pysemimaginggui.frame_source import create_frame_source, get_screen_region, BACKEND_AUTO
+from pysemimaginggui.locator import get_template_locator, compute_ncc_local, remove_overlapping_matches, Match, \
+    DEFAULT_CONFIDENCE
+from pysemimaginggui.panes import sort_regions, MAXIMUM_PANES
+
+# Globals and constants variables.
+CACHE_FILE_NAME = "micrograph_locations.json"
+#: Margin in pixels around the cached location searched before the full screen.
+SEARCH_MARGIN = 64
+
+METHOD_CACHE = "cache"
+METHOD_NEIGHBOURHOOD = "neighbourhood"
+METHOD_FULL = "full"
+
+
+def get_cache_key(instrument, screen_region):
+    """Return the cache key of an instrument and a screen (x, y, width, height) geometry."""
+    x, y, width, height = screen_region
+    return "{}:{}x{}{:+d}{:+d}".format(instrument, width, height, x, y)
+
+
+class LocationCache(object):
+    """
+    Template matches saved in a JSON file.
+
+    :param str file_path: cache file, ``micrograph_locations.json`` in the user data folder when ``None``
+    """
+    def __init__(self, file_path=None):
+        if file_path is None:
+            file_path = get_user_data_path(CACHE_FILE_NAME)
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._locations = {}
+
+        if os.path.isfile(self.file_path):
+            try:
+                with open(self.file_path, "r") as cache_file:
+                    self._locations = json.load(cache_file)
+            except (IOError, ValueError) as message:
+                logging.warning("Cannot read the location cache %s: %s", self.file_path, message)
+
+    def get(self, key):
+        """Return the cached :py:class:`pysemimaginggui.locator.Match` of *key* or ``None``."""
+        with self._lock:
+            location = self._locations.get(key)
+        if location is None:
+            return None
+        return Match(**location)
+
+    def set(self, key, match):
+        with self._lock:
+            if self._locations.get(key) == match._asdict():
+                return
+            self._locations[key] = dict(match._asdict())
+            self._save()
+
+    def remove(self, key):
+        with self._lock:
+            if self._locations.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        # Write a temporary file first, an interrupted write does not corrupt the cache.
+        temporary_file_path = self.file_path + ".tmp"
+        with open(temporary_file_path, "w") as cache_file:
+            json.dump(self._locations, cache_file, indent=2, sort_keys=True)
+        os.replace(temporary_file_path, self.file_path)
+
+
+class MicrographLocator(object):
+    """
+    Locate the PC-SEM window with the cached location first.
+
+    :param str instrument: instrument name, part of the cache key
+    :param file_paths: template file paths of the instrument
+    :param str backend: frame source backend used to grab the screen
+    :param float confidence: minimum normalized cross-correlation of a match
+    :param cache: :py:class:`LocationCache`, the cache of the user data folder when ``None``
+    :param int search_margin: margin in pixels of the neighbourhood search
+    :param tuple screen_region: (x, y, width, height) of the screen, from the backend when ``None``
+    :param kwargs: extra parameters of the frame source backend, e.g. ``frames`` for ``"replay"``
+    """
+    def __init__(self, instrument, file_paths, backend=BACKEND_AUTO, confidence=DEFAULT_CONFIDENCE, cache=None,
+                 search_margin=SEARCH_MARGIN, screen_region=None, **kwargs):
+        self.backend = backend
+        self._frame_source_kwargs = kwargs
+        self.confidence = confidence
+        self.cache = cache if cache is not None else LocationCache()
+        self.search_margin = search_margin
+
+        file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+        self.locator = get_template_locator(file_paths, confidence)
+
+        if screen_region is None:
+            screen_region = get_screen_region(backend)
+        self.screen_region = tuple(screen_region)
+        self.key = get_cache_key(instrument, self.screen_region)
+        self.match = None
+        self.matches = []
+        self.method = None
+        self._frame_source = None
+
+    def grab(self, region):
+        """Grab a small region of the screen with a frame source reused between the checks."""
+        if self._frame_source is None:
+            self._frame_source = create_frame_source(self.backend, region, **self._frame_source_kwargs)
+        else:
+            self._frame_source.set_region(region)
+        return self._frame_source.grab()
+
+    def verify(self, match):
+        """
+        Compare the template box at the location of *match* with the templates of the same size.
+
+        The pause and run templates have the same size, the check still succeeds when the microscope state changes.
+
+        :return: the match at the same location, with the confidence and name of the best template, or ``None``
+        """
+        patch = self.grab((match.left, match.top, match.width, match.height))
+        best_match = None
+        for template in self.locator.templates:
+            if template.shape != (match.height, match.width):
+                continue
+            confidence, _top, _left = compute_ncc_local(patch, template, 0, 0, 0)
+            if confidence >= self.confidence and (best_match is None or confidence > best_match.confidence):
+                best_match = match._replace(confidence=confidence, name=template.name)
+        return best_match
+
+    def search_neighbourhood(self, match):
+        """Search all the templates in the margin around *match*, return the best match or ``None``."""
+        screen_x, screen_y, screen_width, screen_height = self.screen_region
+        left = max(match.left - self.search_margin, screen_x)
+        top = max(match.top - self.search_margin, screen_y)
+        right = min(match.left + match.width + self.search_margin, screen_x + screen_width)
+        bottom = min(match.top + match.height + self.search_margin, screen_y + screen_height)
+        if right <= left or bottom <= top:
+            return None
+
+        neighbourhood = self.grab((left, top, right - left, bottom - top)).astype("float32")
+        matches = self.locator.locate_all(neighbourhood)
+        if not matches:
+            return None
+        return matches[0]._replace(left=matches[0].left + left, top=matches[0].top + top)
+
+    def search_screen(self):
+        """Search all the templates on the full screen, return the best match or ``None``."""
+        screen = self.grab(self.screen_region).astype("float32")
+        match = self.locator.locate(screen)
+        if match is not None:
+            match = match._replace(left=match.left + self.screen_region[0], top=match.top + self.screen_region[1])
+        return match
+
+    def locate(self, full_search=True, stop_event=None):
+        """
+        Locate the window: check the cached location, then search its neighbourhood, then the full screen.
+
+        :param bool full_search: search the full screen when the cached location is not found
+        :param stop_event: :py:class:`threading.Event` checked before each step, the search stops when it is set
+        :return: the match in screen coordinates or ``None``, the step that found it is :py:attr:`method`
+        """
+        def is_stopped():
+            return stop_event is not None and stop_event.is_set()
+
+        match = None
+        self.method = None
+        cached_match = self.cache.get(self.key)
+        if cached_match is not None:
+            match = self.verify(cached_match)
+            self.method = METHOD_CACHE
+            if match is None and not is_stopped():
+                match = self.search_neighbourhood(cached_match)
+                self.method = METHOD_NEIGHBOURHOOD
+
+        if match is None and full_search and not is_stopped():
+            match = self.search_screen()
+            self.method = METHOD_FULL
+
+        if match is None:
+            self.method = None
+        else:
+            self.cache.set(self.key, match)
+        self.match = match
+        self.matches = [match] if match is not None else []
+        logging.info("Micrograph locator: %s (%s)", match, self.method)
+        return match
+
+    def locate_panes(self, max_panes=MAXIMUM_PANES, stop_event=None):
+        """
+        Locate the toolbars of all the panes of the current layout on one grab of the full screen.
+
+        The first pane is the :py:attr:`match` cached and followed by :py:meth:`track`, the panes move together.
+
+        :param int max_panes: maximum number of panes
+        :param stop_event: :py:class:`threading.Event`, the screen is not searched when it is set
+        :return: the matches in screen coordinates, in reading order, also in :py:attr:`matches`
+        """
+        self.method = None
+        self.match = None
+        self.matches = []
+        if stop_event is not None and stop_event.is_set():
+            return self.matches
+
+        screen = self.grab(self.screen_region).astype("float32")
+        matches = remove_overlapping_matches(self.locator.locate_all(screen, max_matches=max_panes))[:max_panes]
+        screen_x, screen_y = self.screen_region[:2]
+        matches = sort_regions([match._replace(left=match.left + screen_x, top=match.top + screen_y)
+                                for match in matches])
+        if matches:
+            self.method = METHOD_FULL
+            self.match = matches[0]
+            self.matches = matches
+            self.cache.set(self.key, self.match)
+        logging.info("Micrograph panes: %s", matches)
+        return matches
+
+    def track(self):
+        """
+        Check the current location during a live session and follow a moved window in its neighbourhood.
+
+        :return: the current match, ``None`` when the window is lost
+        """
+        if self.match is None:
+            return None
+
+        match = self.verify(self.match)
+        if match is None:
+            match = self.search_neighbourhood(self.match)
+            if match is not None:
+                logging.info("Micrograph moved: %s", match)
+                self.cache.set(self.key, match)
+                # The other panes move with the first one.
+                left_shift = match.left - self.match.left
+                top_shift = match.top - self.match.top
+                self.matches = [match] + [pane._replace(left=pane.left + left_shift, top=pane.top + top_shift)
+                                          for pane in self.matches[1:]]
+                self.match = match
+        return match
+
+    def close(self):
+        if self._frame_source is not None:
+            self._frame_source.close()
+            self._frame_source = None
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.locator
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Multi-scale template locator used to find the PC-SEM window on the screen.
+
+The screen is grabbed once and the templates are converted to gray and reduced in a pyramid once. All the templates
+are first matched on a reduced screen, with a normalized cross-correlation computed by FFT where the screen FFT is
+shared by all the templates, then the best candidates are refined at full resolution in a small neighbourhood.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import glob
+import logging
+import threading
+from collections import namedtuple
+
+# Third party modules.
+import numpy as np
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_source import grab_screen, BACKEND_AUTO
+
+# Globals and constants variables.
+#: Minimum confidence (normalized cross-correlation) of a match.
+DEFAULT_CONFIDENCE = 0.9
+#: Smallest template dimension, in pixels, allowed at the coarse level of the pyramid.
+MINIMUM_COARSE_SIZE = 8
+#: Maximum number of pyramid reductions.
+MAXIMUM_LEVELS = 3
+
+_locators = {}
+_locators_lock = threading.Lock()
+
+Match = namedtuple("Match", ["left", "top", "width", "height", "confidence", "name"])
+"""
+Location of a template on the screen. The first four fields are the same as the box returned by
+``pyautogui.locateOnScreen``.
+"""
+
+
+def load_gray_image(file_path):
+    from PIL import Image
+    with Image.open(file_path) as image:
+        return np.asarray(image.convert("L"), dtype=np.float32)
+
+
+def reduce_image(image):
+    """Reduce the image size by two with a 2x2 block mean."""
+    height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    image = image[:height, :width]
+    reduced = image[0::2, 0::2] + image[1::2, 0::2]
+    reduced += image[0::2, 1::2]
+    reduced += image[1::2, 1::2]
+    reduced *= 0.25
+    return reduced
+
+
+def build_pyramid(image, number_levels):
+    pyramid = [np.asarray(image, dtype=np.float32)]
+    for _level in range(number_levels):
+        pyramid.append(reduce_image(pyramid[-1]))
+    return pyramid
+
+
+class Template(object):
+    """
+    Template preprocessed for the normalized cross-correlation: gray, pyramid, zero mean and norm of each level.
+
+    :param str name: name of the template, e.g. the file name
+    :param image: gray image of the template
+    """
+    def __init__(self, name, image):
+        self.name = name
+        self.shape = image.shape
+        height, width = self.shape
+        self.maximum_level = 0
+        while self.maximum_level < MAXIMUM_LEVELS and min(height, width) >> (self.maximum_level + 1) >= \
+                MINIMUM_COARSE_SIZE:
+            self.maximum_level += 1
+
+        self.levels = []
+        for level_image in build_pyramid(image, self.maximum_level):
+            zero_mean = level_image - level_image.mean()
+            norm = float(np.sqrt(np.sum(zero_mean * zero_mean)))
+            self.levels.append((zero_mean, norm))
+        self._spectra = {}
+
+    def get_spectrum(self, level, fft_shape):
+        """Return the FFT of the zero mean template of *level* zero padded to *fft_shape*, cached."""
+        key = (level, fft_shape)
+        spectrum = self._spectra.get(key)
+        if spectrum is None:
+            spectrum = np.conj(scipy.fft.rfft2(self.levels[level][0], s=fft_shape))
+            # Only the last screen size is kept, the spectra have the size of the screen.
+            self._spectra = {key: spectrum}
+        return spectrum
+
+
+def get_window_sums(integral, height, width):
+    """Return the sums of all the (height, width) windows from an integral image with a leading zero row/column."""
+    return (integral[height:, width:] - integral[:-height, width:] - integral[height:, :-width] +
+            integral[:-height, :-width])
+
+
+def compute_ncc_map(screen, template, level, screen_spectrum, fft_shape, integral, integral_squared):
+    """
+    Normalized cross-correlation of *template* at every valid position of *screen*.
+
+    :return: NCC map of shape (screen height - template height + 1, screen width - template width + 1)
+    """
+    zero_mean, norm = template.levels[level]
+    height, width = zero_mean.shape
+    screen_height, screen_width = screen.shape
+    if height > screen_height or width > screen_width or norm == 0.0:
+        return None
+
+    correlation = scipy.fft.irfft2(screen_spectrum * template.get_spectrum(level, fft_shape), s=fft_shape)
+    correlation = correlation[:screen_height - height + 1, :screen_width - width + 1]
+
+    number_pixels = height * width
+    sums = get_window_sums(integral, height, width)
+    sums_squared = get_window_sums(integral_squared, height, width)
+    variance = np.maximum(sums_squared - sums * sums / number_pixels, 0.0)
+    denominator = np.sqrt(variance) * norm
+    ncc_map = np.zeros(correlation.shape, dtype=np.float64)
+    np.divide(correlation, denominator, out=ncc_map, where=denominator > 1.0e-6 * norm)
+    return ncc_map
+
+
+def compute_ncc_local(screen, template, top, left, radius):
+    """
+    Normalized cross-correlation of *template* at full resolution around (*top*, *left*).
+
+    :return: best (confidence, top, left)
+    """
+    zero_mean, norm = template.levels[0]
+    height, width = zero_mean.shape
+    screen_height, screen_width = screen.shape
+
+    top_start = max(top - radius, 0)
+    left_start = max(left - radius, 0)
+    top_stop = min(top + radius, screen_height - height)
+    left_stop = min(left + radius, screen_width - width)
+    if top_stop < top_start or left_stop < left_start or norm == 0.0:
+        return -1.0, top, left
+
+    patch = screen[top_start:top_stop + height, left_start:left_stop + width].astype(np.float64)
+    windows = sliding_window_view(patch, (height, width))
+    correlation = np.einsum("abij,ij->ab", windows, zero_mean)
+    sums = windows.sum(axis=(2, 3))
+    sums_squared = np.einsum("abij,abij->ab", windows, windows)
+    variance = np.maximum(sums_squared - sums * sums / (height * width), 0.0)
+    denominator = np.sqrt(variance) * norm
+    ncc = np.full(correlation.shape, -1.0)
+    np.divide(correlation, denominator, out=ncc, where=denominator > 1.0e-6 * norm)
+
+    row, column = np.unravel_index(np.argmax(ncc), ncc.shape)
+    return float(ncc[row, column]), top_start + row, left_start + column
+
+
+def find_peaks(ncc_map, threshold, max_peaks, exclusion_shape):
+    """Return up to *max_peaks* (value, row, column) above *threshold*, separated by at least *exclusion_shape*."""
+    peaks = []
+    if ncc_map is None:
+        return peaks
+
+    exclusion_height, exclusion_width = exclusion_shape
+    for _peak_id in range(max_peaks):
+        index = int(np.argmax(ncc_map))
+        row, column = divmod(index, ncc_map.shape[1])
+        value = float(ncc_map[row, column])
+        if value < threshold:
+            break
+        peaks.append((value, row, column))
+        ncc_map[max(row - exclusion_height + 1, 0):row + exclusion_height,
+                max(column - exclusion_width + 1, 0):column + exclusion_width] = -1.0
+    return peaks
+
+
+class TemplateLocator(object):
+    """
+    Locate several templates on a screen image in one pass.
+
+    :param templates: dict of name and template image file path or gray image
+    :param float confidence: minimum normalized cross-correlation of a match, between 0 and 1
+    """
+    def __init__(self, templates, confidence=DEFAULT_CONFIDENCE):
+        self.confidence = confidence
+        self.templates = []
+        for name, template in sorted(templates.items()):
+            if not isinstance(template, np.ndarray):
+                template = load_gray_image(template)
+            self.templates.append(Template(name, template))
+
+        self.coarse_level = min(template.maximum_level for template in self.templates) if self.templates else 0
+
+    def locate_all(self, screen, max_matches=1, coarse_confidence=None):
+        """
+        Locate all the templates on *screen*.
+
+        :param screen: gray screen image, e.g. from :py:func:`pysemimaginggui.frame_source.grab_screen`
+        :param int max_matches: maximum number of matches of each template
+        :param float coarse_confidence: minimum NCC of the candidates at the coarse level, lower than
+            :py:attr:`confidence` because the reduction blurs the templates, half of :py:attr:`confidence` when
+            ``None``
+        :return: the matches sorted by decreasing confidence
+        :rtype: list of :py:class:`Match`
+        """
+        if coarse_confidence is None:
+            coarse_confidence = 0.5 * self.confidence
+
+        level = self.coarse_level
+        pyramid = build_pyramid(screen, level)
+        coarse_screen = pyramid[level]
+
+        # The screen FFT and integral images are shared by all the templates.
+        fft_shape = tuple(scipy.fft.next_fast_len(size, real=True) for size in coarse_screen.shape)
+        screen_spectrum = scipy.fft.rfft2(coarse_screen, s=fft_shape)
+        integral = np.zeros((coarse_screen.shape[0] + 1, coarse_screen.shape[1] + 1), dtype=np.float64)
+        np.cumsum(np.cumsum(coarse_screen, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+        integral_squared = np.zeros_like(integral)
+        np.cumsum(np.cumsum(np.square(coarse_screen, dtype=np.float64), axis=0), axis=1, out=integral_squared[1:, 1:])
+
+        scale = 2 ** level
+        matches = []
+        for template in self.templates:
+            ncc_map = compute_ncc_map(coarse_screen, template, level, screen_spectrum, fft_shape, integral,
+                                      integral_squared)
+            height, width = template.shape
+            exclusion_shape = (max(height // scale, 1), max(width // scale, 1))
+            # Keep extra candidates, the best coarse candidate is not always the best at full resolution.
+            candidates = find_peaks(ncc_map, coarse_confidence, max_matches + 4, exclusion_shape)
+
+            template_matches = []
+            for _value, row, column in candidates:
+                confidence, top, left = compute_ncc_local(pyramid[0], template, row * scale, column * scale,
+                                                          scale + 1)
+                if confidence >= self.confidence:
+                    template_matches.append(Match(int(left), int(top), width, height, confidence, template.name))
+            template_matches = remove_overlapping_matches(template_matches)
+            matches.extend(template_matches[:max_matches])
+
+        matches.sort(key=lambda match: match.confidence, reverse=True)
+        logging.debug("locate_all: %s", matches)
+        return matches
+
+    def locate(self, screen, name=None):
+        """Return the best match, of the template *name* if given, or ``None``."""
+        for match in self.locate_all(screen):
+            if name is None or match.name == name:
+                return match
+        return None
+
+
+def remove_overlapping_matches(matches):
+    matches = sorted(matches, key=lambda match: match.confidence, reverse=True)
+    kept_matches = []
+    for match in matches:
+        if all(abs(match.left - kept.left) >= kept.width or abs(match.top - kept.top) >= kept.height
+               for kept in kept_matches):
+            kept_matches.append(match)
+    return kept_matches
+
+
+def get_template_locator(file_paths, confidence=DEFAULT_CONFIDENCE):
+    """
+    Return the locator of the template files, the templates are loaded and preprocessed at the first call.
+
+    :param file_paths: template file paths, the file names are used as template names
+    """
+    key = (tuple(sorted(file_paths)), confidence)
+    with _locators_lock:
+        locator = _locators.get(key)
+        if locator is None:
+            templates = dict((os.path.basename(file_path), file_path) for file_path in file_paths)
+            locator = TemplateLocator(templates, confidence)
+            _locators[key] = locator
+    return locator
+
+
+def get_template_files(path):
+    """Return the sorted PNG template files of the folder *path*, e.g. the images of one instrument."""
+    return sorted(glob.glob(os.path.join(path, "*.png")))
+
+
+def locate_on_screen(file_paths, backend=BACKEND_AUTO, confidence=DEFAULT_CONFIDENCE):
+    """
+    Grab the screen once and return the best match of the template files, replaces ``pyautogui.locateOnScreen``.
+
+    :param file_paths: template file paths, the missing files are ignored
+    :param str backend: frame source backend used to grab the screen
+    :return: best match in screen coordinates or ``None``
+    :rtype: :py:class:`Match`
+    """
+    file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+    if not file_paths:
+        logging.warning("locate_on_screen: no template file")
+        return None
+
+    locator = get_template_locator(file_paths, confidence)
+    screen, screen_region = grab_screen(backend)
+    match = locator.locate(screen)
+    if match is not None:
+        match = match._replace(left=match.left + screen_region[0], top=match.top + screen_region[1])
+    logging.debug("locate_on_screen: %s", match)
+    return match
@@ -30,29 +30,58 @@ GUI to process EELS files in batch mode.
 import os.path
 import logging
 import time
+import functools
 import six
 if six.PY3:
     from tkinter import ttk
-    from tkinter import filedialog, N, W, E, S, StringVar, BooleanVar, IntVar, DoubleVar, Tk, DISABLED, NORMAL
+    from tkinter import filedialog, N, W, E, S, StringVar, BooleanVar, IntVar, DoubleVar, Tk, DISABLED, NORMAL, \
+        TclError
 elif six.PY2:
     import ttk
-    from Tkinter import N, W, E, S, StringVar, BooleanVar, IntVar, DoubleVar, Tk, DISABLED, NORMAL
+    from Tkinter import N, W, E, S, StringVar, BooleanVar, IntVar, DoubleVar, Tk, DISABLED, NORMAL, \
+        TclError
     import tkFileDialog as filedialog
 
 # Third party modules.
-import pyautogui
 from PIL import Image, ImageOps
-import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from scipy.fftpack import fft2, fftshift
 
 # Local modules.
 
 # Project modules.
 from pysemimaginggui import get_current_module_path
+from pysemimaginggui.frame_source import create_frame_source, get_screen_backends, BACKEND_AUTO, BACKEND_SYNTHETIC, \
+    BACKEND_REPLAY
+from pysemimaginggui.pipeline import LivePipeline, SharedCapture
+from pysemimaginggui.fft_analysis import FftAnalysis, MultiPaneFftAnalysis
+from pysemimaginggui.apodization import get_window_types, WINDOW_NONE
+from pysemimaginggui.locator import get_template_files
+from pysemimaginggui.location_cache import MicrographLocator
+from pysemimaginggui.ffmpeg_recorder import FfmpegRecorder, record_shared_frames
+from pysemimaginggui.frame_store import FrameStoreWriter, get_default_compression, FRAME_STORE_EXTENSION
+from pysemimaginggui.recording import SegmentedRecorder, AsyncFrameWriter, PngBurstWriter, ChangedFrameWriter, \
+    IntegratedFrameWriter, get_backpressures, BACKPRESSURE_DROP
+from pysemimaginggui.integration import create_integrator, get_integration_methods, get_integration_domains, \
+    INTEGRATION_NONE, DOMAIN_IMAGE, DEFAULT_NUMBER_FRAMES
+from pysemimaginggui.change_detection import ChangeDetector
+from pysemimaginggui.run_state import RunStateDetector, STATE_PAUSED
+from pysemimaginggui.scan_sync import ScanSyncFrameSource
+from pysemimaginggui.display import get_live_displays, get_default_live_display
+from pysemimaginggui.live_view import LiveView, format_focus_metrics
+from pysemimaginggui.jobs import JobManager
+from pysemimaginggui.panes import PaneLayout
 
 # Globals and constants variables.
+#: Interval between the checks of the PC-SEM window location during a live session.
+TRACKING_INTERVAL_S = 1.0
+#: Interval between the polls of the events of the background jobs.
+JOB_POLL_INTERVAL_MS = 100
+#: Background jobs.
+JOB_FIND_SEM_IMAGE = "find_sem_image"
+JOB_VIDEO = "video"
+#: Users of the shared capture.
+CAPTURE_LIVE_FFT = "live_fft"
+CAPTURE_VIDEO = "video"
 
 
 def get_log_file_path():
@@ -111,6 +140,46 @@ def setup_logger():
 logger = setup_logger()
 
 
+def get_micrograph_location(match):
+    """Return the (x, y) screen location of the micrograph below the PC-SEM toolbar *match*."""
+    return match.left-2, match.top+match.height+1
+
+
+def get_pane_arrangement(layout):
+    """Return the pane size and offsets of a :py:class:`pysemimaginggui.panes.PaneLayout`, ``None`` for one pane."""
+    if layout is None:
+        return None
+    return layout.pane_shape, tuple(layout.offsets)
+
+
+def configure_fft_analysis(fft_analysis, settings):
+    """Apply the live FFT *settings* of :py:meth:`TkMainGui.get_live_fft_settings` to *fft_analysis*."""
+    window_type, integration, integration_domain, number_frames, drift_tracking = settings
+    fft_analysis.set_window(window_type)
+    fft_analysis.set_integration(integration, integration_domain, number_frames, drift_tracking)
+
+
+def format_video_statistics(writer, change_filter, scheduler, frame_source, run_state_detector):
+    """
+    Return the text of the statistics of a video recording.
+
+    :param writer: :py:class:`pysemimaginggui.recording.AsyncFrameWriter` of the recording
+    :param change_filter: :py:class:`pysemimaginggui.recording.ChangedFrameWriter` or ``None``
+    :param scheduler: :py:class:`pysemimaginggui.scheduler.FrameScheduler` of the capture
+    :param frame_source: frame source of the capture
+    :param run_state_detector: :py:class:`pysemimaginggui.run_state.RunStateDetector` of the capture or ``None``
+    """
+    text = writer.format_statistics()
+    if change_filter is not None:
+        text += ", {} unchanged".format(change_filter.unchanged_frames)
+    text = "{}; {}".format(text, scheduler.format_statistics())
+    if isinstance(frame_source, ScanSyncFrameSource):
+        text += ", {} torn".format(frame_source.torn_frames)
+    if run_state_detector is not None and run_state_detector.state == STATE_PAUSED:
+        text += "; microscope paused"
+    return text
+
+
 class TkMainGui(ttk.Frame):
     def __init__(self, root):
         ttk.Frame.__init__(self, root, padding="3 3 12 12")
@@ -128,8 +197,16 @@ class TkMainGui(ttk.Frame):
 
         self.instrument = StringVar()
 
+        self.frame_source_backend = StringVar()
+        self.frame_source_backend.set(BACKEND_AUTO)
+        self.replay_path = StringVar()
+        self.replay_realtime = BooleanVar()
+        self.replay_realtime.set(True)
+
         self.is_sem_image = BooleanVar()
         self.is_sem_image.set(False)
+        self.all_panes = BooleanVar()
+        self.all_panes.set(False)
         self.sem_image_location = StringVar()
         self.sem_image_width = IntVar()
         self.sem_image_width.set(800)
@@ -138,9 +215,50 @@ class TkMainGui(ttk.Frame):
 
         self.frame_interval_ms = IntVar()
         self.frame_interval_ms.set(250)
+        self.scan_sync = BooleanVar()
+        self.scan_sync.set(False)
+
+        self.fft_window = StringVar()
+        self.fft_window.set(WINDOW_NONE)
+        self.live_display = StringVar()
+        self.live_display.set(get_default_live_display())
+
+        self.integration = StringVar()
+        self.integration.set(INTEGRATION_NONE)
+        self.integration_domain = StringVar()
+        self.integration_domain.set(DOMAIN_IMAGE)
+        self.integration_frames = IntVar()
+        self.integration_frames.set(DEFAULT_NUMBER_FRAMES)
+        self.drift_tracking = BooleanVar()
+        self.drift_tracking.set(False)
 
         self.video_acquisition_time_s = IntVar()
         self.video_acquisition_time_s.set(15)
+        self.segment_duration_min = IntVar()
+        self.segment_duration_min.set(30)
+        self.segment_size_gb = DoubleVar()
+        self.segment_size_gb.set(4.0)
+        self.video_backpressure = StringVar()
+        self.video_backpressure.set(BACKPRESSURE_DROP)
+        # Only identical frames are left out, their time is kept by the variable frame rate of the recordings.
+        self.video_changed_frames_only = BooleanVar()
+        self.video_changed_frames_only.set(True)
+        self.video_statistics = None
+
+        # The long operations run in worker threads, their progress is polled by the Tk thread.
+        self.jobs = JobManager()
+
+        # One capture of the micrograph feeds the live view and the video recording.
+        self.capture = None
+        self.capture_users = set()
+        self.capture_run_state_detector = None
+        self.capture_layout = None
+        self.live_view = None
+        self.live_pipeline = None
+        self.live_result = None
+        self.live_settings = None
+        self.live_timestamp = None
+        self.live_tracking_time = None
 
         self.results_text = StringVar()
 
@@ -158,15 +276,41 @@ class TkMainGui(ttk.Frame):
         instrument_entry.grid(column=3, row=row_id, sticky=(W, E))
         self.instrument.set(values[-1])
 
+        logger.debug("Create frame source selection")
+        row_id += 1
+        frame_source_label = ttk.Label(self, width=widget_width, text="Frame source: ", state="readonly")
+        frame_source_label.grid(column=2, row=row_id, sticky=(W, E))
+        frame_source_entry = ttk.Combobox(self, width=widget_width, textvariable=self.frame_source_backend,
+                                          values=get_screen_backends() + [BACKEND_REPLAY])
+        frame_source_entry.grid(column=3, row=row_id, sticky=(W, E))
+
+        logger.debug("Create replay selection")
+        row_id += 1
+        replay_path_label = ttk.Label(self, width=widget_width, textvariable=self.replay_path, state="readonly")
+        replay_path_label.grid(column=2, row=row_id, sticky=(W, E))
+        replay_path_button = ttk.Button(self, width=widget_width, text="Select replay frames",
+                                        command=self.select_replay_path)
+        replay_path_button.grid(column=3, row=row_id, sticky=W)
+        row_id += 1
+        ttk.Checkbutton(self, width=widget_width, text="Replay in real time",
+                        variable=self.replay_realtime).grid(column=3, row=row_id, sticky=(W, E))
+
         logger.debug("Create Find SEM image")
         row_id += 1
-        ttk.Button(self, width=widget_width, text="Find SEM image", command=self.find_sem_image).grid(column=3, row=row_id, sticky=W)
+        self.find_button = ttk.Button(self, width=widget_width, text="Find SEM image", command=self.find_sem_image)
+        self.find_button.grid(column=3, row=row_id, sticky=W)
+        row_id += 1
+        ttk.Checkbutton(self, width=widget_width, text="All the panes (dual and quad views)",
+                        variable=self.all_panes).grid(column=3, row=row_id, sticky=(W, E))
         row_id += 1
         ttk.Checkbutton(self, width=widget_width, text="SEM image", variable=self.is_sem_image, state=DISABLED).grid(column=3, row=row_id, sticky=(W, E))
         row_id += 1
         sem_image_location_label = ttk.Label(self, width=widget_width, textvariable=self.sem_image_location, state="readonly")
         sem_image_location_label.grid(column=3, row=row_id, sticky=(W, E))
         self.micrograph_location = None
+        self.micrograph_locator = None
+        #: :py:class:`pysemimaginggui.panes.PaneLayout` of the dual and quad views, ``None`` for one pane.
+        self.pane_layout = None
 
         logger.debug("Create sem image width label and edit entry")
         row_id += 1
@@ -188,6 +332,45 @@ class TkMainGui(ttk.Frame):
         frame_interval_label.grid(column=2, row=row_id, sticky=(W, E))
         frame_interval_entry = ttk.Entry(self, width=widget_width, textvariable=self.frame_interval_ms)
         frame_interval_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        ttk.Checkbutton(self, width=widget_width, text="Only complete scans (no torn frame)",
+                        variable=self.scan_sync).grid(column=3, row=row_id, sticky=(W, E))
+
+        logger.debug("Create FFT window selection")
+        row_id += 1
+        fft_window_label = ttk.Label(self, width=widget_width, text="FFT window: ", state="readonly")
+        fft_window_label.grid(column=2, row=row_id, sticky=(W, E))
+        fft_window_entry = ttk.Combobox(self, width=widget_width, textvariable=self.fft_window,
+                                        values=get_window_types())
+        fft_window_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        live_display_label = ttk.Label(self, width=widget_width, text="Live FFT display: ", state="readonly")
+        live_display_label.grid(column=2, row=row_id, sticky=(W, E))
+        self.live_display_entry = ttk.Combobox(self, width=widget_width, textvariable=self.live_display,
+                                               values=get_live_displays())
+        self.live_display_entry.grid(column=3, row=row_id, sticky=(W, E))
+
+        logger.debug("Create frame integration selection")
+        row_id += 1
+        integration_label = ttk.Label(self, width=widget_width, text="Frame integration: ", state="readonly")
+        integration_label.grid(column=2, row=row_id, sticky=(W, E))
+        integration_entry = ttk.Combobox(self, width=widget_width, textvariable=self.integration,
+                                         values=get_integration_methods())
+        integration_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        integration_domain_label = ttk.Label(self, width=widget_width, text="Integrate the FFT of: ", state="readonly")
+        integration_domain_label.grid(column=2, row=row_id, sticky=(W, E))
+        integration_domain_entry = ttk.Combobox(self, width=widget_width, textvariable=self.integration_domain,
+                                                values=get_integration_domains())
+        integration_domain_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        integration_frames_label = ttk.Label(self, width=widget_width, text="Integrated frames: ", state="readonly")
+        integration_frames_label.grid(column=2, row=row_id, sticky=(W, E))
+        integration_frames_entry = ttk.Entry(self, width=widget_width, textvariable=self.integration_frames)
+        integration_frames_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        ttk.Checkbutton(self, width=widget_width, text="Track the drift and align the integrated frames",
+                        variable=self.drift_tracking).grid(column=3, row=row_id, sticky=(W, E))
 
         logger.debug("Setup ffmpeg path")
         row_id += 1
@@ -204,6 +387,29 @@ class TkMainGui(ttk.Frame):
         video_acquisition_time_entry = ttk.Entry(self, width=widget_width, textvariable=self.video_acquisition_time_s)
         video_acquisition_time_entry.grid(column=3, row=row_id, sticky=(W, E))
 
+        logger.debug("Create video segment duration and size label and edit entry")
+        row_id += 1
+        segment_duration_label = ttk.Label(self, width=widget_width, text="Video segment duration (min): ", state="readonly")
+        segment_duration_label.grid(column=2, row=row_id, sticky=(W, E))
+        segment_duration_entry = ttk.Entry(self, width=widget_width, textvariable=self.segment_duration_min)
+        segment_duration_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        segment_size_label = ttk.Label(self, width=widget_width, text="Video segment size (GB): ", state="readonly")
+        segment_size_label.grid(column=2, row=row_id, sticky=(W, E))
+        segment_size_entry = ttk.Entry(self, width=widget_width, textvariable=self.segment_size_gb)
+        segment_size_entry.grid(column=3, row=row_id, sticky=(W, E))
+
+        logger.debug("Create video backpressure selection")
+        row_id += 1
+        video_backpressure_label = ttk.Label(self, width=widget_width, text="Video writer full: ", state="readonly")
+        video_backpressure_label.grid(column=2, row=row_id, sticky=(W, E))
+        video_backpressure_entry = ttk.Combobox(self, width=widget_width, textvariable=self.video_backpressure,
+                                                values=get_backpressures())
+        video_backpressure_entry.grid(column=3, row=row_id, sticky=(W, E))
+        row_id += 1
+        ttk.Checkbutton(self, width=widget_width, text="Video only stores the changed frames",
+                        variable=self.video_changed_frames_only).grid(column=3, row=row_id, sticky=(W, E))
+
         logger.debug("Take micrograph screenshot")
         row_id += 1
         self.screenshot_button = ttk.Button(self, width=widget_width, text="Take micrograph screenshot", command=self.take_sem_image_screenshot, state=DISABLED)
@@ -223,6 +429,12 @@ class TkMainGui(ttk.Frame):
         row_id += 1
         results_label = ttk.Label(self, textvariable=self.results_text, state="readonly")
         results_label.grid(column=2, row=row_id, sticky=(W, E))
+        self.cancel_button = ttk.Button(self, width=widget_width, text="Cancel", command=self.cancel_jobs,
+                                        state=DISABLED)
+        self.cancel_button.grid(column=3, row=row_id, sticky=W)
+        row_id += 1
+        self.progress_bar = ttk.Progressbar(self, maximum=100.0)
+        self.progress_bar.grid(column=2, row=row_id, columnspan=2, sticky=(W, E))
 
         for child in self.winfo_children():
             child.grid_configure(padx=5, pady=5)
@@ -230,122 +442,373 @@ class TkMainGui(ttk.Frame):
         # basename_entry.focus()
         self.results_text.set("Ready")
 
-    def find_sem_image(self):
+        self.after(JOB_POLL_INTERVAL_MS, self.poll_jobs)
+        root.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Only the cached location is checked at startup, the full screen search needs the button.
+        self.after_idle(self.find_sem_image, False)
+
+    def poll_jobs(self):
+        """Call the callbacks of the background jobs in the Tk thread."""
+        self.jobs.poll()
+        self.after(JOB_POLL_INTERVAL_MS, self.poll_jobs)
+
+    def show_job_progress(self, job, text, fraction):
+        self.results_text.set(text)
+        if fraction is None:
+            self.progress_bar.config(mode="indeterminate")
+            self.progress_bar.step()
+        else:
+            self.progress_bar.config(mode="determinate", value=fraction * 100.0)
+
+    def cancel_jobs(self):
+        logging.debug("cancel_jobs")
+        self.jobs.cancel()
+        self.results_text.set("Cancelling {}".format(", ".join(self.jobs.running_names)))
+
+    def update_controls(self):
+        """Enable the buttons of the operations available with the running jobs."""
+        searching = self.jobs.is_running(JOB_FIND_SEM_IMAGE)
+        available = NORMAL if self.is_sem_image.get() and not searching else DISABLED
+        self.find_button.config(state=DISABLED if searching else NORMAL)
+        self.screenshot_button.config(state=available)
+        # The buttons of the running operations stop them.
+        self.sem_fft_button.config(state=NORMAL if self.live_pipeline is not None else available)
+        self.sem_video_button.config(state=NORMAL if self.jobs.is_running(JOB_VIDEO) else available)
+        # The display of a running live FFT cannot change, the view is only replaced between sessions.
+        self.live_display_entry.config(state=DISABLED if self.live_pipeline is not None else NORMAL)
+        self.cancel_button.config(state=NORMAL if self.jobs.running_names else DISABLED)
+        if not self.jobs.running_names:
+            self.progress_bar.config(mode="determinate", value=0.0)
+
+    def close(self):
+        """Stop the jobs and the live FFT, the video being recorded is completed, and close the window."""
+        self.jobs.stop()
+        if self.live_pipeline is not None:
+            self.stop_micrograph_fft()
+        self.master.destroy()
+
+    def find_sem_image(self, full_search=True):
         logging.debug("find_sem_image")
-        self.results_text.set("Start find sem image")
-        micrograph_location = None
-        self.is_sem_image = False
-        self.screenshot_button.config(state=DISABLED)
-        self.sem_fft_button.config(state=DISABLED)
-        self.sem_video_button.config(state=DISABLED)
-
-        path = os.path.join(get_images_path(), self.instrument.get())
-
-        file_path = os.path.join(path, "pc_sem_su8230_pause.png")
-        logging.debug("pause file_path: %s (is file %s)", file_path, os.path.isfile(file_path))
-        pause_location = pyautogui.locateOnScreen(file_path)
-        logging.debug("pause_location: %s", pause_location)
-        if pause_location is not None:
-            micrograph_location = (pause_location[0], pause_location[1]+pause_location[3])
-
-        file_path = os.path.join(path, "pc_sem_su8230_pause.png")
-        logging.debug("run file_path: %s (is file %s)", file_path, os.path.isfile(file_path))
-        run_location = pyautogui.locateOnScreen(file_path)
-        logging.debug("run_location: %s", run_location)
-        if run_location is not None:
-            micrograph_location = (run_location[0], run_location[1]+run_location[3])
-
-        if micrograph_location is not None:
-            self.micrograph_location = (micrograph_location[0]-2, micrograph_location[1]+1)
-            self.is_sem_image = True
-            self.sem_image_location.set("Location: ({}, {})".format(*self.micrograph_location))
-            self.screenshot_button.config(state=NORMAL)
-            self.sem_fft_button.config(state=NORMAL)
-            self.sem_video_button.config(state=NORMAL)
+        if not self.is_screen_capture():
+            self.pane_layout = None
+            self.set_micrograph_location((0, 0))
+            self.update_controls()
+            return
 
+        # The settings are read in the Tk thread, the search runs in a worker thread.
+        self.results_text.set("Start find sem image")
+        instrument = self.instrument.get()
+        backend = self.frame_source_backend.get()
+        all_panes = self.all_panes.get()
+        self.jobs.start(JOB_FIND_SEM_IMAGE,
+                        lambda job: self.locate_micrograph(job, instrument, backend, full_search, all_panes),
+                        self.show_job_progress, self.find_sem_image_done)
+        self.update_controls()
+
+    def locate_micrograph(self, job, instrument, backend, full_search=True, all_panes=False):
+        """
+        Search the PC-SEM window, the job of :py:meth:`find_sem_image`, return a new micrograph locator.
+
+        With *all_panes*, the toolbars of all the panes of the dual and quad views are searched on one screen grab.
+        """
+        path = os.path.join(get_images_path(), instrument)
+
+        # All the templates of the instrument, e.g. the pause and run toolbars, are matched on one screen grab.
+        file_paths = get_template_files(path)
+        logging.debug("template file_paths: %s", file_paths)
+        job.report("Search the PC-SEM window")
+        micrograph_locator = MicrographLocator(instrument, file_paths, backend)
+        try:
+            if all_panes:
+                location = micrograph_locator.locate_panes(stop_event=job.cancel_event)
+            else:
+                location = micrograph_locator.locate(full_search, job.cancel_event)
+        finally:
+            # The next grab, e.g. of the tracking in the Tk thread, creates the frame source in its own thread.
+            micrograph_locator.close()
+        logging.debug("location: %s (%s)", location, micrograph_locator.method)
+        return micrograph_locator
+
+    def find_sem_image_done(self, job):
+        micrograph_locator = job.result
+        if job.error is not None:
+            self.is_sem_image.set(False)
+            self.results_text.set("Cannot locate the micrograph: {}".format(job.error))
+        elif micrograph_locator.match is None and job.is_cancelled:
+            self.results_text.set("Find sem image cancelled")
+        else:
+            if self.micrograph_locator is not None:
+                self.micrograph_locator.close()
+            self.micrograph_locator = micrograph_locator
+            match = micrograph_locator.match
+            if match is None:
+                self.is_sem_image.set(False)
+            else:
+                self.pane_layout = self.create_pane_layout(micrograph_locator.matches)
+                self.set_micrograph_location(get_micrograph_location(match))
+                if self.capture is not None:
+                    # The running capture follows the window found again, with the panes it was started with.
+                    self.capture.set_region(self.get_capture_region(self.capture_layout))
+                    if self.capture_run_state_detector is not None:
+                        self.capture_run_state_detector.set_match(match)
+            if self.capture is not None and \
+                    get_pane_arrangement(self.pane_layout) != get_pane_arrangement(self.capture_layout):
+                self.results_text.set("New panes, restart the live FFT and the video")
+            else:
+                self.results_text.set("Stop find sem image")
         logging.info("micrograph_location: %s", self.micrograph_location)
-        self.results_text.set("Stop find sem image")
+        self.update_controls()
+
+    def set_micrograph_location(self, micrograph_location):
+        self.micrograph_location = micrograph_location
+        self.is_sem_image.set(True)
+        text = "Location: ({}, {})".format(*self.micrograph_location)
+        if self.pane_layout is not None:
+            text += ", {} panes".format(self.pane_layout.number_panes)
+        self.sem_image_location.set(text)
+
+    def create_pane_layout(self, matches):
+        """Return the layout of the panes below the toolbar *matches*, ``None`` for only one pane."""
+        if len(matches) < 2:
+            return None
+        size = (self.sem_image_width.get(), self.sem_image_height.get())
+        try:
+            return PaneLayout([get_micrograph_location(match) + size for match in matches])
+        except ValueError as message:
+            logging.warning("Only the first pane is captured: %s", message)
+            return None
+
+    def track_micrograph(self, capture, run_state_detector=None):
+        """Follow a moved PC-SEM window during a live session, return ``True`` if the window moved."""
+        micrograph_locator = self.micrograph_locator
+        if micrograph_locator is None or micrograph_locator.match is None or not self.is_screen_capture():
+            return False
+
+        location = micrograph_locator.track()
+        if location is None:
+            self.results_text.set("PC-SEM window lost")
+            return False
+
+        micrograph_location = get_micrograph_location(location)
+        if micrograph_location == self.micrograph_location:
+            return False
+
+        self.set_micrograph_location(micrograph_location)
+        capture.set_region(self.get_capture_region(self.capture_layout))
+        if run_state_detector is not None:
+            run_state_detector.set_match(location)
+        return True
+
+    def create_run_state_detector(self):
+        """Return the detector of the pause and run toolbar of the located window, ``None`` if not available."""
+        micrograph_locator = self.micrograph_locator
+        if micrograph_locator is None or micrograph_locator.match is None or not self.is_screen_capture():
+            return None
+        try:
+            return RunStateDetector(micrograph_locator.locator.templates, micrograph_locator.match,
+                                    self.frame_source_backend.get())
+        except ValueError as message:
+            logging.info("No run state detection: %s", message)
+            return None
+
+    def get_live_view(self):
+        """Return the live view next to the settings, created at its first use and again when its display changed."""
+        live_display = self.live_display.get()
+        if self.live_view is not None and self.live_view.live_display != live_display:
+            self.live_view.destroy()
+            self.live_view = None
+        if self.live_view is None:
+            self.live_view = LiveView(self, live_display)
+            self.live_view.grid(column=4, row=0, rowspan=self.grid_size()[1], sticky=(N, W, E, S), padx=5, pady=5)
+        return self.live_view
+
+    def acquire_capture(self, user):
+        """
+        Return the capture of the micrograph shared by the live FFT and the video recording.
+
+        The capture is started by its first user with the current settings and stopped by :py:meth:`release_capture`
+        of its last user. A :py:class:`ValueError` is raised when the frame source cannot be created.
+        """
+        if self.capture is None:
+            frame_source = self.create_capture_source(self.create_frame_source())
+            # While the microscope is paused, only the toolbar box is grabbed.
+            run_state_detector = self.create_run_state_detector()
+            self.capture = SharedCapture(frame_source, self.frame_interval_ms.get() * 1e-3,
+                                         run_state_detector.is_paused if run_state_detector is not None else None)
+            self.capture_run_state_detector = run_state_detector
+            self.capture_layout = self.pane_layout if self.is_screen_capture() else None
+            self.capture.start()
+            logging.info("Capture region: %s", frame_source.region)
+        self.capture_users.add(user)
+        return self.capture
+
+    def release_capture(self, user):
+        self.capture_users.discard(user)
+        if self.capture_users or self.capture is None:
+            return
+
+        capture, self.capture = self.capture, None
+        self.capture_layout = None
+        capture.stop()
+        capture.frame_source.close()
+        if self.capture_run_state_detector is not None:
+            self.capture_run_state_detector.close()
+            self.capture_run_state_detector = None
+        logging.info("Capture statistics: %s", capture.statistics())
 
     def take_sem_image_screenshot(self):
         logging.debug("take_sem_image_screenshot")
         self.results_text.set("Take SEM screenshot")
 
-        fig = plt.figure()
-
-        top_pixel = self.micrograph_location[0]
-        left_pixel = self.micrograph_location[1]
-        width_pixel = self.sem_image_width.get()
-        height_pixel = self.sem_image_height.get()
-        micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-        logging.info("Screenshot format: %s; size: %s; mode: %s", micrograph_image.format, micrograph_image.size, micrograph_image.mode)
-        micrograph_image.save("screenshot.png")
-
-        # micrograph_image = micrograph_image.convert("L")
-        micrograph_image = micrograph_image.convert("F")
-
-        # micrograph_image = np.asarray(micrograph_image, dtype=np.float32)
-        micrograph_image = np.asarray(micrograph_image)
+        if self.live_timestamp is not None:
+            # The frame of the last live result, the live capture is not interrupted.
+            micrograph_image = self.live_result["frame"].copy()
+        else:
+            try:
+                frame_source = self.create_frame_source()
+            except ValueError as message:
+                self.results_text.set(str(message))
+                return
+            with frame_source:
+                micrograph_image = frame_source.grab()
+                logging.info("Screenshot region: %s", frame_source.region)
+        Image.fromarray(micrograph_image).save("screenshot.png")
         logging.info("micrograph_image shape: %s; dtype: %s", micrograph_image.shape, micrograph_image.dtype)
 
-        fft_image = plt.imshow(1.0 - micrograph_image, cmap=plt.cm.binary)
-        # fft_image = plt.imshow(micrograph_image)
-        plt.xticks([])
-        plt.yticks([])
-
-        plt.tight_layout()
-
-        plt.show()
+        self.get_live_view().show_frame(micrograph_image)
 
     def compute_micrograph_fft(self):
         logging.debug("compute_micrograph_fft")
-        self.results_text.set("Compute micrograph fft")
-
-        fig = plt.figure()
-
-        top_pixel = self.micrograph_location[0]
-        left_pixel = self.micrograph_location[1]
-        width_pixel = self.sem_image_width.get()
-        height_pixel = self.sem_image_height.get()
-        micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-        logging.info("Screenshot format: %s; size: %s; mode: %s", micrograph_image.format, micrograph_image.size,
-                     micrograph_image.mode)
-        # micrograph_image.save("screenshot.png")
-
-        micrograph_image = micrograph_image.convert("F")
-        micrograph_image = np.asarray(micrograph_image)
-
-        fft_micrograph_image = fft2(micrograph_image)
-        fft_micrograph_image = fftshift(fft_micrograph_image)
-        fft_micrograph_image = np.abs(fft_micrograph_image) ** 2
-        fft_micrograph_image = np.log10(fft_micrograph_image)
-
-        logging.info("micrograph_image shape: %s; dtype: %s", micrograph_image.shape, micrograph_image.dtype)
-
-        fft_image = plt.imshow(fft_micrograph_image, animated=True)
-
-        plt.xticks([])
-        plt.yticks([])
-
-        plt.tight_layout()
+        if self.live_pipeline is not None:
+            # The same button stops the live FFT, the last results stay displayed.
+            self.stop_micrograph_fft()
+            return
+
+        try:
+            settings = self.get_live_fft_settings()
+        except ValueError as message:
+            self.results_text.set(str(message))
+            return
+
+        try:
+            capture = self.acquire_capture(CAPTURE_LIVE_FFT)
+        except ValueError as message:
+            self.results_text.set(str(message))
+            return
 
-        def update_figure(*args):
-            micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-            micrograph_image = micrograph_image.convert("F")
-            micrograph_image = np.asarray(micrograph_image)
-
-            fft_micrograph_image = fft2(micrograph_image)
-            fft_micrograph_image = fftshift(fft_micrograph_image)
-            fft_micrograph_image = np.abs(fft_micrograph_image) ** 2
-            fft_micrograph_image = np.log10(fft_micrograph_image)
-
-            fft_image.set_array(fft_micrograph_image)
-
-            return fft_image,
-
-        interval_ms = self.frame_interval_ms.get()
-        ani = animation.FuncAnimation(fig, update_figure, interval=interval_ms, blit=True)
-
-        plt.show()
+        self.results_text.set("Compute micrograph fft")
+        live_view = self.get_live_view()
+        window_type, integration, integration_domain, number_frames, drift_tracking = settings
+        if self.capture_layout is not None:
+            # The panes are split from the frames of their union and transformed together.
+            fft_analysis = MultiPaneFftAnalysis(self.capture_layout, window_type, integration, integration_domain,
+                                                number_frames)
+            number_panes = self.capture_layout.number_panes
+        else:
+            fft_analysis = FftAnalysis(capture.shape, window_type, integration, integration_domain, number_frames,
+                                       drift_tracking)
+            number_panes = 1
+        self.live_pipeline = LivePipeline(None, fft_analysis, None, result_shape=(),
+                                          result_dtype=fft_analysis.result_dtype, capture=capture)
+        self.live_result = fft_analysis.create_result()
+        self.live_settings = settings
+        self.live_timestamp = None
+        self.live_tracking_time = time.monotonic()
+
+        live_view.start(fft_analysis.radial_profile.frequencies, capture.frame_interval_s, number_panes)
+        self.live_pipeline.start()
+        self.sem_fft_button.config(text="Stop micrograph FT live")
+        self.update_controls()
+        self.after(int(capture.frame_interval_s * 1.0e3), self.update_micrograph_fft)
+
+    def get_live_fft_settings(self):
+        """
+        Return the (window, integration, domain, number of frames, drift tracking) settings of the live FFT.
+
+        :raise ValueError: for an invalid setting, e.g. an empty field or no integrated frame
+        """
+        try:
+            settings = (self.fft_window.get(), self.integration.get(), self.integration_domain.get(),
+                        self.integration_frames.get(), self.drift_tracking.get())
+        except TclError as message:
+            raise ValueError("Invalid live FFT setting: {}".format(message))
+
+        window_type, integration, integration_domain, number_frames, _drift_tracking = settings
+        if window_type not in get_window_types():
+            raise ValueError("Unknown FFT window: {}".format(window_type))
+        if integration not in get_integration_methods():
+            raise ValueError("Unknown integration method: {}".format(integration))
+        if integration_domain not in get_integration_domains():
+            raise ValueError("Unknown integration domain: {}".format(integration_domain))
+        if number_frames < 1:
+            raise ValueError("The number of integrated frames must be at least 1: {}".format(number_frames))
+        return settings
+
+    def update_micrograph_fft(self):
+        """Show the newest result of the live FFT, polled by the Tk event loop."""
+        pipeline = self.live_pipeline
+        if pipeline is None:
+            return
+
+        try:
+            is_running = self.show_micrograph_fft(pipeline)
+        except Exception as message:
+            # An error of one update does not stop the polling, the live view goes on.
+            logging.exception("Live FFT update error")
+            self.results_text.set("Live FFT update error: {}".format(message))
+            is_running = True
+        if is_running:
+            self.after(int(pipeline.frame_interval_s * 1.0e3), self.update_micrograph_fft)
+        else:
+            # End of the replayed frames or capture error.
+            self.stop_micrograph_fft()
+
+    def show_micrograph_fft(self, pipeline):
+        """
+        Apply the changed settings and show the newest result of the live FFT.
+
+        :return: ``False`` when the capture ended
+        """
+        try:
+            settings = self.get_live_fft_settings()
+        except ValueError as message:
+            # The analysis keeps the last valid settings.
+            self.results_text.set(str(message))
+        else:
+            if settings != self.live_settings:
+                # The settings are applied by the compute thread between two frames.
+                self.live_settings = settings
+                pipeline.change_process(functools.partial(configure_fft_analysis, pipeline.process, settings))
+
+        fft_analysis = pipeline.process
+        if time.monotonic() - self.live_tracking_time >= TRACKING_INTERVAL_S:
+            self.live_tracking_time = time.monotonic()
+            self.track_micrograph(pipeline.capture, self.capture_run_state_detector)
+
+        timestamp = pipeline.get_result(self.live_result)
+        if timestamp is not None:
+            self.live_timestamp = timestamp
+            self.live_view.show_result(self.live_result, timestamp, fft_analysis.drift_tracker is not None)
+        elif pipeline.is_paused:
+            self.live_view.show_message("Microscope paused\n" +
+                                        format_focus_metrics(self.live_result["focus_metrics"]))
+        elif not pipeline.is_running:
+            return False
+        return True
+
+    def stop_micrograph_fft(self):
+        pipeline, self.live_pipeline = self.live_pipeline, None
+        pipeline.stop()
+        self.release_capture(CAPTURE_LIVE_FFT)
+        self.live_timestamp = None
+        self.sem_fft_button.config(text="Compute micrograph FT live")
+        self.update_controls()
+        logging.info("Live FFT statistics: %s", pipeline.statistics())
+        if pipeline.error is not None:
+            self.results_text.set("Live FFT error: {}".format(pipeline.error))
+        else:
+            self.results_text.set("Stop micrograph fft")
 
     def find_all_instruments(self):
         logging.debug("find_all_instruments")
@@ -358,45 +821,136 @@ class TkMainGui(ttk.Frame):
 
     def acquire_sem_video(self):
         logging.debug("acquire_sem_video")
-        self.results_text.set("Acquire micrograph video")
-
-        number_frames = int(self.video_acquisition_time_s.get() / (self.frame_interval_ms.get() * 1e-3))
-        frame_per_second = 1.0 / (self.frame_interval_ms.get() * 1e-3)
+        if self.jobs.is_running(JOB_VIDEO):
+            # The same button stops the recording, the frames already captured are written.
+            self.jobs.cancel(JOB_VIDEO)
+            self.results_text.set("Stopping micrograph video")
+            return
 
-        video_file_path = filedialog.asksaveasfilename(title="Select the video filename", filetypes=[("video file", "*.mp4")])
-
-        fig = plt.figure()
-
-        top_pixel = self.micrograph_location[0]
-        left_pixel = self.micrograph_location[1]
-        width_pixel = self.sem_image_width.get()
-        height_pixel = self.sem_image_height.get()
-        micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-        micrograph_image = micrograph_image.convert("F")
-        micrograph_image = np.asarray(micrograph_image)
-
-        sem_image_plot = plt.imshow(1.0-micrograph_image, animated=True, cmap=plt.cm.Greys)
-        plt.xticks([])
-        plt.yticks([])
-
-        plt.tight_layout()
-
-        def updatefig(*args):
-            update_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-            update_image = update_image.convert("F")
-            update_image = np.asarray(update_image)
-
-            sem_image_plot.set_array(1.0-update_image)
-            return sem_image_plot,
-
-        interval_ms = self.frame_interval_ms.get()
-        # ani = animation.FuncAnimation(fig, updatefig, interval=interval_ms, blit=True, frames=number_frames)
-        ani = animation.FuncAnimation(fig, updatefig, interval=interval_ms, blit=False, save_count=number_frames)
+        self.results_text.set("Acquire micrograph video")
 
-        # FFwriter = animation.FFMpegWriter(fps=30, extra_args=['-vcodec', 'libx264'])
-        FFwriter = animation.FFMpegWriter(fps=frame_per_second, extra_args=['-vcodec', 'libx264'])
-        ani.save(video_file_path, writer=FFwriter)
-        self.results_text.set("Stop micrograph video")
+        filetypes = [("video file", "*.mp4"), ("lossless frame store", "*" + FRAME_STORE_EXTENSION),
+                     ("PNG burst", "*.png")]
+        video_file_path = filedialog.asksaveasfilename(title="Select the video filename", filetypes=filetypes)
+        if not video_file_path:
+            self.results_text.set("Ready")
+            return
+
+        # The frames are shared with the live FFT when it is running, at the interval of its capture.
+        try:
+            capture = self.acquire_capture(CAPTURE_VIDEO)
+        except ValueError as message:
+            self.results_text.set(str(message))
+            return
+        shape = capture.shape
+        # An acquisition time of 0 records until the video is stopped.
+        number_frames = int(self.video_acquisition_time_s.get() / capture.frame_interval_s) or None
+
+        def create_recorder(file_path):
+            return self.create_video_writer(file_path, shape)
+
+        # The gray frames go straight to ffmpeg or to the frame store at the region resolution, in segments.
+        recorder = SegmentedRecorder(create_recorder, video_file_path, self.segment_duration_min.get() * 60.0,
+                                     int(self.segment_size_gb.get() * 1024 ** 3))
+        writer = recorder
+        change_filter = None
+        if self.video_changed_frames_only.get():
+            # The unchanged frames, e.g. slow scan or paused microscope, are not encoded.
+            change_filter = ChangedFrameWriter(writer, ChangeDetector(shape))
+            writer = change_filter
+        integrator = create_integrator(self.integration.get(), shape, self.integration_frames.get())
+        if integrator is not None:
+            # The frames are recorded integrated, the integration of the spectra only applies to the live FFT.
+            writer = IntegratedFrameWriter(writer, integrator)
+        # The capture thread only queues a copy of the frames. The integration, the change detection and the encoding
+        # run in the worker thread of the queue, they do not delay the capture shared with the live FFT.
+        writer = AsyncFrameWriter(writer, shape, backpressure=self.video_backpressure.get())
+        # The statistics only read the recording objects, they are formatted by the job and by the Tk thread. Nothing
+        # is captured nor encoded while the microscope is paused.
+        self.video_statistics = functools.partial(format_video_statistics, writer, change_filter, capture.scheduler,
+                                                  capture.frame_source, self.capture_run_state_detector)
+        statistics = self.video_statistics
+        self.jobs.start(JOB_VIDEO,
+                        lambda job: self.record_video(job, capture, writer, recorder, number_frames, statistics),
+                        self.show_job_progress, self.acquire_sem_video_done)
+        self.sem_video_button.config(text="Stop video")
+        self.update_controls()
+
+    def record_video(self, job, capture, writer, recorder, number_frames, statistics):
+        """
+        Recording job of :py:meth:`acquire_sem_video`, the widgets are only updated by the job callbacks.
+
+        :param statistics: function returning the text of the recording statistics, it only reads the recording
+            objects, not the widgets
+        """
+        def report_progress(frame_count):
+            fraction = float(frame_count) / number_frames if number_frames is not None else None
+            job.report("Recording: {}".format(statistics()), fraction)
+
+        with writer:
+            frame_count = record_shared_frames(capture, writer, number_frames, job.cancel_event, report_progress)
+        logging.info("Recorded %s of %s in %s", statistics(), capture.frame_source.region, recorder.file_paths)
+        return frame_count
+
+    def acquire_sem_video_done(self, job):
+        self.release_capture(CAPTURE_VIDEO)
+        self.sem_video_button.config(text="Acquire video")
+        if job.error is not None:
+            self.results_text.set("Video recording error: {}".format(job.error))
+        else:
+            self.results_text.set("Stop micrograph video: {}".format(self.video_statistics()))
+        self.update_controls()
+
+    def create_video_writer(self, file_path, shape):
+        """Return the lossless frame store writer for a ``.frames`` path, a PNG burst for ``.png``, otherwise the ffmpeg
+        recorder."""
+        if file_path.endswith(FRAME_STORE_EXTENSION):
+            return FrameStoreWriter(file_path, shape, compression=get_default_compression())
+        if file_path.lower().endswith(".png"):
+            return PngBurstWriter(file_path)
+        return FfmpegRecorder(file_path, shape, get_ffmpeg_path())
+
+    def get_micrograph_region(self):
+        return (self.micrograph_location[0], self.micrograph_location[1],
+                self.sem_image_width.get(), self.sem_image_height.get())
+
+    def get_capture_region(self, layout):
+        """
+        Return the screen region grabbed, the union of the panes of the dual and quad views.
+
+        :param layout: :py:class:`pysemimaginggui.panes.PaneLayout`, only the micrograph when ``None``
+        """
+        if layout is not None:
+            return layout.get_region(self.micrograph_location)
+        return self.get_micrograph_region()
+
+    def is_screen_capture(self):
+        return self.frame_source_backend.get() not in (BACKEND_SYNTHETIC, BACKEND_REPLAY)
+
+    def create_frame_source(self):
+        """Return the frame source of the selected backend, raise :py:class:`ValueError` without replay frames."""
+        if self.frame_source_backend.get() == BACKEND_REPLAY:
+            if not self.replay_path.get():
+                self.select_replay_path()
+            if not self.replay_path.get():
+                raise ValueError("No replay frames selected")
+            # The recorded frames are the micrograph, they are replayed without cropping.
+            return create_frame_source(BACKEND_REPLAY, None, frames=self.replay_path.get(),
+                                       realtime=self.replay_realtime.get())
+        return create_frame_source(self.frame_source_backend.get(), self.get_capture_region(self.pane_layout))
+
+    def create_capture_source(self, frame_source):
+        """Return the frame source of the pipelines, only the complete scans with the scan synchronisation."""
+        if self.scan_sync.get():
+            return ScanSyncFrameSource(frame_source)
+        return frame_source
+
+    def select_replay_path(self):
+        path = filedialog.askdirectory(title="Select the frame store folder (*{})".format(FRAME_STORE_EXTENSION),
+                                       mustexist=True)
+        logger.debug("Selected replay path: %s", path)
+        if path:
+            self.replay_path.set(path)
 
     def setup_ffmpeg_path(self):
         logging.debug("setup_ffmpeg_path")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.panes
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Micrograph panes of the PC-SEM display layouts.
+
+PC-SEM shows one micrograph, or two or four panes side by side in its dual and quad layouts, e.g. one pane per
+detector. The panes are captured with one screen grab of their union bounding box, then split in zero-copy views of
+that frame, so all the panes of a frame come from the same instant and the grab cost does not grow with the number of
+panes.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+#: Largest number of panes of the PC-SEM layouts, the quad layout.
+MAXIMUM_PANES = 4
+
+
+def sort_regions(regions):
+    """
+    Return the (x, y, width, height) *regions* in reading order, row by row from the top left.
+
+    The regions of the same row can be a few pixels apart vertically, a region starts a new row when it is below the
+    middle of the first region of the current row.
+    """
+    rows = []
+    for region in sorted(regions, key=lambda region: region[1]):
+        if rows and region[1] < rows[-1][0][1] + rows[-1][0][3] / 2.0:
+            rows[-1].append(region)
+        else:
+            rows.append([region])
+    return [region for row in rows for region in sorted(row, key=lambda region: region[0])]
+
+
+def get_union_region(regions):
+    """Return the (x, y, width, height) bounding box of all the *regions*."""
+    left = min(region[0] for region in regions)
+    top = min(region[1] for region in regions)
+    right = max(region[0] + region[2] for region in regions)
+    bottom = max(region[1] + region[3] for region in regions)
+    return left, top, right - left, bottom - top
+
+
+class PaneLayout(object):
+    """
+    Panes of the same size captured in one grab of their union.
+
+    :param regions: (x, y, width, height) screen regions of the panes, in any order
+    """
+    def __init__(self, regions):
+        if not regions:
+            raise ValueError("A layout needs at least one pane")
+        regions = sort_regions([tuple(region) for region in regions])
+        sizes = set(region[2:] for region in regions)
+        if len(sizes) != 1:
+            raise ValueError("The panes do not have the same size: {}".format(regions))
+
+        self.regions = regions
+        self.region = get_union_region(regions)
+        width, height = sizes.pop()
+        self.pane_shape = (height, width)
+        self.shape = (self.region[3], self.region[2])
+        #: (top, left) of each pane in the union frame.
+        self.offsets = [(region[1] - self.region[1], region[0] - self.region[0]) for region in regions]
+
+    @property
+    def number_panes(self):
+        return len(self.regions)
+
+    def get_region(self, location):
+        """
+        Return the union region with the first pane at *location*, e.g. after the PC-SEM window moved.
+
+        :param tuple location: (x, y) screen location of the first pane
+        """
+        top, left = self.offsets[0]
+        return location[0] - left, location[1] - top, self.region[2], self.region[3]
+
+    def split(self, frame):
+        """
+        Return the views of the panes in a frame of the union region, no pixel is copied.
+
+        :param frame: frame of :py:attr:`shape`
+        :rtype: list of :py:class:`numpy.ndarray`
+        """
+        height, width = self.pane_shape
+        return [frame[top:top + height, left:left + width] for top, left in self.offsets]
@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.pipeline
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Threaded capture, compute and display pipeline.
+
+The capture thread grabs frames at a fixed cadence and puts them in a ring buffer of preallocated frames. The compute
+thread processes the frames (e.g. FFT) and puts the results in a second ring buffer read by the display, usually a
+matplotlib or Tk timer. A slow computation or a slow redraw drops frames instead of delaying the capture.
+
+The capture thread is a :py:class:`SharedCapture`, several pipelines and the video recording can share one grab per
+frame.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import logging
+import threading
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.scheduler import FrameScheduler
+
+# Globals and constants variables.
+#: When the ring buffer is full, overwrite the oldest unread frame.
+DROP_OLDEST = "drop_oldest"
+#: When the ring buffer is full, discard the new frame.
+DROP_NEWEST = "drop_newest"
+#: When the ring buffer is full, wait for a free slot, nothing is dropped.
+BLOCK = "block"
+
+
+class FrameRingBuffer(object):
+    """
+    Fixed-size ring buffer of preallocated frames shared between threads.
+
+    Frames are copied in by :py:meth:`put` and copied out by :py:meth:`get`, so the producer and the consumer keep
+    their own buffers and no array is allocated per frame.
+
+    :param tuple shape: shape of one frame, ``()`` for a frame of a structured data type
+    :param dtype: data type of the frames
+    :param int size: number of frames in the buffer
+    :param str policy: :py:data:`DROP_OLDEST`, :py:data:`DROP_NEWEST` or :py:data:`BLOCK` when the buffer is full
+    """
+    def __init__(self, shape, dtype=np.uint8, size=4, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError("Unknown drop policy: {}".format(policy))
+        if size < 1:
+            raise ValueError("The ring buffer size must be at least 1")
+
+        self.shape = tuple(shape)
+        self.size = size
+        self.policy = policy
+        self._frames = np.zeros((size,) + self.shape, dtype=dtype)
+        self._timestamps = np.zeros(size, dtype=np.float64)
+        self._read_count = 0
+        self._write_count = 0
+        self._condition = threading.Condition()
+        self.closed = False
+
+        self.written_frames = 0
+        self.read_frames = 0
+        self.dropped_frames = 0
+
+    def __len__(self):
+        with self._condition:
+            return self._write_count - self._read_count
+
+    def put(self, frame, timestamp, timeout=None):
+        """
+        Copy a frame in the buffer.
+
+        :param float timeout: maximum waiting time in seconds for a free slot with :py:data:`BLOCK`, wait forever when
+            ``None``, the frame is dropped after the timeout
+        :return: ``False`` if the frame was dropped
+        :rtype: bool
+        """
+        with self._condition:
+            if self.policy == BLOCK:
+                has_slot = self._condition.wait_for(
+                    lambda: self._write_count - self._read_count < self.size or self.closed, timeout)
+                if self.closed:
+                    return False
+                if not has_slot:
+                    self.dropped_frames += 1
+                    return False
+            elif self._write_count - self._read_count >= self.size:
+                self.dropped_frames += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._read_count += 1
+
+            slot = self._write_count % self.size
+            np.copyto(self._frames[slot, ...], frame, casting="unsafe")
+            self._timestamps[slot] = timestamp
+            self._write_count += 1
+            self.written_frames += 1
+            if self.policy == BLOCK:
+                # The producers and the consumer wait on the same condition.
+                self._condition.notify_all()
+            else:
+                self._condition.notify()
+            return True
+
+    def get(self, out, timeout=None, latest=False):
+        """
+        Copy the oldest unread frame in *out*.
+
+        :param out: preallocated array receiving the frame
+        :param float timeout: maximum waiting time in seconds, wait forever when ``None``, do not wait when 0
+        :param bool latest: skip the unread frames older than the newest one, they are counted as dropped
+        :return: timestamp of the frame, ``None`` if no frame was available or the buffer is closed
+        """
+        with self._condition:
+            if self._write_count == self._read_count and not self.closed and timeout != 0:
+                self._condition.wait_for(lambda: self._write_count != self._read_count or self.closed, timeout)
+            if self._write_count == self._read_count:
+                return None
+
+            if latest:
+                self.dropped_frames += self._write_count - self._read_count - 1
+                self._read_count = self._write_count - 1
+
+            slot = self._read_count % self.size
+            np.copyto(out, self._frames[slot, ...], casting="unsafe")
+            timestamp = self._timestamps[slot]
+            self._read_count += 1
+            self.read_frames += 1
+            if self.policy == BLOCK:
+                self._condition.notify_all()
+            return timestamp
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class SharedCapture(object):
+    """
+    Capture thread that hands each frame to several consumers.
+
+    One grab per frame feeds all the consumers, e.g. the live view and the video recording. The consumers are called
+    by the capture thread as ``consumer(frame, timestamp)``, one after the other, and must return quickly, e.g.
+    :py:meth:`FrameRingBuffer.put` with a drop policy or :py:meth:`pysemimaginggui.recording.AsyncFrameWriter.write`:
+    a slow consumer delays the next consumers and the next captures. The frame is only valid during the call.
+
+    :param frame_source: :py:class:`pysemimaginggui.frame_source.FrameSource` used by the capture thread
+    :param float frame_interval_s: capture interval in seconds
+    :param pause_detector: function called before each capture, nothing is captured while it returns ``True``, e.g.
+        :py:meth:`pysemimaginggui.run_state.RunStateDetector.is_paused`
+    """
+    def __init__(self, frame_source, frame_interval_s, pause_detector=None):
+        self.frame_source = frame_source
+        self.frame_interval_s = frame_interval_s
+        self.pause_detector = pause_detector
+        self.scheduler = FrameScheduler(frame_interval_s)
+
+        # The consumers are called without the lock of the list, while the dispatch lock is held, so a removed
+        # consumer is not called anymore once the dispatch of the current frame is done.
+        self._consumers = []
+        self._consumers_lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._region_lock = threading.Lock()
+        self._pending_region = None
+        self._thread = None
+        self.captured_frames = 0
+        self.paused_slots = 0
+        self.is_paused = False
+        self.error = None
+
+    @property
+    def shape(self):
+        return self.frame_source.shape
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_consumer(self, consumer, on_stop=None):
+        """
+        Hand the next frames to *consumer*.
+
+        :param consumer: function called as ``consumer(frame, timestamp)``
+        :param on_stop: function called without argument when the consumer is removed, by :py:meth:`remove_consumer`,
+            at the end of the capture or after an error of the consumer
+        """
+        with self._consumers_lock:
+            self._consumers.append((consumer, on_stop))
+
+    def remove_consumer(self, consumer):
+        """
+        Stop handing the frames to *consumer*, it is not called anymore when this method returns.
+
+        Outside the capture thread, the method waits for the end of the dispatch of the current frame.
+        """
+        with self._consumers_lock:
+            removed = [item for item in self._consumers if item[0] == consumer]
+            self._consumers = [item for item in self._consumers if item[0] != consumer]
+        if threading.current_thread() is not self._thread:
+            with self._dispatch_lock:
+                pass
+        for _consumer, on_stop in removed:
+            if on_stop is not None:
+                on_stop()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._capture_loop, name="capture")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self.frame_source.interrupt()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def set_region(self, region):
+        """
+        Move the captured region, applied by the capture thread before its next grab.
+
+        :param tuple region: (x, y, width, height), the size must not change
+        """
+        if tuple(region[2:]) != tuple(self.frame_source.region[2:]):
+            raise ValueError("The captured region size cannot change: {}".format(region))
+        with self._region_lock:
+            self._pending_region = tuple(region)
+
+    def statistics(self):
+        return {
+            "captured": self.captured_frames,
+            "skipped_slots": self.scheduler.skipped_slots,
+            "paused_slots": self.paused_slots,
+            "frame_rate": self.scheduler.frame_rate,
+            "jitter_ms": self.scheduler.jitter_s * 1.0e3,
+        }
+
+    def _dispatch(self, frame, timestamp):
+        failed_consumers = []
+        with self._dispatch_lock:
+            with self._consumers_lock:
+                consumers = list(self._consumers)
+            for consumer, _on_stop in consumers:
+                try:
+                    consumer(frame, timestamp)
+                except Exception:
+                    logging.exception("Frame consumer error")
+                    failed_consumers.append(consumer)
+        for consumer in failed_consumers:
+            self.remove_consumer(consumer)
+
+    def _capture_loop(self):
+        self.scheduler.reset()
+        try:
+            while self.scheduler.wait(self._stop_event):
+                with self._region_lock:
+                    region, self._pending_region = self._pending_region, None
+                if region is not None:
+                    self.frame_source.set_region(region)
+                self.is_paused = self.pause_detector is not None and self.pause_detector()
+                if self.is_paused:
+                    self.paused_slots += 1
+                    continue
+                frame = self.frame_source.grab()
+                self._dispatch(frame, self.scheduler.mark())
+                self.captured_frames += 1
+        except StopIteration:
+            logging.info("Capture stopped: no more frame")
+        except Exception as message:
+            logging.exception("Capture error")
+            self.error = message
+        finally:
+            self.is_paused = False
+            with self._consumers_lock:
+                consumers, self._consumers = self._consumers, []
+            for _consumer, on_stop in consumers:
+                if on_stop is not None:
+                    on_stop()
+
+
+class LivePipeline(object):
+    """
+    Capture and compute threads linked by ring buffers.
+
+    The compute function is called as ``process(frame, out)`` and writes its result in *out*. The display polls the
+    newest result with :py:meth:`get_result`.
+
+    :param frame_source: :py:class:`pysemimaginggui.frame_source.FrameSource` used by the capture thread, not used
+        with *capture*
+    :param process: compute function, the frames are only captured when ``None``
+    :param float frame_interval_s: capture interval in seconds
+    :param tuple result_shape: shape of the results, the frame shape when ``None``
+    :param result_dtype: data type of the results
+    :param int buffer_size: number of frames in the capture ring buffer
+    :param str policy: drop policy of the capture ring buffer
+    :param pause_detector: function called before each capture, nothing is captured nor computed while it returns
+        ``True``, e.g. :py:meth:`pysemimaginggui.run_state.RunStateDetector.is_paused`; the display keeps the last
+        result
+    :param capture: :py:class:`SharedCapture` started and stopped by its owner, the frames are shared with its other
+        consumers. A capture of *frame_source* owned by the pipeline when ``None``.
+    """
+    def __init__(self, frame_source, process, frame_interval_s, result_shape=None, result_dtype=np.float32,
+                 buffer_size=4, policy=DROP_OLDEST, pause_detector=None, capture=None):
+        self.owns_capture = capture is None
+        if capture is None:
+            capture = SharedCapture(frame_source, frame_interval_s, pause_detector)
+        self.capture = capture
+        self.frame_source = capture.frame_source
+        self.process = process
+        self.frame_interval_s = capture.frame_interval_s
+        self.scheduler = capture.scheduler
+
+        frame_shape = self.frame_source.shape
+        if result_shape is None:
+            result_shape = frame_shape
+
+        self.frames = FrameRingBuffer(frame_shape, np.uint8, buffer_size, policy)
+        self.results = FrameRingBuffer(result_shape, result_dtype, 2, DROP_OLDEST)
+
+        self._compute_frame = np.zeros(frame_shape, dtype=np.uint8)
+        self._compute_result = np.zeros(result_shape, dtype=result_dtype)
+
+        # The changes of the compute function are applied by the compute thread between two frames.
+        self._pending_changes = []
+        self._changes_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self.processed_frames = 0
+        self._error = None
+
+    @property
+    def is_running(self):
+        return self.capture.is_running or any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def is_paused(self):
+        return self.capture.is_paused
+
+    @property
+    def captured_frames(self):
+        return self.frames.written_frames
+
+    @property
+    def error(self):
+        return self._error if self._error is not None else self.capture.error
+
+    def start(self):
+        self._stop_event.clear()
+        self.capture.add_consumer(self.frames.put, self.frames.close)
+        self._threads = []
+        if self.process is not None:
+            self._threads.append(threading.Thread(target=self._compute_loop, name="compute"))
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+        if self.owns_capture:
+            self.capture.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.owns_capture:
+            self.capture.stop(timeout)
+        self.capture.remove_consumer(self.frames.put)
+        self.frames.close()
+        self.results.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def set_region(self, region):
+        """
+        Move the captured region, applied by the capture thread before its next grab.
+
+        :param tuple region: (x, y, width, height), the size must not change
+        """
+        self.capture.set_region(region)
+
+    def change_process(self, change):
+        """
+        Change the compute function, e.g. its settings, applied by the compute thread before its next frame.
+
+        :param change: function called without argument by the compute thread, an error is logged and the compute
+            function is kept as it is
+        """
+        with self._changes_lock:
+            self._pending_changes.append(change)
+
+    def _apply_changes(self):
+        with self._changes_lock:
+            changes, self._pending_changes = self._pending_changes, []
+        for change in changes:
+            try:
+                change()
+            except Exception:
+                logging.exception("Compute function change error")
+
+    def get_result(self, out):
+        """
+        Copy the newest result in *out* without waiting.
+
+        :return: timestamp of the frame of the result, ``None`` if there is no new result
+        """
+        return self.results.get(out, timeout=0, latest=True)
+
+    def get_frame(self, out, timeout=None):
+        """Copy the oldest captured frame in *out*, used when the pipeline has no compute function."""
+        return self.frames.get(out, timeout)
+
+    def statistics(self):
+        statistics = self.capture.statistics()
+        statistics.update({
+            "captured": self.captured_frames,
+            "processed": self.processed_frames,
+            "dropped_capture": self.frames.dropped_frames,
+            "dropped_display": self.results.dropped_frames,
+        })
+        return statistics
+
+    def _compute_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                timestamp = self.frames.get(self._compute_frame)
+                if timestamp is None:
+                    break
+                self._apply_changes()
+                self.process(self._compute_frame, self._compute_result)
+                self.results.put(self._compute_result, timestamp)
+                self.processed_frames += 1
+        except Exception as message:
+            logging.exception("Compute error")
+            self._error = message
+        finally:
+            self.results.close()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.power_spectrum
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Single precision real-FFT power spectrum of the micrograph.
+
+The micrograph is real, so only half of the spectrum is computed with a real-input FFT in ``complex64``. Each user,
+e.g. the live FFT of the GUI or of a script, creates its engine for its region size, the engine keeps its window and
+its input, power and output buffers between frames. The FFT is done with ``pyfftw`` if it is installed, the plan is
+then created once per engine from the FFTW wisdom, which is saved between sessions, and the spectrum is written in a
+preallocated buffer. Otherwise the FFT is done with ``scipy.fft``, which caches its plans internally but returns a new
+spectrum array at each frame: only the ``pyfftw`` path is free of allocations. The ``numpy.fft`` functions can write
+in an output buffer but were about five times slower than ``scipy.fft`` for an 800x560 frame, 7 ms against 1.4 ms,
+much more than the allocation, see ``benchmarks/benchmark_log_power.py``. The frames of the same size, e.g. the panes
+of a quad layout, are transformed together by :py:class:`BatchPowerSpectrumEngine`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os
+import logging
+import pickle
+import threading
+
+# Third party modules.
+import numpy as np
+import scipy.fft
+
+try:
+    import pyfftw
+except ImportError:  # pragma: no cover
+    pyfftw = None
+
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui import get_user_data_path
+from pysemimaginggui.apodization import get_window, WINDOW_NONE
+
+# Globals and constants variables.
+_wisdom_loaded = False
+
+
+def get_default_workers():
+    return os.cpu_count() or 1
+
+
+def get_wisdom_file_path():
+    return get_user_data_path("fftw_wisdom.pickle")
+
+
+def load_wisdom():
+    global _wisdom_loaded
+    if pyfftw is None or _wisdom_loaded:
+        return
+
+    _wisdom_loaded = True
+    file_path = get_wisdom_file_path()
+    if os.path.isfile(file_path):
+        try:
+            with open(file_path, "rb") as wisdom_file:
+                pyfftw.import_wisdom(pickle.load(wisdom_file))
+        except Exception as message:
+            logging.warning("Cannot load FFTW wisdom %s: %s", file_path, message)
+
+
+def save_wisdom():
+    if pyfftw is None:
+        return
+
+    file_path = get_wisdom_file_path()
+    try:
+        with open(file_path, "wb") as wisdom_file:
+            pickle.dump(pyfftw.export_wisdom(), wisdom_file)
+    except Exception as message:
+        logging.warning("Cannot save FFTW wisdom %s: %s", file_path, message)
+
+
+class PowerSpectrumEngine(object):
+    """
+    Compute the log power spectrum of frames of a fixed size.
+
+    The buffers :py:attr:`image`, :py:attr:`power` and :py:attr:`log_power` are reused for every frame, and
+    :py:attr:`spectrum` with ``pyfftw``, it is a new array at each frame with ``scipy.fft``. Only
+    :py:meth:`compute_log_power` holds :py:attr:`lock`, hold it when the other methods are called from several threads.
+
+    :param tuple shape: (height, width) of the frames
+    :param int workers: number of threads used by the FFT, all the processors when ``None``
+    :param bool use_fftw: use ``pyfftw``, when ``None`` it is used if installed
+    :param float epsilon: added to the power before the log, see :py:class:`LogPowerKernel`
+    :param str window_type: apodization window, see :py:mod:`pysemimaginggui.apodization`
+    """
+    def __init__(self, shape, workers=None, use_fftw=None, epsilon=1.0, window_type=WINDOW_NONE):
+        self.shape = tuple(shape)
+        self.workers = get_default_workers() if workers is None else workers
+        if use_fftw is None:
+            use_fftw = pyfftw is not None
+        self.use_fftw = use_fftw
+
+        height, width = self.shape
+        spectrum_shape = (height, width // 2 + 1)
+
+        if self.use_fftw:
+            load_wisdom()
+            self.image = pyfftw.empty_aligned(self.shape, dtype=np.float32)
+            self.spectrum = pyfftw.empty_aligned(spectrum_shape, dtype=np.complex64)
+            self._fftw = pyfftw.FFTW(self.image, self.spectrum, axes=(0, 1), flags=("FFTW_MEASURE",),
+                                     threads=self.workers)
+            save_wisdom()
+        else:
+            self.image = np.zeros(self.shape, dtype=np.float32)
+            self.spectrum = np.zeros(spectrum_shape, dtype=np.complex64)
+            self._fftw = None
+
+        self.power = np.zeros(spectrum_shape, dtype=np.float32)
+        self._power_scratch = np.zeros(spectrum_shape, dtype=np.float32)
+        self.log_power = np.zeros(self.shape, dtype=np.float32)
+        self.log_power_kernel = LogPowerKernel(self.shape, epsilon)
+        self.lock = threading.Lock()
+        self.window_type = WINDOW_NONE
+        self.window = None
+        self.set_window(window_type)
+
+        logging.debug("PowerSpectrumEngine: shape %s; workers %i; fftw %s", self.shape, self.workers, self.use_fftw)
+
+    def set_window(self, window_type):
+        """Select the apodization window, the windows are cached so it can be called every frame."""
+        self.window = get_window(self.shape, window_type)
+        self.window_type = window_type
+
+    def transform(self, frame=None):
+        """
+        Compute the half spectrum of *frame*, or of :py:attr:`image` when *frame* is ``None``.
+
+        The window is applied in place after *frame* is copied in :py:attr:`image`. When *frame* is ``None``,
+        :py:attr:`image` is transformed as is.
+
+        :return: the half spectrum, shape (height, width//2 + 1)
+        """
+        if frame is not None:
+            np.copyto(self.image, frame, casting="unsafe")
+            window = self.window
+            if window is not None:
+                np.multiply(self.image, window, out=self.image)
+
+        if self._fftw is not None:
+            self._fftw()
+        else:
+            # scipy.fft has no output argument, the spectrum is allocated at each frame.
+            self.spectrum = scipy.fft.rfft2(self.image, workers=self.workers)
+
+        return self.spectrum
+
+    def compute_power(self, spectrum=None):
+        """Compute the power of the half spectrum, :py:attr:`spectrum` when ``None``, in :py:attr:`power`."""
+        if spectrum is None:
+            spectrum = self.spectrum
+        np.multiply(spectrum.real, spectrum.real, out=self.power)
+        np.multiply(spectrum.imag, spectrum.imag, out=self._power_scratch)
+        np.add(self.power, self._power_scratch, out=self.power)
+        return self.power
+
+    def compute_log_power(self, frame=None, out=None):
+        """
+        Compute the centered log10 power spectrum of *frame*.
+
+        :param frame: gray frame, :py:attr:`image` is used when ``None``
+        :param out: output array, :py:attr:`log_power` when ``None``
+        :return: the full centered log10 power spectrum, same shape as the frame
+        """
+        if out is None:
+            out = self.log_power
+
+        with self.lock:
+            self.transform(frame)
+            self.log_power_kernel(self.spectrum, out)
+        return out
+
+    def __call__(self, frame, out):
+        """Same as :py:meth:`compute_log_power`, so the engine can be used as the process of a pipeline."""
+        return self.compute_log_power(frame, out)
+
+
+class BatchPowerSpectrumEngine(object):
+    """
+    Compute the log power spectra of several frames of the same size with one batched FFT.
+
+    The frames, e.g. the panes of a dual or quad layout, are stacked in :py:attr:`image`, shape
+    (number_frames, height, width), and transformed together, so the FFT is planned and dispatched once for all the
+    frames. The buffers are reused for every call, see :py:class:`PowerSpectrumEngine`.
+
+    :param int number_frames: number of frames of each batch
+    :param tuple shape: (height, width) of the frames
+    :param int workers: number of threads used by the FFT, all the processors when ``None``
+    :param bool use_fftw: use ``pyfftw``, when ``None`` it is used if installed
+    :param float epsilon: added to the power before the log, see :py:class:`LogPowerKernel`
+    :param str window_type: apodization window, see :py:mod:`pysemimaginggui.apodization`
+    """
+    def __init__(self, number_frames, shape, workers=None, use_fftw=None, epsilon=1.0, window_type=WINDOW_NONE):
+        self.number_frames = number_frames
+        self.shape = tuple(shape)
+        self.workers = get_default_workers() if workers is None else workers
+        if use_fftw is None:
+            use_fftw = pyfftw is not None
+        self.use_fftw = use_fftw
+
+        height, width = self.shape
+        batch_shape = (number_frames,) + self.shape
+        spectrum_shape = (number_frames, height, width // 2 + 1)
+
+        if self.use_fftw:
+            load_wisdom()
+            self.image = pyfftw.empty_aligned(batch_shape, dtype=np.float32)
+            self.spectrum = pyfftw.empty_aligned(spectrum_shape, dtype=np.complex64)
+            self._fftw = pyfftw.FFTW(self.image, self.spectrum, axes=(1, 2), flags=("FFTW_MEASURE",),
+                                     threads=self.workers)
+            save_wisdom()
+        else:
+            self.image = np.zeros(batch_shape, dtype=np.float32)
+            self.spectrum = np.zeros(spectrum_shape, dtype=np.complex64)
+            self._fftw = None
+
+        self.power = np.zeros(spectrum_shape, dtype=np.float32)
+        self._power_scratch = np.zeros(spectrum_shape, dtype=np.float32)
+        self.log_power = np.zeros(batch_shape, dtype=np.float32)
+        self.log_power_kernel = LogPowerKernel(self.shape, epsilon)
+        self.lock = threading.Lock()
+        self.window_type = WINDOW_NONE
+        self.window = None
+        self.set_window(window_type)
+
+        logging.debug("BatchPowerSpectrumEngine: %i x shape %s; workers %i; fftw %s", number_frames, self.shape,
+                      self.workers, self.use_fftw)
+
+    def set_window(self, window_type):
+        """Select the apodization window, the windows are cached so it can be called every frame."""
+        self.window = get_window(self.shape, window_type)
+        self.window_type = window_type
+
+    def transform(self, frames=None):
+        """
+        Compute the half spectra of *frames*, or of :py:attr:`image` when *frames* is ``None``.
+
+        :param frames: sequence of :py:attr:`number_frames` frames, e.g. views of the panes of one screen grab
+        :return: the half spectra, shape (number_frames, height, width//2 + 1)
+        """
+        if frames is not None:
+            for image, frame in zip(self.image, frames):
+                np.copyto(image, frame, casting="unsafe")
+            window = self.window
+            if window is not None:
+                np.multiply(self.image, window, out=self.image)
+
+        if self._fftw is not None:
+            self._fftw()
+        else:
+            # scipy.fft has no output argument, the spectra are allocated at each call.
+            self.spectrum = scipy.fft.rfft2(self.image, axes=(1, 2), workers=self.workers)
+
+        return self.spectrum
+
+    def compute_power(self, spectrum=None):
+        """Compute the power of the half spectra, :py:attr:`spectrum` when ``None``, in :py:attr:`power`."""
+        if spectrum is None:
+            spectrum = self.spectrum
+        np.multiply(spectrum.real, spectrum.real, out=self.power)
+        np.multiply(spectrum.imag, spectrum.imag, out=self._power_scratch)
+        np.add(self.power, self._power_scratch, out=self.power)
+        return self.power
+
+    def compute_log_power(self, frames=None, out=None):
+        """
+        Compute the centered log10 power spectrum of each frame.
+
+        :param frames: sequence of frames, :py:attr:`image` is used when ``None``
+        :param out: output array, shape (number_frames, height, width), :py:attr:`log_power` when ``None``
+        :return: the full centered log10 power spectra
+        """
+        if out is None:
+            out = self.log_power
+
+        with self.lock:
+            spectrum = self.transform(frames)
+            for frame_spectrum, frame_out in zip(spectrum, out):
+                self.log_power_kernel(frame_spectrum, frame_out)
+        return out
+
+    def __call__(self, frames, out):
+        """Same as :py:meth:`compute_log_power`, so the engine can be used as the process of a pipeline."""
+        return self.compute_log_power(frames, out)
+
+
+class LogPowerKernel(object):
+    """
+    Fused post-processing of the half spectrum: shift, square, add epsilon and log10 in one stage.
+
+    The power and the log are computed on the half spectrum only, then the full centered spectrum is written in the
+    output with four block copies using the Hermitian symmetry of the spectrum of a real image. No temporary array is
+    created. The optional ``numba`` kernel does the whole stage in one compiled parallel loop over the output pixels,
+    it is only faster with many processors, see ``benchmarks/benchmark_log_power.py``.
+
+    :param tuple shape: (height, width) of the frames
+    :param float epsilon: added to the power before the log, so empty bins do not give ``-inf``
+    :param bool use_numba: use the compiled ``numba`` kernel
+    """
+    def __init__(self, shape, epsilon=1.0, use_numba=False):
+        self.shape = tuple(shape)
+        self.epsilon = epsilon
+        if use_numba and numba is None:
+            raise ImportError("numba is required for the compiled log power kernel")
+        self.use_numba = use_numba
+
+        height, width = self.shape
+        half_width = width // 2 + 1
+        self._half = np.zeros((height, half_width), dtype=np.float32)
+        self._scratch = np.zeros((height, half_width), dtype=np.float32)
+        self._index = get_shifted_half_spectrum_index(self.shape) if self.use_numba else None
+
+    def __call__(self, spectrum, out):
+        """
+        Compute the centered log10 power spectrum.
+
+        :param spectrum: half spectrum, shape (height, width//2 + 1)
+        :param out: output ``float32`` array, shape (height, width)
+        """
+        if self.use_numba:
+            _log_power_numba(spectrum, self._index, np.float32(self.epsilon), out.reshape(-1))
+            return out
+
+        half = self._half
+        np.multiply(spectrum.real, spectrum.real, out=half)
+        np.multiply(spectrum.imag, spectrum.imag, out=self._scratch)
+        np.add(half, self._scratch, out=half)
+        np.add(half, self.epsilon, out=half)
+        np.log10(half, out=half)
+        shift_half_spectrum(half, out)
+        return out
+
+    def from_power(self, power, out):
+        """
+        Compute the centered log10 power spectrum from the power of the half spectrum, e.g. an averaged power.
+
+        :param power: power of the half spectrum, shape (height, width//2 + 1)
+        :param out: output ``float32`` array, shape (height, width)
+        """
+        half = self._half
+        np.add(power, self.epsilon, out=half)
+        np.log10(half, out=half)
+        shift_half_spectrum(half, out)
+        return out
+
+
+def shift_half_spectrum(half, out):
+    """
+    Write the full centered (``fftshift``) spectrum from the half spectrum of a real image.
+
+    Only valid for values that are the same for opposite frequencies, e.g. the power.
+
+    :param half: half spectrum, shape (height, width//2 + 1)
+    :param out: full spectrum, shape (height, width)
+    """
+    height, width = out.shape
+    half_height = height // 2
+    half_width = width // 2
+
+    # Positive column frequencies: the rows are rolled.
+    out[:half_height, half_width:] = half[height - half_height:, :width - half_width]
+    out[half_height:, half_width:] = half[:height - half_height, :width - half_width]
+    # Negative column frequencies: mirror of the opposite frequencies.
+    out[:half_height + 1, :half_width] = half[half_height::-1, half_width:0:-1]
+    out[half_height + 1:, :half_width] = half[height - 1:half_height:-1, half_width:0:-1]
+    return out
+
+
+def get_shifted_half_spectrum_index(shape):
+    """
+    Return, for each pixel of the full centered spectrum, the flat index of the same frequency in the half spectrum.
+
+    :param tuple shape: (height, width) of the full spectrum
+    :rtype: 1D :py:class:`numpy.ndarray` of ``intp``
+    """
+    height, width = shape
+    half_width = width // 2 + 1
+
+    rows = np.arange(height)[:, np.newaxis] - height // 2
+    columns = np.arange(width)[np.newaxis, :] - width // 2
+    rows = np.where(columns < 0, -rows, rows) % height
+    columns = np.abs(columns)
+
+    index = rows * half_width + columns
+    return np.ascontiguousarray(index.reshape(-1), dtype=np.intp)
+
+
+if numba is not None:  # pragma: no cover
+    @numba.njit(cache=True, parallel=True)
+    def _log_power_numba(spectrum, index, epsilon, out):
+        flat_spectrum = spectrum.reshape(-1)
+        for pixel_id in numba.prange(out.shape[0]):
+            value = flat_spectrum[index[pixel_id]]
+            out[pixel_id] = np.log10(value.real * value.real + value.imag * value.imag + epsilon)
+else:
+    _log_power_numba = None
+
+
+def get_power_spectrum_engine(shape, workers=None, window_type=WINDOW_NONE):
+    """
+    Return a new engine of the frame *shape* for one caller.
+
+    The engines are not shared: the window and the buffers of an engine only change with the frames of its caller. The
+    FFT plans are not recomputed, ``scipy.fft`` caches them and ``pyfftw`` plans from the wisdom of the first engine.
+    """
+    return PowerSpectrumEngine(shape, workers, window_type=window_type)
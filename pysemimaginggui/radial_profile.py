@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.radial_profile
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Radially averaged power spectral density (PSD).
+
+The radius bin of each frequency of the half spectrum and the number of frequencies per bin are computed once per
+region geometry, so the radial average of a frame is one :py:func:`numpy.bincount`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import threading
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+
+class RadialProfile(object):
+    """
+    Radial average of the half power spectrum of a real image.
+
+    The frequencies are in cycles per pixel, the bin width is the frequency step of the smallest image dimension and
+    the last bin ends at the Nyquist frequency, 0.5 cycle per pixel. The frequencies of the corners, above the
+    Nyquist frequency, are not used.
+
+    :param tuple shape: (height, width) of the image
+    """
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        height, width = self.shape
+
+        frequency_y = np.fft.fftfreq(height)[:, np.newaxis]
+        frequency_x = np.fft.rfftfreq(width)[np.newaxis, :]
+        radius = np.sqrt(frequency_y ** 2 + frequency_x ** 2)
+
+        self.bin_width = 1.0 / min(height, width)
+        self.number_bins = int(np.floor(0.5 / self.bin_width)) + 1
+        bin_index = np.floor(radius / self.bin_width + 0.5).astype(np.intp)
+        # Frequencies above the Nyquist frequency go in an extra bin that is discarded.
+        bin_index = np.minimum(bin_index, self.number_bins)
+        self._bin_index = np.ascontiguousarray(bin_index.reshape(-1))
+
+        # Each frequency of the half spectrum, except the first and the Nyquist columns, represents two frequencies.
+        weights = np.full(radius.shape, 2.0, dtype=np.float32)
+        weights[:, 0] = 1.0
+        if width % 2 == 0:
+            weights[:, -1] = 1.0
+        self._weights = weights
+
+        counts = np.bincount(self._bin_index, weights=weights.reshape(-1), minlength=self.number_bins + 1)
+        self._counts = np.maximum(counts[:self.number_bins], 1.0)
+        self.frequencies = np.arange(self.number_bins) * self.bin_width
+
+        self._weighted_power = np.zeros(radius.shape, dtype=np.float32)
+        self.profile = np.zeros(self.number_bins, dtype=np.float32)
+
+    def compute(self, power, out=None):
+        """
+        Compute the radial average of the half power spectrum.
+
+        :param power: half power spectrum, shape (height, width//2 + 1)
+        :param out: output array of :py:attr:`number_bins` values, :py:attr:`profile` when ``None``
+        :return: the mean power of each radius bin
+        """
+        if out is None:
+            out = self.profile
+
+        np.multiply(power, self._weights, out=self._weighted_power)
+        sums = np.bincount(self._bin_index, weights=self._weighted_power.reshape(-1), minlength=self.number_bins + 1)
+        np.divide(sums[:self.number_bins], self._counts, out=out, casting="unsafe")
+        return out
+
+
+def get_radial_profile(shape):
+    """Return the radial profile of the image *shape*, created at the first call for each shape."""
+    key = tuple(shape)
+    with _profiles_lock:
+        radial_profile = _profiles.get(key)
+        if radial_profile is None:
+            radial_profile = RadialProfile(key)
+            _profiles[key] = radial_profile
+    return radial_profile
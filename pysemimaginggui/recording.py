@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.recording
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Long-duration recording.
+
+The recorders write each frame as it comes, their memory does not grow with the duration. The
+:py:class:`SegmentedRecorder` starts a new file, a segment, every N minutes or every N GB, so a failure only loses the
+current segment and each file stays a manageable size. The :py:class:`AsyncFrameWriter` puts a recorder behind a
+bounded queue of preallocated frames written by a worker thread, so a slow encoder or disk never stalls the capture.
+The :py:class:`ChangedFrameWriter` only passes on the frames that changed, the recordings have a variable frame rate.
+The :py:class:`IntegratedFrameWriter` records the integrated frames, less noisy than the fast scan frames.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import os
+import logging
+import threading
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.pipeline import FrameRingBuffer, BLOCK, DROP_NEWEST
+
+# Globals and constants variables.
+#: Default maximum duration of a segment in seconds.
+DEFAULT_SEGMENT_DURATION_S = 30 * 60.0
+#: Default maximum size of a segment in bytes.
+DEFAULT_SEGMENT_SIZE_BYTES = 4 * 1024 ** 3
+#: Default number of frames in the queue of the asynchronous writer.
+DEFAULT_QUEUE_SIZE = 32
+#: Default longest wait in seconds of the capture for a free slot of the queue with :py:data:`BACKPRESSURE_BLOCK`.
+DEFAULT_BLOCK_TIMEOUT_S = 1.0
+
+#: When the queue is full, the capture waits for the writer, up to :py:attr:`AsyncFrameWriter.block_timeout_s`.
+BACKPRESSURE_BLOCK = "block"
+#: When the queue is full, the new frames are dropped.
+BACKPRESSURE_DROP = "drop"
+#: When the queue is half full, only one frame out of :py:attr:`AsyncFrameWriter.decimation` is queued.
+BACKPRESSURE_DECIMATE = "decimate"
+
+
+def get_segment_file_path(file_path, segment_id):
+    """Return the path of the segment *segment_id* of *file_path*, e.g. ``movie_003.mp4`` for ``movie.mp4``."""
+    root, extension = os.path.splitext(file_path.rstrip("/\\"))
+    return "{}_{:03d}{}".format(root, segment_id, extension)
+
+
+def get_backpressures():
+    return [BACKPRESSURE_BLOCK, BACKPRESSURE_DROP, BACKPRESSURE_DECIMATE]
+
+
+class PngBurstWriter(object):
+    """
+    Write each frame as a lossless PNG file, with the timestamps in a text file.
+
+    :param str file_path: ``burst.png`` writes ``burst/frame_000000.png``, ... and ``burst/timestamps.txt``
+    """
+    def __init__(self, file_path):
+        self.path = os.path.splitext(file_path.rstrip("/\\"))[0]
+        self.frame_count = 0
+        self.bytes_written = 0
+        self._timestamps_file = None
+
+    def open(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        self.frame_count = 0
+        self.bytes_written = 0
+        self._timestamps_file = open(os.path.join(self.path, "timestamps.txt"), "w")
+
+    def write(self, frame, timestamp):
+        from PIL import Image
+        file_path = os.path.join(self.path, "frame_{:06d}.png".format(self.frame_count))
+        Image.fromarray(frame).save(file_path, compress_level=1)
+        self._timestamps_file.write("{:.6f}\n".format(timestamp))
+        self.bytes_written += os.path.getsize(file_path)
+        self.frame_count += 1
+
+    def close(self):
+        if self._timestamps_file is not None:
+            self._timestamps_file.close()
+            self._timestamps_file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class SegmentedRecorder(object):
+    """
+    Record in successive segments.
+
+    The next segment is opened before the previous one is closed, and the previous one is closed in a background
+    thread, e.g. while ffmpeg finishes the video, so no frame is lost or delayed at a rotation.
+
+    :param create_recorder: function ``create_recorder(file_path)`` returning a recorder with ``open``,
+        ``write(frame, timestamp)``, ``close`` and ``bytes_written``
+    :param str file_path: file path of the recording, the segments are numbered from it
+    :param float max_duration_s: maximum duration of a segment in seconds, no limit when ``None``
+    :param int max_bytes: maximum size of a segment in bytes, no limit when ``None``
+    """
+    def __init__(self, create_recorder, file_path, max_duration_s=DEFAULT_SEGMENT_DURATION_S,
+                 max_bytes=DEFAULT_SEGMENT_SIZE_BYTES):
+        self.create_recorder = create_recorder
+        self.file_path = file_path
+        self.max_duration_s = max_duration_s
+        self.max_bytes = max_bytes
+
+        self.segment_id = 0
+        self.file_paths = []
+        self.frame_count = 0
+        self._recorder = None
+        self._segment_start_time = None
+        self._closing_threads = []
+        self.errors = []
+
+    @property
+    def recorder(self):
+        """Recorder of the current segment."""
+        return self._recorder
+
+    def open(self):
+        self.segment_id = 0
+        self.file_paths = []
+        self.frame_count = 0
+        self.errors = []
+        self._open_segment()
+
+    def write(self, frame, timestamp):
+        if self._segment_start_time is None:
+            self._segment_start_time = timestamp
+        elif self._is_segment_full(timestamp):
+            self.rotate()
+            self._segment_start_time = timestamp
+
+        self._recorder.write(frame, timestamp)
+        self.frame_count += 1
+
+    def _is_segment_full(self, timestamp):
+        if self.max_duration_s is not None and timestamp - self._segment_start_time >= self.max_duration_s:
+            return True
+        if self.max_bytes is not None and self._recorder.bytes_written >= self.max_bytes:
+            return True
+        return False
+
+    def rotate(self):
+        """Start the next segment."""
+        previous_recorder = self._recorder
+        self.segment_id += 1
+        self._open_segment()
+
+        thread = threading.Thread(target=self._close_recorder, args=(previous_recorder,), name="close_segment")
+        thread.daemon = True
+        thread.start()
+        self._closing_threads = [thread for thread in self._closing_threads if thread.is_alive()] + [thread]
+
+    def _open_segment(self):
+        file_path = get_segment_file_path(self.file_path, self.segment_id)
+        logging.info("Open segment %s", file_path)
+        self._recorder = self.create_recorder(file_path)
+        self._recorder.open()
+        self._segment_start_time = None
+        self.file_paths.append(file_path)
+
+    def _close_recorder(self, recorder):
+        try:
+            recorder.close()
+        except Exception as message:
+            logging.exception("Segment close error")
+            self.errors.append(message)
+
+    def close(self):
+        """Close the current segment and wait until all the segments are closed."""
+        if self._recorder is not None:
+            recorder, self._recorder = self._recorder, None
+            self._close_recorder(recorder)
+        for thread in self._closing_threads:
+            thread.join()
+        self._closing_threads = []
+        logging.info("Recorded %i frames in %i segments", self.frame_count, len(self.file_paths))
+        if self.errors:
+            raise IOError("Segment errors: {}".format(self.errors))
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class AsyncFrameWriter(object):
+    """
+    Write the frames of a recorder in a worker thread through a bounded queue.
+
+    :param writer: recorder with ``open``, ``write(frame, timestamp)`` and ``close``, e.g. a
+        :py:class:`SegmentedRecorder`
+    :param tuple shape: (height, width) of the frames
+    :param int queue_size: number of preallocated frames in the queue
+    :param str backpressure: :py:data:`BACKPRESSURE_BLOCK`, :py:data:`BACKPRESSURE_DROP` or
+        :py:data:`BACKPRESSURE_DECIMATE`
+    :param int decimation: one frame out of *decimation* is queued when the queue is half full with
+        :py:data:`BACKPRESSURE_DECIMATE`
+    :param float block_timeout_s: longest wait for a free slot of the queue with :py:data:`BACKPRESSURE_BLOCK`, the
+        frame is dropped after it, so a stalled writer does not stop a capture shared with the live view
+    """
+    def __init__(self, writer, shape, queue_size=DEFAULT_QUEUE_SIZE, backpressure=BACKPRESSURE_DROP, decimation=2,
+                 block_timeout_s=DEFAULT_BLOCK_TIMEOUT_S):
+        if backpressure not in get_backpressures():
+            raise ValueError("Unknown backpressure: {}".format(backpressure))
+
+        self.writer = writer
+        self.shape = tuple(shape)
+        self.backpressure = backpressure
+        self.decimation = decimation
+        self.block_timeout_s = block_timeout_s
+        policy = BLOCK if backpressure == BACKPRESSURE_BLOCK else DROP_NEWEST
+        self._queue = FrameRingBuffer(self.shape, np.uint8, queue_size, policy)
+        self._worker_frame = np.zeros(self.shape, dtype=np.uint8)
+        self._thread = None
+
+        self.received_frames = 0
+        self.encoded_frames = 0
+        self.decimated_frames = 0
+        self.error = None
+
+    @property
+    def frame_count(self):
+        return self.encoded_frames
+
+    @property
+    def queued_frames(self):
+        return len(self._queue)
+
+    @property
+    def dropped_frames(self):
+        """Frames not written: dropped by a full queue or decimated."""
+        return self._queue.dropped_frames + self.decimated_frames
+
+    def statistics(self):
+        return {
+            "received": self.received_frames,
+            "encoded": self.encoded_frames,
+            "queued": self.queued_frames,
+            "dropped": self.dropped_frames,
+        }
+
+    def format_statistics(self):
+        return "{encoded} encoded, {queued} queued, {dropped} dropped".format(**self.statistics())
+
+    def open(self):
+        self.writer.open()
+        self._thread = threading.Thread(target=self._write_loop, name="async_writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, frame, timestamp):
+        """
+        Queue a copy of the frame without waiting, except with :py:data:`BACKPRESSURE_BLOCK` when the queue is full,
+        up to :py:attr:`block_timeout_s`.
+
+        :return: ``False`` if the frame was dropped
+        :rtype: bool
+        """
+        if self.error is not None:
+            raise IOError("Writer error: {}".format(self.error))
+
+        self.received_frames += 1
+        if self.backpressure == BACKPRESSURE_DECIMATE and len(self._queue) >= self._queue.size // 2 and \
+                self.received_frames % self.decimation != 0:
+            self.decimated_frames += 1
+            return False
+        return self._queue.put(frame, timestamp, self.block_timeout_s)
+
+    def _write_loop(self):
+        try:
+            while True:
+                # The frames queued before the close are still written.
+                timestamp = self._queue.get(self._worker_frame)
+                if timestamp is None:
+                    break
+                self.writer.write(self._worker_frame, timestamp)
+                self.encoded_frames += 1
+        except Exception as message:
+            logging.exception("Writer error")
+            self.error = message
+            self._queue.close()
+
+    def close(self):
+        """Write the queued frames and close the writer."""
+        if self._thread is None:
+            return
+        self._queue.close()
+        self._thread.join()
+        self._thread = None
+        self.writer.close()
+        logging.info("Asynchronous writer: %s", self.statistics())
+        if self.error is not None:
+            raise IOError("Writer error: {}".format(self.error))
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class ChangedFrameWriter(object):
+    """
+    Write only the frames that changed since the last written frame.
+
+    An unchanged frame is not written, the last written frame is held until the next change: the video of the ffmpeg
+    recorder displays it until the capture timestamp of the next written frame and
+    :py:meth:`pysemimaginggui.frame_store.FrameStoreReader.find_frame` returns the frame held at a time. At the end
+    of the recording, the held frame is written again with the timestamp of the last unchanged frame, so the duration
+    of the recording is kept.
+
+    :param writer: recorder with ``open``, ``write(frame, timestamp)`` and ``close``
+    :param detector: :py:class:`pysemimaginggui.change_detection.ChangeDetector` of the frame shape
+    """
+    def __init__(self, writer, detector):
+        self.writer = writer
+        self.detector = detector
+        self._last_frame = np.zeros(detector.shape, dtype=np.uint8)
+        self._held_timestamp = None
+
+        self.changed_frames = 0
+        self.unchanged_frames = 0
+
+    def open(self):
+        self.detector.reset()
+        self._held_timestamp = None
+        self.changed_frames = 0
+        self.unchanged_frames = 0
+        self.writer.open()
+
+    def write(self, frame, timestamp):
+        """
+        Write *frame* if it changed.
+
+        :return: ``False`` if the frame was not written by the writer
+        :rtype: bool
+        """
+        if not self.detector.is_changed(frame):
+            self.unchanged_frames += 1
+            self._held_timestamp = timestamp
+            return False
+
+        self.detector.update(frame)
+        np.copyto(self._last_frame, frame)
+        self._held_timestamp = None
+        self.changed_frames += 1
+        return self.writer.write(frame, timestamp) is not False
+
+    def close(self):
+        if self._held_timestamp is not None:
+            self.writer.write(self._last_frame, self._held_timestamp)
+            self._held_timestamp = None
+        logging.info("Changed frames: %i written, %i unchanged", self.changed_frames, self.unchanged_frames)
+        self.writer.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class IntegratedFrameWriter(object):
+    """
+    Write the integrated frames, rounded to ``uint8``.
+
+    :param writer: recorder with ``open``, ``write(frame, timestamp)`` and ``close``
+    :param integrator: :py:class:`pysemimaginggui.integration.FrameIntegrator` of the frame shape
+    """
+    def __init__(self, writer, integrator):
+        self.writer = writer
+        self.integrator = integrator
+        self._rounded = np.zeros(integrator.shape, dtype=np.float32)
+        self._frame = np.zeros(integrator.shape, dtype=np.uint8)
+
+    def open(self):
+        self.integrator.reset()
+        self.writer.open()
+
+    def write(self, frame, timestamp):
+        integrated_frame = self.integrator(frame)
+        np.add(integrated_frame, np.float32(0.5), out=self._rounded)
+        np.clip(self._rounded, 0.0, 255.0, out=self._rounded)
+        np.copyto(self._frame, self._rounded, casting="unsafe")
+        return self.writer.write(self._frame, timestamp)
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
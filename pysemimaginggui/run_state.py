@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.run_state
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Run or pause state of the microscope.
+
+The pause and run toolbar templates used to find the PC-SEM window also show whether the microscope is scanning. The
+:py:class:`RunStateDetector` grabs only the toolbar box at the located window and compares it with these templates,
+a few hundred pixels instead of the micrograph, so the pipelines can idle while the microscope is paused.
+"""
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import logging
+import threading
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_source import create_frame_source, BACKEND_AUTO
+from pysemimaginggui.locator import compute_ncc_local, DEFAULT_CONFIDENCE
+
+# Globals and constants variables.
+STATE_RUNNING = "running"
+STATE_PAUSED = "paused"
+#: No template matches the toolbar box, e.g. hidden window, the microscope is assumed running.
+STATE_UNKNOWN = "unknown"
+
+
+def get_template_state(name):
+    """Return the state shown by a template from its name, e.g. ``pc_sem_su8230_pause.png``, or ``None``."""
+    name = name.lower()
+    if "pause" in name:
+        return STATE_PAUSED
+    if "run" in name:
+        return STATE_RUNNING
+    return None
+
+
+class RunStateDetector(object):
+    """
+    Detect the run or pause state from the toolbar box of the located PC-SEM window.
+
+    :param templates: :py:class:`pysemimaginggui.locator.Template` of the instrument, only the pause and run templates
+        of the size of *match* are used
+    :param match: :py:class:`pysemimaginggui.locator.Match` of the toolbar in screen coordinates
+    :param str backend: frame source backend used to grab the toolbar box
+    :param float confidence: minimum normalized cross-correlation of a state
+    :param kwargs: extra parameters of the frame source backend
+    """
+    def __init__(self, templates, match, backend=BACKEND_AUTO, confidence=DEFAULT_CONFIDENCE, **kwargs):
+        self.templates = [template for template in templates if get_template_state(template.name) is not None and
+                          tuple(template.shape) == (match.height, match.width)]
+        if not self.templates:
+            raise ValueError("No pause or run template of the size of {}".format(match))
+
+        self.backend = backend
+        self._frame_source_kwargs = kwargs
+        self.confidence = confidence
+        self.region = (match.left, match.top, match.width, match.height)
+        self.state = STATE_UNKNOWN
+
+        self._frame_source = None
+        self._region_lock = threading.Lock()
+        self._pending_region = None
+
+    def set_match(self, match):
+        """Follow a moved window, applied before the next grab."""
+        with self._region_lock:
+            self._pending_region = (match.left, match.top, match.width, match.height)
+
+    def detect_state(self, patch):
+        """Return the state of the template best matching the toolbar *patch*."""
+        best_confidence = self.confidence
+        state = STATE_UNKNOWN
+        for template in self.templates:
+            confidence, _top, _left = compute_ncc_local(patch, template, 0, 0, 0)
+            if confidence >= best_confidence:
+                best_confidence = confidence
+                state = get_template_state(template.name)
+        return state
+
+    def grab_state(self):
+        """Grab the toolbar box and return the current state."""
+        with self._region_lock:
+            region, self._pending_region = self._pending_region, None
+        if region is not None:
+            self.region = region
+            if self._frame_source is not None:
+                self._frame_source.set_region(region)
+        if self._frame_source is None:
+            self._frame_source = create_frame_source(self.backend, self.region, **self._frame_source_kwargs)
+
+        state = self.detect_state(self._frame_source.grab())
+        if state != self.state:
+            logging.info("Microscope state: %s", state)
+            self.state = state
+        return state
+
+    def is_paused(self):
+        """Return ``True`` while the microscope is paused, the check of the pipelines."""
+        return self.grab_state() == STATE_PAUSED
+
+    def close(self):
+        if self._frame_source is not None:
+            self._frame_source.close()
+            self._frame_source = None
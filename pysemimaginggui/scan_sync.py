@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.scan_sync
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Capture synchronised with the scan of the microscope.
+
+PC-SEM redraws the micrograph line by line from the top. A screenshot taken during the scan is torn: the rows above
+the scan line are from the new scan and the rows below from the previous one, which puts horizontal streaks in the
+FFT. The :py:class:`ScanSyncFrameSource` grabs the micrograph at a short poll interval and compares the rows of
+consecutive grabs to follow the scan line. A frame is complete when the scan line goes back to the top: the first rows
+of the next scan are then taken from the previous grab. A frame is also complete when it does not change after the
+scan line reached the bottom, e.g. frozen after the last scan. The torn frames are rejected or flagged.
+"""
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import logging
+import threading
+import time
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_source import FrameSource
+
+# Globals and constants variables.
+#: Interval in seconds between the grabs following the scan line.
+DEFAULT_POLL_INTERVAL_S = 0.025
+#: Rows at the bottom of the frame where the scan ends.
+DEFAULT_EDGE_ROWS = 2
+#: Unchanged rows inside the scanned rows, e.g. a uniform area, still part of the same scan.
+DEFAULT_GAP_ROWS = 8
+#: Fraction of the rows changed between two grabs above which the scan is faster than the poll interval.
+FAST_SCAN_FRACTION = 0.9
+
+SCAN_STATIC = "static"
+SCAN_FAST = "fast"
+SCAN_COMPLETE = "complete"
+SCAN_TORN = "torn"
+
+
+def get_scanned_rows(row_changed, gap_rows=DEFAULT_GAP_ROWS):
+    """
+    Return the (start, stop) row ranges changed between two grabs.
+
+    :param row_changed: boolean array, ``True`` for a changed row
+    :param int gap_rows: largest number of unchanged rows inside a range
+    """
+    rows = np.flatnonzero(row_changed)
+    if rows.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) > gap_rows + 1)
+    starts = rows[np.concatenate(([0], breaks + 1))]
+    stops = rows[np.concatenate((breaks, [rows.size - 1]))] + 1
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+class ScanSyncFrameSource(FrameSource):
+    """
+    Return only the complete frames of the scans of a frame source.
+
+    :param frame_source: :py:class:`pysemimaginggui.frame_source.FrameSource` of the micrograph
+    :param float poll_interval_s: interval in seconds between the grabs following the scan line, shorter than the
+        scan of one frame
+    :param bool reject_torn: wait for a complete frame, otherwise return each grab with :py:attr:`is_torn` set
+    :param float max_wait_s: longest wait in seconds for a complete frame, the last torn frame is then returned; wait
+        until :py:meth:`interrupt` when ``None``
+    :param int step: step in pixels of the columns compared
+    :param int threshold: largest absolute difference in gray levels of an unchanged pixel
+    :param int edge_rows: rows at the bottom of the frame where the scan ends
+    :param int gap_rows: unchanged rows inside the scanned rows
+    """
+    def __init__(self, frame_source, poll_interval_s=DEFAULT_POLL_INTERVAL_S, reject_torn=True, max_wait_s=None,
+                 step=4, threshold=0, edge_rows=DEFAULT_EDGE_ROWS, gap_rows=DEFAULT_GAP_ROWS):
+        self.frame_source = frame_source
+        self.name = frame_source.name
+        self.poll_interval_s = poll_interval_s
+        self.reject_torn = reject_torn
+        self.max_wait_s = max_wait_s
+        self.step = step
+        self.threshold = threshold
+        self.edge_rows = edge_rows
+        self.gap_rows = gap_rows
+
+        self.scan_state = None
+        self.scan_line = None
+        self.is_torn = False
+        self.complete_frames = 0
+        #: Number of grabs that met a torn frame, counted once per grab whatever the number of polls of the scan.
+        self.torn_frames = 0
+        self._interrupt_event = threading.Event()
+        FrameSource.__init__(self, frame_source.region)
+
+    def set_region(self, region):
+        self.frame_source.set_region(region)
+        FrameSource.set_region(self, region)
+        self._has_previous = False
+
+    def _allocate(self):
+        height, width = self._frame.shape
+        self._previous = np.zeros((height, width), dtype=np.uint8)
+        self._difference = np.zeros(self._previous[:, ::self.step].shape, dtype=np.int16)
+        self._has_previous = False
+        self._emitted = False
+
+    def get_row_changed(self, previous, current):
+        """Return ``True`` for each row of *current* different from *previous*."""
+        np.subtract(current[:, ::self.step], previous[:, ::self.step], out=self._difference)
+        np.abs(self._difference, out=self._difference)
+        return self._difference.max(axis=1) > self.threshold
+
+    def update(self, current):
+        """
+        Compare *current* with the previous grab and build the complete frame in :py:attr:`_frame`.
+
+        :return: :py:data:`SCAN_COMPLETE`, :py:data:`SCAN_STATIC` or :py:data:`SCAN_FAST` when the frame is complete,
+            :py:data:`SCAN_TORN` otherwise, e.g. while the scan is in progress
+        """
+        height = current.shape[0]
+        row_changed = self.get_row_changed(self._previous, current)
+        scanned_rows = get_scanned_rows(row_changed, self.gap_rows)
+
+        previous_line = self.scan_line
+        state = SCAN_TORN
+        if not scanned_rows:
+            # Without a scan in progress, the frame is frozen, e.g. after the last scan.
+            if previous_line is None or previous_line >= height - self.edge_rows:
+                state = SCAN_STATIC
+                np.copyto(self._frame, current)
+                self._emitted = True
+        elif np.count_nonzero(row_changed) >= FAST_SCAN_FRACTION * height:
+            state = SCAN_FAST
+            np.copyto(self._frame, current)
+            self.scan_line = None
+            self._emitted = False
+        elif previous_line is not None and scanned_rows[0][0] + self.gap_rows < previous_line:
+            # The scan line went back to the top, the scan of the previous grab ended in the poll interval. The rows
+            # above the previous scan line are from the next scan, the complete frame takes them from the previous grab.
+            head_stop = [stop for start, stop in scanned_rows if start + self.gap_rows < previous_line][-1]
+            if not self._emitted:
+                state = SCAN_COMPLETE
+                np.copyto(self._frame, current)
+                self._frame[:head_stop] = self._previous[:head_stop]
+            self.scan_line = head_stop
+            self._emitted = False
+        else:
+            self.scan_line = scanned_rows[-1][1]
+            self._emitted = False
+
+        self.scan_state = state
+        np.copyto(self._previous, current)
+        return state
+
+    def grab(self):
+        start_time = time.monotonic()
+        is_counted = False
+        while True:
+            if self._interrupt_event.is_set():
+                raise StopIteration("Scan synchronised capture interrupted")
+
+            current = self.frame_source.grab()
+            if not self._has_previous:
+                np.copyto(self._previous, current)
+                self._has_previous = True
+            elif self.update(current) != SCAN_TORN:
+                self.is_torn = False
+                self.complete_frames += 1
+                return self._frame
+            else:
+                if not is_counted:
+                    self.torn_frames += 1
+                    is_counted = True
+                if not self.reject_torn or \
+                        (self.max_wait_s is not None and time.monotonic() - start_time >= self.max_wait_s):
+                    self.is_torn = True
+                    np.copyto(self._frame, current)
+                    return self._frame
+
+            self._interrupt_event.wait(self.poll_interval_s)
+
+    def interrupt(self):
+        """Stop a :py:meth:`grab` waiting for a complete frame, it raises :py:class:`StopIteration`."""
+        self._interrupt_event.set()
+
+    def statistics(self):
+        return {"complete": self.complete_frames, "torn": self.torn_frames, "scan_line": self.scan_line}
+
+    def close(self):
+        logging.info("Scan synchronised capture: %s", self.statistics())
+        self.frame_source.close()
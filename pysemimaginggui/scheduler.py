@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: pysemimaginggui.scheduler
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Capture scheduler on the monotonic clock.
+
+The frames are captured on absolute deadlines, ``start + slot * interval``, instead of a fixed delay after each
+capture, so the processing time does not stretch the period and the error does not accumulate. When a capture is
+later than a full interval, the missed slots are skipped and counted instead of captured in a burst. The actual
+capture times are returned with each frame and the lateness statistics (jitter) are kept.
+"""
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+# Standard library modules.
+import math
+import time
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+
+# Globals and constants variables.
+
+
+class FrameScheduler(object):
+    """
+    Schedule the captures at a fixed interval on absolute deadlines.
+
+    The capture loop calls :py:meth:`wait` before each grab and :py:meth:`mark` just after it::
+
+        scheduler = FrameScheduler(0.25)
+        while scheduler.wait(stop_event):
+            frame = frame_source.grab()
+            recorder.write(frame, scheduler.mark())
+
+    :param float interval_s: capture interval in seconds
+    :param clock: monotonic clock in seconds
+    """
+    def __init__(self, interval_s, clock=time.monotonic):
+        if interval_s <= 0.0:
+            raise ValueError("The capture interval must be positive: {}".format(interval_s))
+        self.interval_s = interval_s
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.start_time = None
+        self.slot = -1
+        self.deadline = None
+        self.captured_frames = 0
+        self.skipped_slots = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self._lateness_sum_s = 0.0
+        self._lateness_square_sum_s = 0.0
+        self.maximum_lateness_s = 0.0
+
+    def get_next_slot(self, now):
+        """Return the next slot to capture at time *now*, the slots whose deadline is a full interval old are missed."""
+        if self.start_time is None:
+            return 0
+        next_slot = self.slot + 1
+        current_slot = int(math.floor((now - self.start_time) / self.interval_s))
+        return max(next_slot, current_slot)
+
+    def wait(self, stop_event=None):
+        """
+        Wait for the deadline of the next slot.
+
+        :param stop_event: :py:class:`threading.Event` interrupting the wait
+        :return: ``False`` if *stop_event* is set, ``True`` when it is time to capture
+        :rtype: bool
+        """
+        now = self.clock()
+        if self.start_time is None:
+            self.start_time = now
+
+        slot = self.get_next_slot(now)
+        self.skipped_slots += slot - self.slot - 1
+        self.slot = slot
+        self.deadline = self.start_time + slot * self.interval_s
+
+        delay_s = self.deadline - now
+        if delay_s > 0.0:
+            if stop_event is not None:
+                if stop_event.wait(delay_s):
+                    return False
+            else:
+                time.sleep(delay_s)
+        return stop_event is None or not stop_event.is_set()
+
+    def mark(self, timestamp=None):
+        """
+        Record the capture of the current slot.
+
+        :param float timestamp: capture time on the scheduler clock, the current time when ``None``
+        :return: the capture time, the timestamp of the frame
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        lateness_s = max(timestamp - self.deadline, 0.0)
+        self._lateness_sum_s += lateness_s
+        self._lateness_square_sum_s += lateness_s * lateness_s
+        self.maximum_lateness_s = max(self.maximum_lateness_s, lateness_s)
+
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.captured_frames += 1
+        return timestamp
+
+    @property
+    def mean_lateness_s(self):
+        if self.captured_frames == 0:
+            return 0.0
+        return self._lateness_sum_s / self.captured_frames
+
+    @property
+    def jitter_s(self):
+        """Standard deviation of the capture times around the deadlines."""
+        if self.captured_frames == 0:
+            return 0.0
+        mean_s = self.mean_lateness_s
+        variance = self._lateness_square_sum_s / self.captured_frames - mean_s * mean_s
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def frame_rate(self):
+        """Actual frame rate of the captures."""
+        if self.captured_frames < 2 or self.last_timestamp <= self.first_timestamp:
+            return 0.0
+        return (self.captured_frames - 1) / (self.last_timestamp - self.first_timestamp)
+
+    def statistics(self):
+        return {
+            "captured": self.captured_frames,
+            "skipped": self.skipped_slots,
+            "frame_rate": self.frame_rate,
+            "mean_lateness_ms": self.mean_lateness_s * 1.0e3,
+            "jitter_ms": self.jitter_s * 1.0e3,
+            "maximum_lateness_ms": self.maximum_lateness_s * 1.0e3,
+        }
+
+    def format_statistics(self):
+        return "{frame_rate:.2f} fps, {skipped} skipped, jitter {jitter_ms:.1f} ms".format(**self.statistics())
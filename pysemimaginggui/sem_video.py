@@ -31,70 +31,50 @@ Video recording script for SU-8230.
 import logging
 
 # Third party modules.
-import pyautogui
-from PIL import Image, ImageOps
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-plt.rcParams['animation.ffmpeg_path'] = u'../bin/ffmpeg-3.2.4-win32-static/bin/ffmpeg.exe'
 
 # Local modules.
 
 # Project modules.
+from pysemimaginggui.frame_source import create_frame_source, BACKEND_AUTO
+from pysemimaginggui.locator import locate_on_screen
+from pysemimaginggui.ffmpeg_recorder import FfmpegRecorder, record_frames
 
 # Globals and constants variables.
+FFMPEG_PATH = u'../bin/ffmpeg-3.2.4-win32-static/bin/ffmpeg.exe'
 
 
 def find_micrograph():
     micrograph_location = (20, 200)
-    pause_location = pyautogui.locateOnScreen("pcsem_pause.png")
-    logging.debug(pause_location)
-    if pause_location is not None:
-        micrograph_location = (pause_location[0], pause_location[1]+pause_location[3])
-
-    run_location = pyautogui.locateOnScreen("pcsem_run.png")
-    logging.debug(run_location)
-    if run_location is not None:
-        micrograph_location = (run_location[0], run_location[1]+run_location[3])
+    location = locate_on_screen(["pcsem_pause.png", "pcsem_run.png"])
+    logging.debug(location)
+    if location is not None:
+        micrograph_location = (location.left, location.top+location.height)
 
     logging.info(micrograph_location)
     return micrograph_location
 
 
-def save_movie(micrograph_location):
-    fig = plt.figure()
-
-    top_pixel = micrograph_location[0]+2
-    left_pixel = micrograph_location[1]+2
-    width_pixel = 800
-    height_pixel = 560
-    micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-    micrograph_image = micrograph_image.convert("L")
-
-    fft_image = plt.imshow(micrograph_image, animated=True, cmap=plt.cm.Greys)
-    plt.xticks([])
-    plt.yticks([])
-
-    plt.tight_layout()
-
-    def updatefig(*args):
-        micrograph_image = pyautogui.screenshot(region=(top_pixel, left_pixel, width_pixel, height_pixel))
-        micrograph_image = micrograph_image.convert("L")
-
-        fft_image.set_array(micrograph_image)
-        return fft_image,
-
-    interval_ms = 20
-    ani = animation.FuncAnimation(fig, updatefig, interval=interval_ms, blit=True)
+def save_movie(micrograph_location, frame_source=None, file_path="sem_movie.mp4", number_frames=100,
+               frame_interval_s=0.02, ffmpeg_path=FFMPEG_PATH):
+    if frame_source is None:
+        top_pixel = micrograph_location[0]+2
+        left_pixel = micrograph_location[1]+2
+        width_pixel = 800
+        height_pixel = 560
+        frame_source = create_frame_source(BACKEND_AUTO, (top_pixel, left_pixel, width_pixel, height_pixel))
 
-    FFwriter = animation.FFMpegWriter(fps=30, extra_args=['-vcodec', 'libx264'])
-    ani.save('sem_movie.mp4', writer=FFwriter)
-    plt.show()
+    with FfmpegRecorder(file_path, frame_source.shape, ffmpeg_path) as recorder:
+        record_frames(frame_source, recorder, number_frames, frame_interval_s)
+    frame_source.close()
 
 
-def run_live_fft():
-    micrograph_location = find_micrograph()
+def run_live_fft(frame_source=None):
+    if frame_source is None:
+        micrograph_location = find_micrograph()
+    else:
+        micrograph_location = None
 
-    save_movie(micrograph_location)
+    save_movie(micrograph_location, frame_source)
 
 
 if __name__ == "__main__":
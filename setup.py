@@ -52,6 +52,14 @@ requirements = [
     "six"
 ]
 
+extras_requirements = {
+    "mss": ["mss"],
+    "fftw": ["pyfftw"],
+    "numba": ["numba"],
+    "zstd": ["zstandard"],
+    "blosc": ["blosc"],
+}
+
 test_requirements = [
     "nose",
 ]
@@ -71,6 +79,7 @@ setup(
                  'pysemimaginggui'},
     include_package_data=True,
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="GNU General Public License v3",
     zip_safe=False,
     keywords='pysemimaginggui',
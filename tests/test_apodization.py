@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_apodization
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.apodization`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui import apodization
+from pysemimaginggui.power_spectrum import PowerSpectrumEngine
+
+# Globals and constants variables.
+
+
+class Test_apodization(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.apodization`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        apodization.clear_cache()
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        apodization.clear_cache()
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_get_window(self):
+        self.assertIsNone(apodization.get_window((4, 6), apodization.WINDOW_NONE))
+
+        for window_type in apodization.get_window_types()[1:]:
+            window = apodization.get_window((8, 10), window_type)
+            self.assertEqual((8, 10), window.shape)
+            self.assertEqual(np.float32, window.dtype)
+            self.assertFalse(window.flags.writeable)
+            self.assertAlmostEqual(0.0, window[0, 0], places=6)
+            self.assertAlmostEqual(1.0, window[4, 5], places=6)
+            self.assertIs(window, apodization.get_window((8, 10), window_type))
+
+        self.assertRaises(ValueError, apodization.get_window, (8, 10), "unknown")
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_cache_size(self):
+        first_window = apodization.get_window((4, 4), apodization.WINDOW_HANN)
+        for size in range(5, 5 + apodization.CACHE_SIZE):
+            apodization.get_window((size, size), apodization.WINDOW_HANN)
+        self.assertIsNot(first_window, apodization.get_window((4, 4), apodization.WINDOW_HANN))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_engine_window(self):
+        frame = np.full((16, 20), 100, dtype=np.uint8)
+        engine = PowerSpectrumEngine(frame.shape, workers=1, window_type=apodization.WINDOW_HANN)
+        engine.transform(frame)
+        np.testing.assert_allclose(100.0 * apodization.get_window(frame.shape, apodization.WINDOW_HANN),
+                                   engine.image, rtol=1.0e-6)
+
+        engine.set_window(apodization.WINDOW_NONE)
+        engine.transform(frame)
+        np.testing.assert_allclose(100.0, engine.image)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
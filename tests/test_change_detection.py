@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_change_detection
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.change_detection`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.change_detection import ChangeDetector, METHOD_DIFFERENCE, METHOD_HASH
+
+# Globals and constants variables.
+
+
+class Test_change_detection(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.change_detection`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.frame = np.random.RandomState(0).randint(0, 256, size=(30, 41)).astype(np.uint8)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_difference(self):
+        detector = ChangeDetector(self.frame.shape, METHOD_DIFFERENCE, step=4)
+        self.assertTrue(detector.is_changed(self.frame))
+        detector.update(self.frame)
+        self.assertFalse(detector.is_changed(self.frame.copy()))
+
+        frame = self.frame.copy()
+        frame[8, :] ^= 1
+        self.assertTrue(detector.is_changed(frame))
+        # A single pixel between the block corners, also in the smaller blocks of the last column.
+        for row, column in [(9, 3), (29, 40)]:
+            frame = self.frame.copy()
+            frame[row, column] ^= 1
+            self.assertTrue(detector.is_changed(frame))
+        # Opposite changes of two pixels of the same block.
+        frame = self.frame.astype(np.int16)
+        frame[1, 1] += 1 if frame[1, 1] < 255 else -1
+        frame[2, 2] -= 1 if frame[2, 2] > 0 else -1
+        self.assertTrue(detector.is_changed(frame.astype(np.uint8)))
+
+        detector.threshold = 2
+        frame = self.frame.astype(np.int16)
+        frame[::4, ::4] += np.where(frame[::4, ::4] < 128, 2, -2)
+        self.assertFalse(detector.is_changed(frame.astype(np.uint8)))
+        # A block mean changed by more than the threshold, by a single pixel.
+        frame = self.frame.copy()
+        frame[5, 6] = frame[5, 6] + 49 if frame[5, 6] < 128 else frame[5, 6] - 49
+        self.assertTrue(detector.is_changed(frame))
+        # The threshold applies to the mean of the smaller corner block, 2 x 1 pixels.
+        frame = self.frame.copy()
+        frame[29, 40] = frame[29, 40] + 5 if frame[29, 40] < 128 else frame[29, 40] - 5
+        self.assertTrue(detector.is_changed(frame))
+
+        detector.reset()
+        self.assertTrue(detector.is_changed(self.frame))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_hash(self):
+        detector = ChangeDetector(self.frame.shape, METHOD_HASH)
+        detector.update(self.frame)
+        self.assertFalse(detector.is_changed(self.frame.copy()))
+
+        frame = self.frame.copy()
+        frame[9, 3] ^= 1
+        self.assertTrue(detector.is_changed(frame))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_unknown_method(self):
+        self.assertRaises(ValueError, ChangeDetector, self.frame.shape, "unknown")
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_display
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.display`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.display import LutRenderer, AutoContrast, get_colormap_lut, get_downsample_factor, \
+    DOWNSAMPLE_STRIDE, DOWNSAMPLE_MAXIMUM, DOWNSAMPLE_MEAN
+
+# Globals and constants variables.
+
+
+class Test_display(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.display`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.image = np.random.RandomState(0).uniform(-2.0, 6.0, size=(56, 80)).astype(np.float32)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_get_colormap_lut(self):
+        lut = get_colormap_lut("gray")
+        self.assertEqual((256, 3), lut.shape)
+        self.assertEqual(np.uint8, lut.dtype)
+        np.testing.assert_array_equal([0, 0, 0], lut[0])
+        np.testing.assert_array_equal([255, 255, 255], lut[-1])
+        self.assertIs(lut, get_colormap_lut("gray"))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_get_downsample_factor(self):
+        self.assertEqual(1, get_downsample_factor((560, 800), None))
+        self.assertEqual(1, get_downsample_factor((560, 800), (600, 900)))
+        self.assertEqual(2, get_downsample_factor((560, 800), (400, 400)))
+        self.assertEqual(3, get_downsample_factor((560, 800), (400, 300)))
+        self.assertEqual(1, get_downsample_factor((560, 800), (0, 0)))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_render(self):
+        renderer = LutRenderer(self.image.shape, colormap="gray")
+        rgb = renderer.render(self.image)
+        self.assertEqual((56, 80, 3), rgb.shape)
+        self.assertIs(renderer.rgb, rgb)
+
+        expected = np.floor((self.image - self.image.min()) * (255.0 / np.ptp(self.image)))
+        np.testing.assert_allclose(expected, rgb[:, :, 0], atol=1.0)
+        np.testing.assert_array_equal(rgb[:, :, 0], rgb[:, :, 2])
+
+        rgb = renderer.render(self.image, 0.0, 4.0)
+        expected = np.clip(np.floor(self.image * (255.0 / 4.0)), 0, 255)
+        np.testing.assert_allclose(expected, rgb[:, :, 1], atol=1.0)
+
+        rgb = renderer.render(np.ones(self.image.shape))
+        np.testing.assert_array_equal(0, rgb)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_reduce(self):
+        height, width = 18, 26
+        blocks = self.image[:height * 3, :width * 3].reshape(height, 3, width, 3)
+        for downsample, expected in [(DOWNSAMPLE_STRIDE, self.image[:height * 3:3, :width * 3:3]),
+                                     (DOWNSAMPLE_MAXIMUM, blocks.max(axis=(1, 3))),
+                                     (DOWNSAMPLE_MEAN, blocks.mean(axis=(1, 3)))]:
+            renderer = LutRenderer(self.image.shape, downsample=downsample, display_size=(20, 30))
+            self.assertEqual(3, renderer.factor)
+            self.assertEqual((height, width), renderer.output_shape)
+            np.testing.assert_allclose(expected, renderer.reduce(self.image), rtol=1.0e-6, err_msg=downsample)
+            self.assertEqual((height, width, 3), renderer.render(self.image).shape)
+
+        renderer.set_shape((28, 40))
+        self.assertEqual(2, renderer.factor)
+        self.assertEqual((14, 20, 3), renderer.render(self.image[:28, :40]).shape)
+
+        renderer.set_display_size(None)
+        self.assertEqual(1, renderer.factor)
+        self.assertIs(self.image, renderer.reduce(self.image))
+
+        self.assertRaises(ValueError, LutRenderer, self.image.shape, downsample="unknown")
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_auto_contrast(self):
+        random = np.random.RandomState(1)
+        image = random.normal(3.0, 1.0, size=(560, 800))
+        # A hot DC bin does not change the limits.
+        image[280, 400] = 1.0e6
+
+        auto_contrast = AutoContrast(interval_frames=4, smoothing=0.5)
+        minimum, maximum = auto_contrast.update(image)
+        sample = image[::8, ::8]
+        self.assertAlmostEqual(np.percentile(sample, 1.0), minimum, delta=0.05)
+        self.assertAlmostEqual(np.percentile(sample, 99.5), maximum, delta=0.05)
+        self.assertLess(maximum, 7.0)
+        self.assertEqual(1, auto_contrast.computed_count)
+
+        # Small changes: the limits are recomputed every 4 frames and smoothed.
+        brighter_image = image * 1.1
+        for _frame_id in range(2):
+            self.assertEqual((minimum, maximum), auto_contrast.update(brighter_image))
+        self.assertEqual(1, auto_contrast.computed_count)
+        smoothed_minimum, smoothed_maximum = auto_contrast.update(brighter_image)
+        self.assertEqual(2, auto_contrast.computed_count)
+        self.assertAlmostEqual(minimum + 0.5 * (np.percentile(sample * 1.1, 1.0) - minimum), smoothed_minimum,
+                               delta=0.05)
+        self.assertAlmostEqual(maximum + 0.5 * (np.percentile(sample * 1.1, 99.5) - maximum), smoothed_maximum,
+                               delta=0.05)
+
+        # A shift of the distribution is followed at the next frame.
+        minimum, maximum = auto_contrast.update(image + 10.0)
+        self.assertEqual(3, auto_contrast.computed_count)
+        self.assertAlmostEqual(np.percentile(sample, 1.0) + 10.0, minimum, delta=0.05)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_drift
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.drift`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+import scipy.fft
+from scipy.ndimage import gaussian_filter, shift
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.drift import DriftTracker, get_peak_offset
+from pysemimaginggui.frame_source import SyntheticFrameSource
+from pysemimaginggui.fft_analysis import FftAnalysis
+from pysemimaginggui.focus_metrics import METRIC_NAMES, ELLIPTICITY
+
+# Globals and constants variables.
+
+
+class Test_drift(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.drift`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.shape = (140, 200)
+        self.random = np.random.RandomState(0)
+        height, width = self.shape
+        sample = gaussian_filter(self.random.uniform(0.0, 255.0, size=(height + 40, width + 40)), 1.5)
+        self.sample = (sample - sample.min()) * (255.0 / (sample.max() - sample.min()))
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def get_frame(self, x, y, noise=10.0):
+        """Return the frame of the sample moved by (x, y) pixels."""
+        height, width = self.shape
+        moved_sample = shift(self.sample, (y, x), order=3)[20:20 + height, 20:20 + width]
+        return moved_sample + self.random.normal(0.0, noise, size=self.shape)
+
+    def test_get_peak_offset(self):
+        self.assertAlmostEqual(0.0, get_peak_offset(1.0, 2.0, 1.0))
+        # Parabola 2 - (x - 0.25)^2 at -1, 0, 1.
+        self.assertAlmostEqual(0.25, get_peak_offset(2.0 - 1.25 ** 2, 2.0 - 0.25 ** 2, 2.0 - 0.75 ** 2))
+        self.assertAlmostEqual(0.0, get_peak_offset(1.0, 0.0, 1.0))
+        self.assertAlmostEqual(0.5, get_peak_offset(0.0, 1.0, 1.0))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_update(self):
+        tracker = DriftTracker(self.shape, workers=1)
+        positions = [(0.0, 0.0), (0.3, -0.2), (1.5, 0.4), (-2.75, 3.1)]
+        for position_id, position in enumerate(positions):
+            shift_pixel = tracker.update(scipy.fft.rfft2(self.get_frame(*position)).astype(np.complex64))
+            if position_id == 0:
+                np.testing.assert_array_equal([0.0, 0.0], shift_pixel)
+            else:
+                expected = np.subtract(position, positions[position_id - 1])
+                np.testing.assert_allclose(expected, shift_pixel, atol=0.15)
+        np.testing.assert_allclose(positions[-1], tracker.position, atol=0.3)
+        self.assertEqual(4, tracker.count)
+
+        tracker.reset()
+        self.assertEqual(0, tracker.count)
+        np.testing.assert_array_equal([0.0, 0.0], tracker.position)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_update_lattice(self):
+        # Each lattice vector is a correlation peak, the smallest shift is the drift.
+        frame_source = SyntheticFrameSource((0, 0, self.shape[1], self.shape[0]), drift_pixel=(0.25, 0.1), seed=0)
+        tracker = DriftTracker(self.shape, workers=1)
+        tracker.update(scipy.fft.rfft2(frame_source.grab()).astype(np.complex64))
+        for _frame_id in range(5):
+            tracker.update(scipy.fft.rfft2(frame_source.grab()).astype(np.complex64))
+            # The phase of the synthetic lattice increases, the lattice moves to the left and up.
+            np.testing.assert_allclose([-0.25, -0.1], tracker.shift, atol=0.1)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_update_stripes(self):
+        # The frequencies of the stripes are on an axis of the spectrum, only the shift across the stripes is defined.
+        height, width = self.shape
+        for shift_pixel, is_vertical in [(1.5, False), (-3.25, False), (1.5, True), (-3.25, True)]:
+            profile = self.sample[20, :] if is_vertical else self.sample[:, 20]
+            tracker = DriftTracker(self.shape, workers=1)
+            for position in (0.0, shift_pixel):
+                moved_profile = shift(profile, position, order=3)[20:]
+                if is_vertical:
+                    frame = np.tile(moved_profile[np.newaxis, :width], (height, 1))
+                else:
+                    frame = np.tile(moved_profile[:height, np.newaxis], (1, width))
+                frame += self.random.normal(0.0, 10.0, size=self.shape)
+                tracker.update(scipy.fft.rfft2(frame).astype(np.complex64))
+            self.assertAlmostEqual(shift_pixel, tracker.shift[0 if is_vertical else 1], delta=0.3)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_align(self):
+        height, width = self.shape
+        y, x = np.mgrid[0:height, 0:width]
+
+        def get_periodic_frame(shift_x, shift_y):
+            phase_x = 2.0 * np.pi * (x - shift_x) / width
+            phase_y = 2.0 * np.pi * (y - shift_y) / height
+            return 100.0 + 40.0 * np.cos(3 * phase_x + 2 * phase_y) + 20.0 * np.sin(7 * phase_x - 5 * phase_y)
+
+        tracker = DriftTracker(self.shape, workers=1)
+        tracker.position[...] = (2.5, -1.25)
+        aligned = tracker.align(scipy.fft.rfft2(get_periodic_frame(2.5, -1.25)).astype(np.complex64))
+        self.assertIs(tracker.aligned, aligned)
+
+        aligned_frame = scipy.fft.irfft2(aligned, s=self.shape)
+        np.testing.assert_allclose(get_periodic_frame(0.0, 0.0), aligned_frame, atol=1.0e-3)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_aligned_integration(self):
+        frames = [self.get_frame(0.7 * frame_id, 0.4 * frame_id) for frame_id in range(8)]
+        ellipticity_id = METRIC_NAMES.index(ELLIPTICITY)
+
+        ellipticities = []
+        for drift_tracking in [False, True]:
+            fft_analysis = FftAnalysis(self.shape, "hann", "running mean", "image", 8, drift_tracking)
+            result = fft_analysis.create_result()
+            for frame in frames:
+                fft_analysis(frame, result)
+            ellipticities.append(result["focus_metrics"][ellipticity_id])
+
+        np.testing.assert_allclose([0.7, 0.4], result["drift"], atol=0.15)
+        np.testing.assert_allclose([4.9, 2.8], result["drift_position"], atol=0.5)
+        # The average of the moving frames is blurred along the drift, not the average of the aligned frames.
+        self.assertGreater(ellipticities[0], 0.2)
+        self.assertLess(ellipticities[1], 0.1)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
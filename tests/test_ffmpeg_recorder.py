@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_ffmpeg_recorder
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.ffmpeg_recorder`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import subprocess
+import threading
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.ffmpeg_recorder import FfmpegRecorder, record_frames, record_shared_frames, IVF_HEADER, \
+    IVF_FRAME_HEADER
+from pysemimaginggui.frame_source import SyntheticFrameSource
+from pysemimaginggui.pipeline import SharedCapture
+from pysemimaginggui.change_detection import ChangeDetector
+from pysemimaginggui.recording import ChangedFrameWriter
+
+# Globals and constants variables.
+#: Stand-in for ffmpeg that copies the IVF stream of its standard input in the output file.
+FAKE_FFMPEG_SCRIPT = """#!{}
+import sys
+with open(sys.argv[-1], "wb") as output_file:
+    output_file.write(sys.stdin.buffer.read())
+"""
+
+
+def get_ffmpeg_paths():
+    """Return the ffmpeg and ffprobe executables on the path, ``None`` if they are not installed."""
+    ffmpeg_path = shutil.which("ffmpeg")
+    ffprobe_path = shutil.which("ffprobe")
+    if ffmpeg_path is None or ffprobe_path is None:
+        return None
+    return ffmpeg_path, ffprobe_path
+
+
+def read_frames(file_path):
+    """Return the frames and their timestamps in milliseconds of the IVF stream written by the fake ffmpeg."""
+    with open(file_path, "rb") as ivf_file:
+        data = ivf_file.read()
+    _signature, _version, header_size, _fourcc, width, height, _rate, _scale, _count, _unused = \
+        IVF_HEADER.unpack_from(data)
+    frames = []
+    timestamps_ms = []
+    offset = header_size
+    while offset < len(data):
+        frame_size, pts = IVF_FRAME_HEADER.unpack_from(data, offset)
+        offset += IVF_FRAME_HEADER.size
+        frames.append(np.frombuffer(data, np.uint8, frame_size, offset).reshape(height, width))
+        timestamps_ms.append(pts)
+        offset += frame_size
+    return frames, timestamps_ms
+
+
+class Test_ffmpeg_recorder(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.ffmpeg_recorder`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.ffmpeg_path = os.path.join(self.temporary_path, "ffmpeg")
+        with open(self.ffmpeg_path, "w") as script_file:
+            script_file.write(FAKE_FFMPEG_SCRIPT.format(sys.executable))
+        os.chmod(self.ffmpeg_path, 0o755)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_command(self):
+        recorder = FfmpegRecorder("movie.mp4", (550, 790), "ffmpeg")
+        command = recorder.get_command()
+        self.assertEqual("ivf", command[command.index("-f") + 1])
+        self.assertEqual("vfr", command[command.index("-vsync") + 1])
+        self.assertNotIn("-vf", command)
+        # The frames are timed by their capture timestamps, not by their arrival in the pipe nor by a frame rate.
+        self.assertNotIn("-use_wallclock_as_timestamps", command)
+        self.assertNotIn("-framerate", command)
+        self.assertEqual("movie.mp4", command[-1])
+
+        command = FfmpegRecorder("movie.mp4", (551, 790), "ffmpeg").get_command()
+        self.assertIn("-vf", command)
+
+        # self.fail("Test if the testcase is working.")
+
+    @unittest.skipIf(sys.platform == "win32", "The fake ffmpeg script needs a POSIX shebang.")
+    def test_record_frames(self):
+        file_path = os.path.join(self.temporary_path, "movie.mp4")
+        frame_source = SyntheticFrameSource((0, 0, 40, 30), seed=0)
+        with FfmpegRecorder(file_path, frame_source.shape, self.ffmpeg_path) as recorder:
+            number_frames = record_frames(frame_source, recorder, 5, 0.01)
+        self.assertEqual(5, number_frames)
+        self.assertEqual(5, recorder.frame_count)
+
+        frames, timestamps_ms = read_frames(file_path)
+        expected_frame_source = SyntheticFrameSource((0, 0, 40, 30), seed=0)
+        self.assertEqual(5, len(frames))
+        for frame in frames:
+            np.testing.assert_array_equal(expected_frame_source.grab(), frame)
+
+        self.assertEqual(0, timestamps_ms[0])
+        # The deadlines are absolute, a late frame is followed by a shorter interval.
+        self.assertGreater(timestamps_ms[-1], 35)
+        self.assertTrue(all(np.diff(timestamps_ms) > 0))
+
+        # self.fail("Test if the testcase is working.")
+
+    @unittest.skipIf(sys.platform == "win32", "The fake ffmpeg script needs a POSIX shebang.")
+    def test_record_shared_frames(self):
+        file_path = os.path.join(self.temporary_path, "movie.mp4")
+        capture = SharedCapture(SyntheticFrameSource((0, 0, 40, 30), seed=0), 0.005)
+        other_frames = []
+        capture.add_consumer(lambda frame, timestamp: other_frames.append(frame.copy()))
+        capture.start()
+        with FfmpegRecorder(file_path, capture.shape, self.ffmpeg_path) as recorder:
+            number_frames = record_shared_frames(capture, recorder, 5)
+        capture.stop()
+        self.assertEqual(5, number_frames)
+        self.assertEqual(5, recorder.frame_count)
+
+        # The recorded frames are frames of the other consumer, in capture order.
+        frames, _timestamps_ms = read_frames(file_path)
+        self.assertEqual(5, len(frames))
+        frame_ids = [[frame_id for frame_id, other_frame in enumerate(other_frames)
+                      if np.array_equal(other_frame, frame)][0] for frame in frames]
+        self.assertEqual(sorted(frame_ids), frame_ids)
+
+        # Record until the stop event is set by the progress function.
+        stop_event = threading.Event()
+        counts = []
+
+        def progress(count):
+            counts.append(count)
+            if count >= 3:
+                stop_event.set()
+
+        capture.start()
+        with FfmpegRecorder(file_path, capture.shape, self.ffmpeg_path) as recorder:
+            number_frames = record_shared_frames(capture, recorder, None, stop_event, progress)
+        capture.stop()
+        self.assertGreaterEqual(number_frames, 3)
+        self.assertEqual(sorted(counts), counts)
+
+        # self.fail("Test if the testcase is working.")
+
+    @unittest.skipIf(sys.platform == "win32", "The fake ffmpeg script needs a POSIX shebang.")
+    def test_variable_frame_rate(self):
+        file_path = os.path.join(self.temporary_path, "movie.mp4")
+        frame_source = SyntheticFrameSource((0, 0, 40, 30), seed=0)
+        frames = [frame_source.grab().copy() for _frame_id in range(5)]
+        # Irregular captures written whatever their arrival time, the last two in the same millisecond.
+        timestamps = [10.0, 10.011, 10.2904, 10.5, 10.5002]
+        with FfmpegRecorder(file_path, frame_source.shape, self.ffmpeg_path) as recorder:
+            for frame, timestamp in zip(frames, timestamps):
+                recorder.write(frame, timestamp)
+        self.assertEqual(5, recorder.frame_count)
+
+        video_frames, timestamps_ms = read_frames(file_path)
+        self.assertEqual([0, 11, 290, 500, 501], timestamps_ms)
+        for frame, video_frame in zip(frames, video_frames):
+            np.testing.assert_array_equal(frame, video_frame)
+
+        # self.fail("Test if the testcase is working.")
+
+    @unittest.skipIf(sys.platform == "win32", "The fake ffmpeg script needs a POSIX shebang.")
+    def test_changed_frames_only(self):
+        file_path = os.path.join(self.temporary_path, "movie.mp4")
+        frame_source = SyntheticFrameSource((0, 0, 40, 30), seed=0)
+        first_frame = frame_source.grab().copy()
+        second_frame = frame_source.grab().copy()
+        # A paused microscope: the same frame captured 10 times before the scan changes.
+        frames = [first_frame] * 10 + [second_frame] * 5
+        recorder = FfmpegRecorder(file_path, frame_source.shape, self.ffmpeg_path)
+        with ChangedFrameWriter(recorder, ChangeDetector(frame_source.shape)) as writer:
+            for frame_id, frame in enumerate(frames):
+                writer.write(frame, 10.0 + 0.1 * frame_id)
+
+        # The unchanged frames are neither piped nor encoded, only the last one keeps the duration of the video.
+        self.assertEqual(3, recorder.frame_count)
+        video_frames, timestamps_ms = read_frames(file_path)
+        self.assertEqual([0, 1000, 1400], timestamps_ms)
+        for frame, video_frame in zip([first_frame, second_frame, second_frame], video_frames):
+            np.testing.assert_array_equal(frame, video_frame)
+
+        # self.fail("Test if the testcase is working.")
+
+    @unittest.skipIf(get_ffmpeg_paths() is None, "ffmpeg and ffprobe are not installed.")
+    def test_video_timestamps(self):
+        ffmpeg_path, ffprobe_path = get_ffmpeg_paths()
+        file_path = os.path.join(self.temporary_path, "movie.mp4")
+        frame_source = SyntheticFrameSource((0, 0, 40, 30), seed=0)
+        # Irregular captures with a pause, written in a burst as by a queue that drains.
+        timestamps = [0.0, 0.1, 0.21, 0.29, 0.8, 0.9, 1.42]
+        with FfmpegRecorder(file_path, frame_source.shape, ffmpeg_path) as recorder:
+            for timestamp in timestamps:
+                recorder.write(frame_source.grab(), 100.0 + timestamp)
+
+        output = subprocess.check_output([ffprobe_path, "-v", "error", "-select_streams", "v:0",
+                                          "-show_entries", "packet=pts_time", "-of", "csv=p=0", file_path])
+        pts = np.sort([float(line.strip(b",")) for line in output.split()])
+        pts -= pts[0]
+        # Each captured frame is in the video once, at its capture time.
+        np.testing.assert_allclose(timestamps, pts, atol=1.0e-3)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_wrong_shape(self):
+        recorder = FfmpegRecorder("movie.mp4", (30, 40), "ffmpeg")
+        self.assertRaises(ValueError, recorder.write, np.zeros((40, 30), dtype=np.uint8))
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
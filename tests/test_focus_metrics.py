@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_focus_metrics
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.focus_metrics`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.focus_metrics import FocusMetrics, MetricsHistory, METRIC_NAMES, HIGH_FREQUENCY_RATIO, \
+    GRADIENT_VARIANCE, ELLIPTICITY, ORIENTATION
+
+# Globals and constants variables.
+
+
+def compute_metrics(image):
+    power = (np.abs(np.fft.rfft2(image)) ** 2).astype(np.float32)
+    focus_metrics = FocusMetrics(image.shape)
+    metrics = focus_metrics.compute(image, power)
+    return dict(zip(METRIC_NAMES, metrics))
+
+
+class Test_focus_metrics(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.focus_metrics`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.noise = np.random.RandomState(0).standard_normal((128, 160)) * 20.0 + 128.0
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_sharpness(self):
+        sharp_metrics = compute_metrics(gaussian_filter(self.noise, 1.0).astype(np.float32))
+        blurred_metrics = compute_metrics(gaussian_filter(self.noise, 3.0).astype(np.float32))
+
+        self.assertGreater(sharp_metrics[HIGH_FREQUENCY_RATIO], blurred_metrics[HIGH_FREQUENCY_RATIO])
+        self.assertGreater(sharp_metrics[GRADIENT_VARIANCE], blurred_metrics[GRADIENT_VARIANCE])
+        self.assertLess(sharp_metrics[ELLIPTICITY], 0.1)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_astigmatism(self):
+        # More blur along y, the spectrum is elongated along x.
+        metrics = compute_metrics(gaussian_filter(self.noise, (4.0, 1.5)).astype(np.float32))
+        self.assertGreater(metrics[ELLIPTICITY], 0.3)
+        self.assertAlmostEqual(0.0, metrics[ORIENTATION], delta=5.0)
+
+        metrics = compute_metrics(gaussian_filter(self.noise, (1.5, 4.0)).astype(np.float32))
+        self.assertGreater(metrics[ELLIPTICITY], 0.3)
+        self.assertAlmostEqual(90.0, abs(metrics[ORIENTATION]), delta=5.0)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_metrics_history(self):
+        history = MetricsHistory(length=3, number_metrics=1)
+        for index in range(5):
+            history.append(float(index), [10.0 * index])
+
+        times, values = history.get_series()
+        np.testing.assert_array_equal([2.0, 3.0, 4.0], times)
+        np.testing.assert_array_equal([[20.0], [30.0], [40.0]], values)
+
+        history = MetricsHistory(length=3, number_metrics=1)
+        history.append(1.0, [5.0])
+        times, values = history.get_series()
+        np.testing.assert_array_equal([1.0], times)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_frame_source
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.frame_source`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+from PIL import Image
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_source import GrayConverter, ReplayFrameSource, SyntheticFrameSource, create_frame_source
+from pysemimaginggui.frame_store import FrameStoreWriter
+
+# Globals and constants variables.
+
+
+class FakeClock(object):
+    """Clock advanced by the test instead of the wall clock."""
+    def __init__(self):
+        self.time_s = 100.0
+
+    def __call__(self):
+        return self.time_s
+
+
+class Test_frame_source(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.frame_source`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_gray_converter(self):
+        random = np.random.RandomState(0)
+        pixels = random.randint(0, 256, size=(7, 5, 3)).astype(np.uint8)
+        expected = np.asarray(Image.fromarray(pixels).convert("L"))
+
+        converter = GrayConverter((7, 5))
+        gray = np.empty((7, 5), dtype=np.uint8)
+        converter.convert(pixels, gray)
+        np.testing.assert_array_equal(expected, gray)
+
+        bgra = np.zeros((7, 5, 4), dtype=np.uint8)
+        bgra[..., :3] = pixels[..., ::-1]
+        converter = GrayConverter((7, 5), channels=(2, 1, 0))
+        converter.convert(bgra, gray)
+        np.testing.assert_array_equal(expected, gray)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_replay_frame_source(self):
+        stack = np.arange(3 * 4 * 6, dtype=np.uint8).reshape(3, 4, 6)
+
+        frame_source = ReplayFrameSource(stack, region=(1, 2, 3, 2), loop=True)
+        self.assertEqual((2, 3), frame_source.shape)
+        frame = frame_source.grab()
+        np.testing.assert_array_equal(stack[0, 2:4, 1:4], frame)
+
+        frame_source.grab()
+        frame_source.grab()
+        frame = frame_source.grab()
+        np.testing.assert_array_equal(stack[0, 2:4, 1:4], frame)
+
+        frame_source = ReplayFrameSource(stack, loop=False)
+        self.assertEqual((4, 6), frame_source.shape)
+        for index in range(3):
+            np.testing.assert_array_equal(stack[index], frame_source.grab())
+        self.assertRaises(StopIteration, frame_source.grab)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_replay_realtime_without_timestamps(self):
+        stack = np.arange(3 * 4 * 6, dtype=np.uint8).reshape(3, 4, 6)
+
+        frame_source = ReplayFrameSource(stack, loop=False, realtime=True)
+        self.assertFalse(frame_source.realtime)
+        for index in range(3):
+            np.testing.assert_array_equal(stack[index], frame_source.grab())
+        self.assertRaises(StopIteration, frame_source.grab)
+
+        temporary_path = tempfile.mkdtemp()
+        try:
+            for index, frame in enumerate(stack):
+                Image.fromarray(frame).save(os.path.join(temporary_path, "frame_{:06d}.png".format(index)))
+
+            frame_source = ReplayFrameSource(temporary_path, loop=True, realtime=True)
+            self.assertFalse(frame_source.realtime)
+            for index in [0, 1, 2, 0]:
+                np.testing.assert_array_equal(stack[index], frame_source.grab())
+        finally:
+            shutil.rmtree(temporary_path)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_replay_frame_store(self):
+        stack = np.arange(5 * 4 * 6, dtype=np.uint8).reshape(5, 4, 6)
+        temporary_path = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temporary_path, "stack.frames")
+            with FrameStoreWriter(path, (4, 6), chunk_size=2) as writer:
+                for index, frame in enumerate(stack):
+                    writer.write(frame, 100.0 + 0.1 * index)
+
+            frame_source = create_frame_source("replay", None, frames=path, loop=False)
+            for index in range(5):
+                np.testing.assert_array_equal(stack[index], frame_source.grab())
+            self.assertRaises(StopIteration, frame_source.grab)
+            frame_source.close()
+
+            clock = FakeClock()
+            frame_source = ReplayFrameSource(path, loop=False, realtime=True, clock=clock)
+            np.testing.assert_array_equal(stack[0], frame_source.grab())
+            np.testing.assert_array_equal(stack[0], frame_source.grab())
+            clock.time_s += 0.25
+            np.testing.assert_array_equal(stack[2], frame_source.grab())
+            clock.time_s += 0.1
+            np.testing.assert_array_equal(stack[3], frame_source.grab())
+            clock.time_s += 0.2
+            np.testing.assert_array_equal(stack[4], frame_source.grab())
+            self.assertRaises(StopIteration, frame_source.grab)
+            frame_source.close()
+        finally:
+            shutil.rmtree(temporary_path)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_synthetic_frame_source(self):
+        frame_source = create_frame_source("synthetic", (10, 20, 64, 32), seed=1)
+        self.assertIsInstance(frame_source, SyntheticFrameSource)
+
+        frame = frame_source.grab()
+        self.assertEqual((32, 64), frame.shape)
+        self.assertEqual(np.uint8, frame.dtype)
+        first_frame = frame.copy()
+        self.assertIs(frame, frame_source.grab())
+        self.assertFalse(np.array_equal(first_frame, frame))
+
+        self.assertRaises(ValueError, create_frame_source, "unknown", (0, 0, 1, 1))
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
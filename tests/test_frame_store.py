@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_frame_store
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.frame_store`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_store import FrameStoreWriter, FrameStoreReader, get_compressions, read_meta, \
+    COMPRESSION_NONE, TIMESTAMPS_FILE_NAME, TIMESTAMP_DTYPE, CHUNK_CACHE_SIZE
+
+# Globals and constants variables.
+
+
+class Test_frame_store(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.frame_store`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.frames = np.random.RandomState(0).randint(0, 256, size=(10, 6, 8)).astype(np.uint8)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def write_frames(self, path, compression):
+        with FrameStoreWriter(path, (6, 8), chunk_size=4, compression=compression) as writer:
+            for frame_id, frame in enumerate(self.frames):
+                writer.write(frame, 10.0 + 0.5 * frame_id)
+        return writer
+
+    def test_write(self):
+        for compression in get_compressions():
+            path = os.path.join(self.temporary_path, compression + ".frames")
+            writer = self.write_frames(path, compression)
+            self.assertEqual(10, writer.frame_count)
+
+            meta = read_meta(path)
+            self.assertEqual([6, 8], meta["shape"])
+            self.assertEqual(10, meta["number_frames"])
+            self.assertEqual(compression, meta["compression"])
+
+            timestamps = np.fromfile(os.path.join(path, TIMESTAMPS_FILE_NAME), dtype=TIMESTAMP_DTYPE)
+            np.testing.assert_allclose(10.0 + 0.5 * np.arange(10), timestamps)
+
+            with FrameStoreReader(path) as stack:
+                self.assertEqual(10, len(stack))
+                self.assertAlmostEqual(4.5, stack.duration_s)
+                np.testing.assert_array_equal(self.frames, stack[:])
+                np.testing.assert_array_equal(self.frames[3], stack[3])
+                np.testing.assert_array_equal(self.frames[-1], stack[-1])
+                np.testing.assert_array_equal(self.frames[1:9:3], stack[1:9:3])
+                np.testing.assert_array_equal(self.frames[[7, 2]], stack[[7, 2]])
+                self.assertRaises(IndexError, stack.get_frame, 10)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_open_chunks(self):
+        for compression in get_compressions():
+            path = os.path.join(self.temporary_path, compression + ".frames")
+            with FrameStoreWriter(path, (6, 8), chunk_size=1, compression=compression) as writer:
+                for frame_id in range(3 * CHUNK_CACHE_SIZE):
+                    writer.write(self.frames[frame_id % 10], 10.0 + 0.5 * frame_id)
+
+            with FrameStoreReader(path) as stack:
+                # One chunk per frame, only the chunks used last stay open.
+                np.testing.assert_array_equal(self.frames[[frame_id % 10 for frame_id in range(0, len(stack), 2)]],
+                                              stack[::2])
+                self.assertLessEqual(len(stack._chunks) + len(stack._chunk_files), CHUNK_CACHE_SIZE)
+                np.testing.assert_array_equal(self.frames[0], stack[0])
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_find_frame(self):
+        path = os.path.join(self.temporary_path, "store.frames")
+        self.write_frames(path, COMPRESSION_NONE)
+        with FrameStoreReader(path) as stack:
+            self.assertEqual(0, stack.find_frame(-1.0))
+            self.assertEqual(0, stack.find_frame(0.4))
+            self.assertEqual(1, stack.find_frame(0.5))
+            self.assertEqual(9, stack.find_frame(100.0))
+            self.assertEqual(4, stack.find_frame(12.1, relative=False))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_errors(self):
+        path = os.path.join(self.temporary_path, "store.frames")
+        self.assertRaises(ValueError, FrameStoreWriter, path, (6, 8), compression="unknown")
+
+        self.write_frames(path, COMPRESSION_NONE)
+        self.assertRaises(IOError, FrameStoreWriter(path, (6, 8)).open)
+
+        with FrameStoreWriter(os.path.join(self.temporary_path, "other.frames"), (6, 8)) as writer:
+            self.assertRaises(ValueError, writer.write, np.zeros((8, 6), dtype=np.uint8), 0.0)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_integration
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.integration`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.integration import RunningMeanIntegrator, ExponentialIntegrator, KalmanIntegrator, \
+    create_integrator, get_integration_methods, INTEGRATION_NONE, INTEGRATION_RUNNING_MEAN, DOMAIN_SPECTRUM
+from pysemimaginggui.fft_analysis import FftAnalysis
+
+# Globals and constants variables.
+
+
+class Test_integration(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.integration`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random = np.random.RandomState(0)
+        self.image = random.uniform(50.0, 200.0, size=(28, 40))
+        self.frames = [np.clip(self.image + random.normal(0.0, 20.0, size=self.image.shape), 0, 255).astype(np.uint8)
+                       for _frame_id in range(60)]
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_running_mean(self):
+        integrator = RunningMeanIntegrator(self.image.shape, 4)
+        for frame_id, frame in enumerate(self.frames[:11]):
+            accumulator = integrator(frame)
+            self.assertIs(integrator.accumulator, accumulator)
+            expected = np.mean(self.frames[max(frame_id - 3, 0):frame_id + 1], axis=0)
+            np.testing.assert_allclose(expected, accumulator, rtol=1.0e-5)
+        self.assertEqual(np.float32, accumulator.dtype)
+
+        integrator.reset()
+        np.testing.assert_allclose(self.frames[20], integrator(self.frames[20]))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_exponential(self):
+        integrator = ExponentialIntegrator(self.image.shape, 0.25)
+        expected = self.frames[0].astype(np.float64)
+        integrator(self.frames[0])
+        for frame in self.frames[1:5]:
+            expected += 0.25 * (frame - expected)
+            accumulator = integrator(frame)
+        np.testing.assert_allclose(expected, accumulator, rtol=1.0e-5)
+
+        self.assertRaises(ValueError, ExponentialIntegrator, self.image.shape, 0.0)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_noise_reduction(self):
+        for method in get_integration_methods()[1:]:
+            integrator = create_integrator(method, self.image.shape, 8)
+            for frame in self.frames:
+                accumulator = integrator(frame)
+            # The noise of the mean of 8 frames is 20 / sqrt(8) = 7.
+            self.assertLess(np.std(accumulator - self.image), 9.0, method)
+
+        self.assertIsNone(create_integrator(INTEGRATION_NONE, self.image.shape))
+        self.assertRaises(ValueError, create_integrator, "unknown", self.image.shape)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_kalman_follows_change(self):
+        integrator = KalmanIntegrator(self.image.shape, 0.05, measurement_noise=400.0)
+        for frame in self.frames[:30]:
+            integrator(frame)
+
+        # The left half of the image changes: it follows within a few frames, the right half keeps averaging.
+        changed_image = self.image.copy()
+        changed_image[:, :20] = 255.0 - changed_image[:, :20]
+        random = np.random.RandomState(1)
+        for _frame_id in range(5):
+            frame = np.clip(changed_image + random.normal(0.0, 20.0, size=self.image.shape), 0, 255)
+            accumulator = integrator(frame.astype(np.uint8))
+        self.assertLess(np.abs(accumulator - changed_image)[:, :20].mean(), 20.0)
+        self.assertLess(np.std((accumulator - changed_image)[:, 20:]), 10.0)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_integrate_spectrum(self):
+        fft_analysis = FftAnalysis(self.image.shape, integration=INTEGRATION_RUNNING_MEAN,
+                                   integration_domain=DOMAIN_SPECTRUM, number_frames=2)
+        result = fft_analysis.create_result()
+        fft_analysis(self.frames[0], result)
+        fft_analysis(self.frames[1], result)
+
+        power = np.mean([np.abs(np.fft.fft2(frame)) ** 2 for frame in self.frames[:2]], axis=0)
+        expected = np.log10(np.fft.fftshift(power) + 1.0)
+        np.testing.assert_allclose(expected, result["log_power"], rtol=1.0e-4)
+
+        fft_analysis.set_integration(INTEGRATION_NONE)
+        self.assertIsNone(fft_analysis.integrator)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
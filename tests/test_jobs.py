@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_jobs
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.jobs`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import threading
+import time
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.jobs import JobManager
+
+# Globals and constants variables.
+
+
+class Test_jobs(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.jobs`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.manager = JobManager()
+        self.progresses = []
+        self.finished_jobs = []
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        self.manager.stop(1.0)
+
+    def on_progress(self, job, text, fraction):
+        self.progresses.append((job.name, text, fraction))
+
+    def on_done(self, job):
+        self.finished_jobs.append(job)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_job(self):
+        release_event = threading.Event()
+
+        def count(job):
+            for value in range(3):
+                job.report("value {}".format(value), value / 2.0)
+            release_event.wait(1.0)
+            return 42
+
+        job = self.manager.start("count", count, self.on_progress, self.on_done)
+        self.assertRaises(ValueError, self.manager.start, "count", count)
+        self.assertTrue(self.manager.is_running("count"))
+
+        # The progress events are merged, only the last one is reported.
+        time.sleep(0.05)
+        self.assertEqual(3, self.manager.poll())
+        self.assertEqual([("count", "value 2", 1.0)], self.progresses)
+        self.assertEqual([], self.finished_jobs)
+
+        # The job stays running until its end is polled.
+        release_event.set()
+        job.join(1.0)
+        self.assertFalse(job.is_alive)
+        self.assertEqual(["count"], self.manager.running_names)
+        self.assertEqual(1, self.manager.poll())
+        self.assertEqual([job], self.finished_jobs)
+        self.assertEqual(42, job.result)
+        self.assertIsNone(job.error)
+        self.assertFalse(self.manager.is_running("count"))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_cancel(self):
+        def wait(job):
+            job.cancel_event.wait(5.0)
+            return job.is_cancelled
+
+        self.manager.start("wait", wait, on_done=self.on_done)
+        self.manager.start("other", wait, on_done=self.on_done)
+        self.manager.cancel("wait")
+        self.manager.get("wait").join(1.0)
+        self.manager.poll()
+        self.assertEqual(["wait"], [job.name for job in self.finished_jobs])
+        self.assertTrue(self.finished_jobs[0].result)
+        self.assertEqual(["other"], self.manager.running_names)
+
+        self.manager.stop(1.0)
+        self.assertEqual(["wait", "other"], [job.name for job in self.finished_jobs])
+        self.assertEqual([], self.manager.running_names)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_error(self):
+        def fail(job):
+            raise RuntimeError("no screen")
+
+        job = self.manager.start("fail", fail, on_done=self.on_done)
+        job.join(1.0)
+        self.manager.poll()
+        self.assertEqual([job], self.finished_jobs)
+        self.assertIsInstance(job.error, RuntimeError)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_live_view
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.live_view`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.live_view import LivePlots, get_profile_limits, format_focus_metrics, DRIFT_LIMIT_PX
+from pysemimaginggui.fft_analysis import FftAnalysis, MultiPaneFftAnalysis
+from pysemimaginggui.panes import PaneLayout
+
+# Globals and constants variables.
+
+
+class Test_live_view(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.live_view`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assert_(True)
+
+    def test_get_profile_limits(self):
+        radial_profile = np.array([1.0e6, 10.0, 100.0, 1000.0], dtype=np.float32)
+        minimum, maximum = get_profile_limits(radial_profile)
+        self.assertAlmostEqual(1.0, minimum)
+        self.assertAlmostEqual(1.0e7, maximum)
+
+        self.assertIn("Ellipticity: 0.500 at 45 deg", format_focus_metrics([0.1, 2.0, 0.5, 45.0, 10.0]))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_live_plots(self):
+        frames = np.random.RandomState(0).randint(0, 256, size=(3, 40, 60)).astype(np.uint8)
+        fft_analysis = FftAnalysis(frames.shape[1:], drift_tracking=True)
+        result = fft_analysis.create_result()
+
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        plots = LivePlots(figure, show_images=True)
+        figure.canvas.draw()
+        plots.start(fft_analysis.radial_profile.frequencies, 0.1)
+        self.assertEqual((-20.0, 0.0), plots.drift_axes.get_xlim())
+
+        for frame_id, frame in enumerate(frames):
+            fft_analysis(frame, result)
+            plots.show_image(result["frame"], 0, 255)
+            plots.show_fft(result["log_power"], 0.0, 10.0)
+            plots.show_result(result, frame_id * 0.1, drift_tracking=True)
+            plots.blit()
+
+        self.assertEqual((40, 60), plots.image.get_array().shape)
+        times, positions = plots.drift_history.get_series()
+        np.testing.assert_allclose([0.0, 0.1, 0.2], times)
+        np.testing.assert_allclose(result["drift_position"], positions[-1])
+        np.testing.assert_allclose(result["radial_profile"], plots.profile_line.get_ydata())
+        self.assertEqual(3, len(plots.sharpness_line.get_xdata()))
+        self.assertIn("drift:", plots.metrics_text.get_text())
+        self.assertGreaterEqual(plots.drift_axes.get_ylim()[1], DRIFT_LIMIT_PX)
+
+        plots.show_message("Microscope paused")
+        self.assertEqual("Microscope paused", plots.metrics_text.get_text())
+
+        # self.fail("Test if the testcase is working.")
+
+
+    def test_live_plots_panes(self):
+        layout = PaneLayout([(0, 0, 40, 30), (50, 0, 40, 30)])
+        fft_analysis = MultiPaneFftAnalysis(layout)
+        result = fft_analysis.create_result()
+        fft_analysis(np.random.RandomState(0).randint(0, 256, size=layout.shape).astype(np.uint8), result)
+
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        plots = LivePlots(figure)
+        figure.canvas.draw()
+        plots.start(fft_analysis.radial_profile.frequencies, 0.1, layout.number_panes)
+        self.assertEqual(2, plots.number_panes)
+        plots.show_result(result, 0.0)
+        plots.show_result(result, 0.1)
+        plots.blit()
+
+        for pane_id, line in enumerate(plots.profile_lines):
+            np.testing.assert_allclose(result["radial_profile"][pane_id], line.get_ydata())
+        np.testing.assert_allclose([1.0, 1.0], plots.sharpness_lines[1].get_ydata())
+        self.assertEqual(2, len(plots.metrics_text.get_text().splitlines()))
+
+        plots.start(fft_analysis.radial_profile.frequencies, 0.1)
+        self.assertEqual(1, plots.number_panes)
+        self.assertEqual(1, len(plots.profile_axes.get_lines()))
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_location_cache
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.location_cache`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+import threading
+
+# Third party modules.
+import numpy as np
+from PIL import Image
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.location_cache import LocationCache, MicrographLocator, get_cache_key, METHOD_CACHE, \
+    METHOD_NEIGHBOURHOOD, METHOD_FULL
+from pysemimaginggui.locator import Match
+from pysemimaginggui.frame_source import BACKEND_REPLAY
+from tests.test_locator import create_smooth_image
+
+# Globals and constants variables.
+
+
+class Test_location_cache(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.location_cache`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.cache_file_path = os.path.join(self.temporary_path, "locations.json")
+
+        random = np.random.RandomState(0)
+        self.background = create_smooth_image(random, (400, 600)).astype(np.uint8)
+        self.template_pause = create_smooth_image(random, (24, 90)).astype(np.uint8)
+        self.template_run = create_smooth_image(random, (24, 90)).astype(np.uint8)
+        self.file_paths = []
+        for name, template in [("pause.png", self.template_pause), ("run.png", self.template_run)]:
+            file_path = os.path.join(self.temporary_path, name)
+            Image.fromarray(template).save(file_path)
+            self.file_paths.append(file_path)
+
+        self.screen = np.empty_like(self.background)
+        self.show_template(self.template_pause, 100, 200)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def show_template(self, template, top, left):
+        self.screen[...] = self.background
+        self.screen[top:top + template.shape[0], left:left + template.shape[1]] = template
+
+    def create_locator(self):
+        return MicrographLocator("SU8230", self.file_paths, BACKEND_REPLAY, cache=LocationCache(self.cache_file_path),
+                                 screen_region=(0, 0, 600, 400), frames=self.screen)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_location_cache(self):
+        key = get_cache_key("SU8230", (0, 0, 3840, 2160))
+        self.assertEqual("SU8230:3840x2160+0+0", key)
+
+        cache = LocationCache(self.cache_file_path)
+        self.assertIsNone(cache.get(key))
+        match = Match(10, 20, 30, 40, 0.95, "pause.png")
+        cache.set(key, match)
+
+        self.assertEqual(match, LocationCache(self.cache_file_path).get(key))
+        cache.remove(key)
+        self.assertIsNone(LocationCache(self.cache_file_path).get(key))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_locate(self):
+        locator = self.create_locator()
+        self.assertIsNone(locator.locate(full_search=False))
+
+        # A cancelled search does not search the full screen.
+        stop_event = threading.Event()
+        stop_event.set()
+        self.assertIsNone(locator.locate(stop_event=stop_event))
+        self.assertIsNone(locator.method)
+
+        match = locator.locate()
+        self.assertEqual(METHOD_FULL, locator.method)
+        self.assertEqual((200, 100, "pause.png"), (match.left, match.top, match.name))
+
+        # A new session checks the cached location, also after the pause to run switch.
+        self.show_template(self.template_run, 100, 200)
+        locator = self.create_locator()
+        match = locator.locate(full_search=False)
+        self.assertEqual(METHOD_CACHE, locator.method)
+        self.assertEqual((200, 100, "run.png"), (match.left, match.top, match.name))
+
+        self.show_template(self.template_run, 130, 170)
+        locator = self.create_locator()
+        match = locator.locate()
+        self.assertEqual(METHOD_NEIGHBOURHOOD, locator.method)
+        self.assertEqual((170, 130), (match.left, match.top))
+
+        self.show_template(self.template_run, 300, 20)
+        match = self.create_locator().locate()
+        self.assertEqual((20, 300), (match.left, match.top))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_track(self):
+        locator = self.create_locator()
+        locator.locate()
+        self.assertEqual((200, 100), (locator.track().left, locator.track().top))
+
+        self.show_template(self.template_pause, 110, 230)
+        match = locator.track()
+        self.assertEqual((230, 110), (match.left, match.top))
+        self.assertEqual(match, LocationCache(self.cache_file_path).get(locator.key))
+
+        self.screen[...] = self.background
+        self.assertIsNone(locator.track())
+
+        # self.fail("Test if the testcase is working.")
+
+
+    def test_locate_panes(self):
+        # Quad layout, the toolbars of the same row are not exactly aligned.
+        locations = [(240, 350), (42, 350), (240, 50), (40, 50)]
+
+        def show_panes(top_shift, left_shift):
+            self.screen[...] = self.background
+            for top, left in locations:
+                top += top_shift
+                left += left_shift
+                self.screen[top:top + 24, left:left + 90] = self.template_pause
+
+        show_panes(0, 0)
+        locator = self.create_locator()
+        matches = locator.locate_panes()
+        self.assertEqual(METHOD_FULL, locator.method)
+        self.assertEqual([(50, 40), (350, 42), (50, 240), (350, 240)], [(match.left, match.top) for match in matches])
+        self.assertEqual(matches[0], locator.match)
+        self.assertEqual(matches[0], LocationCache(self.cache_file_path).get(locator.key))
+        self.assertEqual(2, len(locator.locate_panes(max_panes=2)))
+
+        locator.locate_panes()
+        show_panes(5, 10)
+        locator.track()
+        self.assertEqual([(60, 45), (360, 47), (60, 245), (360, 245)],
+                         [(match.left, match.top) for match in locator.matches])
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_locator
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.locator`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.locator import TemplateLocator, Template, reduce_image, remove_overlapping_matches, Match
+
+# Globals and constants variables.
+
+
+def create_smooth_image(random, shape):
+    image = random.randint(0, 256, size=(shape[0] // 4 + 2, shape[1] // 4 + 2)).astype(np.float32)
+    image = np.repeat(np.repeat(image, 4, axis=0), 4, axis=1)
+    image = 0.25 * (image[:-1, :-1] + image[1:, :-1] + image[:-1, 1:] + image[1:, 1:])
+    return np.ascontiguousarray(image[:shape[0], :shape[1]])
+
+
+class Test_locator(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.locator`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random = np.random.RandomState(0)
+        self.screen = create_smooth_image(random, (600, 900))
+        self.template_a = create_smooth_image(random, (24, 90))
+        self.template_b = create_smooth_image(random, (30, 40))
+        self.screen[123:147, 345:435] = self.template_a
+        self.screen[333:363, 77:117] = self.template_b
+        self.screen[501:531, 801:841] = self.template_b
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_reduce_image(self):
+        image = np.arange(20, dtype=np.float32).reshape(4, 5)
+        reduced = reduce_image(image)
+        self.assertEqual((2, 2), reduced.shape)
+        self.assertAlmostEqual(np.mean([0, 1, 5, 6]), reduced[0, 0])
+
+        template = Template("a", self.template_a)
+        self.assertEqual(1, template.maximum_level)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_locate_all(self):
+        locator = TemplateLocator({"a": self.template_a, "b": self.template_b})
+        matches = locator.locate_all(self.screen, max_matches=2)
+
+        locations = sorted((match.name, match.left, match.top, match.width, match.height) for match in matches)
+        self.assertEqual([("a", 345, 123, 90, 24), ("b", 77, 333, 40, 30), ("b", 801, 501, 40, 30)], locations)
+        for match in matches:
+            self.assertGreater(match.confidence, 0.99)
+
+        match = locator.locate(self.screen, "b")
+        self.assertEqual("b", match.name)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_locate_missing(self):
+        locator = TemplateLocator({"a": self.template_a})
+        self.screen[123:147, 345:435] = 128.0
+        self.assertIsNone(locator.locate(self.screen))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_remove_overlapping_matches(self):
+        matches = [Match(10, 10, 20, 20, 0.95, "a"), Match(12, 11, 20, 20, 0.97, "a"), Match(40, 10, 20, 20, 0.91, "a")]
+        kept_matches = remove_overlapping_matches(matches)
+        self.assertEqual([0.97, 0.91], [match.confidence for match in kept_matches])
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
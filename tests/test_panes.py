@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_panes
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.panes`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.panes import PaneLayout, sort_regions, get_union_region
+from pysemimaginggui.fft_analysis import FftAnalysis, MultiPaneFftAnalysis
+from pysemimaginggui.apodization import WINDOW_HANN
+from pysemimaginggui.integration import INTEGRATION_RUNNING_MEAN, DOMAIN_SPECTRUM
+
+# Globals and constants variables.
+
+
+class Test_panes(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.panes`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        # Quad layout with a gap between the panes, the union starts at (100, 50) on the screen.
+        self.regions = [(146, 82, 40, 28), (100, 50, 40, 28), (146, 50, 40, 28), (100, 81, 40, 28)]
+        self.screen = np.random.RandomState(0).randint(0, 256, size=(200, 300)).astype(np.uint8)
+        self.frame = self.screen[50:110, 100:186]
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_sort_regions(self):
+        self.assertEqual([(100, 50, 40, 28), (146, 50, 40, 28), (100, 81, 40, 28), (146, 82, 40, 28)],
+                         sort_regions(self.regions))
+        self.assertEqual((100, 50, 86, 60), get_union_region(self.regions))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_pane_layout(self):
+        layout = PaneLayout(self.regions)
+        self.assertEqual(4, layout.number_panes)
+        self.assertEqual((100, 50, 86, 60), layout.region)
+        self.assertEqual((60, 86), layout.shape)
+        self.assertEqual((28, 40), layout.pane_shape)
+        self.assertEqual([(0, 0), (0, 46), (31, 0), (32, 46)], layout.offsets)
+        self.assertEqual((110, 55, 86, 60), layout.get_region((110, 55)))
+
+        panes = layout.split(self.frame)
+        for pane, (x, y, width, height) in zip(panes, layout.regions):
+            self.assertTrue(np.shares_memory(pane, self.frame))
+            np.testing.assert_array_equal(self.screen[y:y + height, x:x + width], pane)
+
+        self.assertRaises(ValueError, PaneLayout, [(0, 0, 40, 28), (50, 0, 40, 30)])
+        self.assertRaises(ValueError, PaneLayout, [])
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_multi_pane_fft_analysis(self):
+        layout = PaneLayout(self.regions)
+        analysis = MultiPaneFftAnalysis(layout, WINDOW_HANN)
+        result = analysis.create_result()
+        analysis(self.frame, result)
+        np.testing.assert_array_equal(self.frame, result["frame"])
+        self.assertEqual((4, 5), result["focus_metrics"].shape)
+
+        # Same results as the analysis of each pane alone, the spectra are at the place of their pane.
+        pane_analysis = FftAnalysis(layout.pane_shape, WINDOW_HANN)
+        pane_result = pane_analysis.create_result()
+        for pane_id, (pane, log_power) in enumerate(zip(layout.split(self.frame), layout.split(result["log_power"]))):
+            pane_analysis(np.ascontiguousarray(pane), pane_result)
+            np.testing.assert_allclose(pane_result["log_power"], log_power, rtol=1.0e-4, atol=1.0e-4)
+            np.testing.assert_allclose(pane_result["radial_profile"], result["radial_profile"][pane_id], rtol=1.0e-4)
+            np.testing.assert_allclose(pane_result["focus_metrics"], result["focus_metrics"][pane_id], rtol=1.0e-3,
+                                       atol=1.0e-3)
+
+        # The power spectra of the panes are integrated together.
+        analysis.set_integration(INTEGRATION_RUNNING_MEAN, DOMAIN_SPECTRUM, 2)
+        self.assertEqual((4, 28, 21), analysis.integrator.shape)
+        analysis(self.frame, result)
+        analysis(self.frame[::-1], result)
+        self.assertTrue(np.all(np.isfinite(result["radial_profile"])))
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_pipeline
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.pipeline`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import time
+import threading
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.pipeline import FrameRingBuffer, LivePipeline, SharedCapture, DROP_OLDEST, DROP_NEWEST, BLOCK
+from pysemimaginggui.frame_source import SyntheticFrameSource
+
+# Globals and constants variables.
+
+
+class Test_pipeline(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.pipeline`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_ring_buffer_drop_oldest(self):
+        ring_buffer = FrameRingBuffer((2, 2), size=2, policy=DROP_OLDEST)
+        for value in range(3):
+            self.assertTrue(ring_buffer.put(np.full((2, 2), value), float(value)))
+        self.assertEqual(1, ring_buffer.dropped_frames)
+        self.assertEqual(2, len(ring_buffer))
+
+        out = np.empty((2, 2), dtype=np.uint8)
+        self.assertEqual(1.0, ring_buffer.get(out, timeout=0))
+        self.assertEqual(1, out[0, 0])
+        self.assertEqual(2.0, ring_buffer.get(out, timeout=0))
+        self.assertIsNone(ring_buffer.get(out, timeout=0))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_ring_buffer_drop_newest(self):
+        ring_buffer = FrameRingBuffer((2, 2), size=2, policy=DROP_NEWEST)
+        for value in range(3):
+            ring_buffer.put(np.full((2, 2), value), float(value))
+        self.assertEqual(1, ring_buffer.dropped_frames)
+
+        out = np.empty((2, 2), dtype=np.uint8)
+        self.assertEqual(0.0, ring_buffer.get(out, timeout=0))
+        self.assertEqual(0, out[0, 0])
+
+        ring_buffer.put(np.full((2, 2), 5), 5.0)
+        self.assertEqual(5.0, ring_buffer.get(out, timeout=0, latest=True))
+        self.assertEqual(2, ring_buffer.dropped_frames)
+
+        ring_buffer.close()
+        self.assertIsNone(ring_buffer.get(out))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_ring_buffer_block(self):
+        ring_buffer = FrameRingBuffer((2, 2), size=2, policy=BLOCK)
+        ring_buffer.put(np.full((2, 2), 0), 0.0)
+        ring_buffer.put(np.full((2, 2), 1), 1.0)
+
+        thread = threading.Thread(target=ring_buffer.put, args=(np.full((2, 2), 2), 2.0))
+        thread.start()
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+
+        out = np.empty((2, 2), dtype=np.uint8)
+        self.assertEqual(0.0, ring_buffer.get(out))
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(0, ring_buffer.dropped_frames)
+
+        # The frame is dropped when no slot is freed before the timeout.
+        self.assertFalse(ring_buffer.put(np.full((2, 2), 4), 4.0, timeout=0.01))
+        self.assertEqual(1, ring_buffer.dropped_frames)
+
+        ring_buffer.close()
+        self.assertFalse(ring_buffer.put(np.full((2, 2), 3), 3.0))
+        self.assertEqual(1.0, ring_buffer.get(out))
+        self.assertEqual(2.0, ring_buffer.get(out))
+        self.assertEqual(2, out[0, 0])
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_slow_compute_does_not_delay_capture(self):
+        frame_source = SyntheticFrameSource((0, 0, 32, 16), seed=0)
+
+        def process(frame, out):
+            time.sleep(0.05)
+            out[...] = frame
+
+        pipeline = LivePipeline(frame_source, process, 0.005, buffer_size=2)
+        pipeline.start()
+        time.sleep(0.3)
+        pipeline.stop()
+
+        statistics = pipeline.statistics()
+        self.assertIsNone(pipeline.error)
+        self.assertGreater(statistics["captured"], 4 * statistics["processed"])
+        self.assertGreater(statistics["dropped_capture"], 0)
+
+        out = np.empty((16, 32), dtype=np.float32)
+        self.assertIsNotNone(pipeline.get_result(out))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_change_process(self):
+        frame_source = SyntheticFrameSource((0, 0, 32, 16), seed=0)
+        settings = {"offset": 0.0}
+        threads = []
+
+        def process(frame, out):
+            out[...] = frame + settings["offset"]
+
+        def change():
+            threads.append(threading.current_thread().name)
+            settings["offset"] = 1000.0
+
+        def failing_change():
+            raise ValueError("invalid setting")
+
+        pipeline = LivePipeline(frame_source, process, 0.005)
+        pipeline.start()
+        out = np.empty((16, 32), dtype=np.float32)
+        pipeline.change_process(failing_change)
+        pipeline.change_process(change)
+        start_time = time.monotonic()
+        while out.min() < 1000.0 and time.monotonic() - start_time < 2.0:
+            pipeline.get_result(out)
+            time.sleep(0.005)
+        pipeline.stop()
+
+        # The changes are applied by the compute thread, a failed change does not stop the pipeline.
+        self.assertEqual(["compute"], threads)
+        self.assertGreaterEqual(out.min(), 1000.0)
+        self.assertIsNone(pipeline.error)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_set_region(self):
+        frame_source = SyntheticFrameSource((0, 0, 32, 16), seed=0)
+        pipeline = LivePipeline(frame_source, None, 0.005)
+        self.assertRaises(ValueError, pipeline.set_region, (10, 20, 64, 16))
+
+        pipeline.set_region((10, 20, 32, 16))
+        pipeline.start()
+        out = np.empty((16, 32), dtype=np.uint8)
+        self.assertIsNotNone(pipeline.get_frame(out, timeout=1.0))
+        pipeline.stop()
+        self.assertEqual((10, 20, 32, 16), frame_source.region)
+
+        # self.fail("Test if the testcase is working.")
+
+
+    def test_pause(self):
+        frame_source = SyntheticFrameSource((0, 0, 32, 16), seed=0)
+        paused = threading.Event()
+        paused.set()
+        processed_frames = []
+
+        def process(frame, out):
+            processed_frames.append(frame.copy())
+            out[...] = frame
+
+        pipeline = LivePipeline(frame_source, process, 0.005, pause_detector=paused.is_set)
+        pipeline.start()
+        time.sleep(0.1)
+        self.assertTrue(pipeline.is_paused)
+        self.assertEqual(0, pipeline.captured_frames)
+        self.assertGreater(pipeline.statistics()["paused_slots"], 5)
+
+        paused.clear()
+        out = np.empty((16, 32), dtype=np.float32)
+        start_time = time.monotonic()
+        while pipeline.get_result(out) is None and time.monotonic() - start_time < 1.0:
+            time.sleep(0.001)
+        pipeline.stop()
+        self.assertFalse(pipeline.is_paused)
+        self.assertGreater(len(processed_frames), 0)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_shared_capture(self):
+        frame_source = SyntheticFrameSource((0, 0, 32, 16), seed=0)
+        capture = SharedCapture(frame_source, 0.005)
+        grabs = []
+        grab = frame_source.grab
+
+        def counted_grab():
+            grabs.append(time.monotonic())
+            return grab()
+        frame_source.grab = counted_grab
+
+        def process(frame, out):
+            out[...] = frame
+
+        recorded_frames = []
+        stopped = threading.Event()
+
+        def record(frame, timestamp):
+            recorded_frames.append((frame.copy(), timestamp))
+
+        pipelines = [LivePipeline(None, process, None, capture=capture) for _pipeline_id in range(2)]
+        for pipeline in pipelines:
+            pipeline.start()
+        capture.add_consumer(record, stopped.set)
+        capture.start()
+        time.sleep(0.1)
+        capture.remove_consumer(record)
+        self.assertTrue(stopped.is_set())
+        number_recorded_frames = len(recorded_frames)
+        time.sleep(0.05)
+        for pipeline in pipelines:
+            pipeline.stop()
+            self.assertTrue(capture.is_running)
+        capture.stop()
+
+        # One grab per frame for all the consumers.
+        self.assertEqual(len(grabs), capture.captured_frames)
+        self.assertGreater(number_recorded_frames, 5)
+        self.assertEqual(number_recorded_frames, len(recorded_frames))
+        for pipeline in pipelines:
+            self.assertEqual(len(grabs), pipeline.captured_frames)
+            self.assertIsNone(pipeline.error)
+        self.assertFalse(capture.is_running)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_shared_capture_blocked_consumer(self):
+        capture = SharedCapture(SyntheticFrameSource((0, 0, 32, 16), seed=0), 0.005)
+        release = threading.Event()
+        blocked = threading.Event()
+
+        def blocked_consumer(frame, timestamp):
+            blocked.set()
+            release.wait(5.0)
+
+        capture.add_consumer(blocked_consumer)
+        capture.start()
+        self.assertTrue(blocked.wait(1.0))
+
+        # The consumers are not called with the lock of the list, a consumer is added during a blocked dispatch.
+        other_frames = []
+        start_time = time.monotonic()
+        capture.add_consumer(lambda frame, timestamp: other_frames.append(timestamp))
+        self.assertLess(time.monotonic() - start_time, 0.5)
+
+        # The removal waits for the end of the dispatch of the current frame.
+        threading.Timer(0.05, release.set).start()
+        capture.remove_consumer(blocked_consumer)
+        self.assertTrue(release.is_set())
+        time.sleep(0.05)
+        capture.stop()
+        self.assertGreater(len(other_frames), 1)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_shared_capture_consumer_error(self):
+        frame_source = SyntheticFrameSource((0, 0, 32, 16), seed=0)
+        capture = SharedCapture(frame_source, 0.005)
+        calls = []
+        stopped = []
+
+        def failing_consumer(frame, timestamp):
+            calls.append(timestamp)
+            raise RuntimeError("encoder stopped")
+
+        capture.add_consumer(failing_consumer, lambda: stopped.append("failing"))
+        capture.add_consumer(lambda frame, timestamp: None, lambda: stopped.append("other"))
+        capture.start()
+        time.sleep(0.05)
+        self.assertEqual(["failing"], stopped)
+        capture.stop()
+
+        # The other consumers keep the frames until the end of the capture.
+        self.assertEqual(1, len(calls))
+        self.assertEqual(["failing", "other"], stopped)
+        self.assertIsNone(capture.error)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_power_spectrum
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.power_spectrum`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+from scipy.fftpack import fft2, fftshift
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.power_spectrum import PowerSpectrumEngine, BatchPowerSpectrumEngine, LogPowerKernel, \
+    get_power_spectrum_engine
+from pysemimaginggui.apodization import WINDOW_HANN, WINDOW_NONE
+
+# Globals and constants variables.
+
+
+class Test_power_spectrum(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.power_spectrum`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random = np.random.RandomState(0)
+        self.frames = [random.randint(1, 256, size=shape).astype(np.uint8) for shape in [(28, 40), (27, 39)]]
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_compute_log_power(self):
+        for frame in self.frames:
+            expected = np.log10(np.abs(fftshift(fft2(frame.astype(np.float32)))) ** 2 + 1.0)
+
+            engine = PowerSpectrumEngine(frame.shape, workers=1)
+            log_power = engine.compute_log_power(frame)
+            self.assertEqual(np.float32, log_power.dtype)
+            self.assertEqual(np.complex64, engine.spectrum.dtype)
+            np.testing.assert_allclose(expected, log_power, rtol=1.0e-4, atol=1.0e-4)
+
+            out = np.empty(frame.shape, dtype=np.float32)
+            self.assertIs(out, engine(frame, out))
+            np.testing.assert_allclose(expected, out, rtol=1.0e-4, atol=1.0e-4)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_log_power_kernel(self):
+        engine = PowerSpectrumEngine((28, 40), workers=1)
+        log_power = engine.compute_log_power(np.zeros((28, 40), dtype=np.uint8))
+        self.assertTrue(np.all(np.isfinite(log_power)))
+        np.testing.assert_allclose(0.0, log_power)
+
+        for frame in self.frames:
+            expected = np.fft.fftshift(np.abs(np.fft.fft2(frame)) ** 2)
+            kernel = LogPowerKernel(frame.shape, epsilon=0.5, use_numba=False)
+            out = np.empty(frame.shape, dtype=np.float32)
+            kernel(np.fft.rfft2(frame).astype(np.complex64), out)
+            np.testing.assert_allclose(np.log10(expected + 0.5), out, rtol=1.0e-4)
+
+            out[...] = 0.0
+            kernel.from_power((np.abs(np.fft.rfft2(frame)) ** 2).astype(np.float32), out)
+            np.testing.assert_allclose(np.log10(expected + 0.5), out, rtol=1.0e-4)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_batch_power_spectrum_engine(self):
+        random = np.random.RandomState(1)
+        screen = random.randint(0, 256, size=(60, 90)).astype(np.uint8)
+        frames = [screen[:28, :40], screen[:28, 50:], screen[30:58, :40], screen[30:58, 50:]]
+
+        engine = BatchPowerSpectrumEngine(len(frames), (28, 40), workers=1, window_type=WINDOW_HANN)
+        log_power = engine.compute_log_power(frames)
+        self.assertEqual((4, 28, 40), log_power.shape)
+        self.assertEqual((4, 28, 21), engine.compute_power().shape)
+
+        single_engine = PowerSpectrumEngine((28, 40), workers=1, window_type=WINDOW_HANN)
+        for frame, frame_log_power in zip(frames, log_power):
+            np.testing.assert_allclose(single_engine.compute_log_power(frame), frame_log_power, rtol=1.0e-4,
+                                       atol=1.0e-4)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_get_power_spectrum_engine(self):
+        engine = get_power_spectrum_engine((28, 40), window_type=WINDOW_HANN)
+        self.assertEqual(WINDOW_HANN, engine.window_type)
+
+        # Each caller has its own engine, the window of one caller does not change the other engines.
+        other_engine = get_power_spectrum_engine((28, 40))
+        self.assertIsNot(engine, other_engine)
+        other_engine.set_window(WINDOW_NONE)
+        self.assertEqual(WINDOW_HANN, engine.window_type)
+        self.assertIsNotNone(engine.window)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_radial_profile
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.radial_profile`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.radial_profile import RadialProfile, get_radial_profile
+from pysemimaginggui.fft_analysis import FftAnalysis
+
+# Globals and constants variables.
+
+
+class Test_radial_profile(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.radial_profile`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_flat_power(self):
+        for shape in [(32, 48), (31, 47)]:
+            radial_profile = RadialProfile(shape)
+            self.assertEqual(shape[0] // 2 + 1, radial_profile.number_bins)
+            self.assertAlmostEqual(0.5, radial_profile.frequencies[-1], delta=radial_profile.bin_width)
+
+            power = np.ones((shape[0], shape[1] // 2 + 1), dtype=np.float32)
+            profile = radial_profile.compute(power)
+            np.testing.assert_allclose(1.0, profile)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_cosine_peak(self):
+        height, width = 64, 96
+        frequency = 0.125
+        x = np.arange(width)[np.newaxis, :]
+        image = np.repeat(100.0 + 50.0 * np.cos(2.0 * np.pi * frequency * x), height, axis=0)
+        image = image.astype(np.float32)
+
+        power = np.abs(np.fft.rfft2(image)) ** 2
+        radial_profile = get_radial_profile((height, width))
+        self.assertIs(radial_profile, get_radial_profile((height, width)))
+        profile = radial_profile.compute(power)
+
+        peak_bin = np.argmax(profile[1:]) + 1
+        self.assertAlmostEqual(frequency, radial_profile.frequencies[peak_bin])
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_fft_analysis(self):
+        frame = np.random.RandomState(0).randint(0, 256, size=(40, 60)).astype(np.uint8)
+        fft_analysis = FftAnalysis(frame.shape)
+        result = fft_analysis.create_result()
+        fft_analysis(frame, result)
+
+        self.assertEqual((40, 60), result["log_power"].shape)
+        self.assertEqual((21,), result["radial_profile"].shape)
+        np.testing.assert_array_equal(frame, result["frame"])
+        power = np.abs(np.fft.rfft2(frame.astype(np.float64))) ** 2
+        expected = fft_analysis.radial_profile.compute(power.astype(np.float32), np.empty(21, dtype=np.float32))
+        np.testing.assert_allclose(expected, result["radial_profile"], rtol=1.0e-4)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
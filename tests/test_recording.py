@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_recording
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.recording`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+import threading
+import time
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.recording import SegmentedRecorder, AsyncFrameWriter, PngBurstWriter, ChangedFrameWriter, \
+    IntegratedFrameWriter, get_segment_file_path, BACKPRESSURE_BLOCK, BACKPRESSURE_DROP, BACKPRESSURE_DECIMATE
+from pysemimaginggui.frame_store import FrameStoreWriter, FrameStoreReader
+from pysemimaginggui.change_detection import ChangeDetector
+from pysemimaginggui.integration import RunningMeanIntegrator
+
+# Globals and constants variables.
+
+
+class SlowWriter(object):
+    """Writer waiting for an event before writing the frames."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.frames = []
+        self.timestamps = []
+
+    def open(self):
+        pass
+
+    def write(self, frame, timestamp):
+        self.event.wait()
+        self.frames.append(frame.copy())
+        self.timestamps.append(timestamp)
+
+    def close(self):
+        pass
+
+
+class Test_recording(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.recording`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.frames = np.random.RandomState(0).randint(0, 256, size=(10, 6, 8)).astype(np.uint8)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_get_segment_file_path(self):
+        file_path = os.path.join("data", "movie.mp4")
+        self.assertEqual(os.path.join("data", "movie_003.mp4"), get_segment_file_path(file_path, 3))
+        self.assertEqual("run_012.frames", get_segment_file_path("run.frames/", 12))
+
+        # self.fail("Test if the testcase is working.")
+
+    def record(self, max_duration_s, max_bytes):
+        def create_recorder(file_path):
+            return FrameStoreWriter(file_path, (6, 8), chunk_size=2)
+
+        file_path = os.path.join(self.temporary_path, "run.frames")
+        with SegmentedRecorder(create_recorder, file_path, max_duration_s, max_bytes) as recorder:
+            for frame_id, frame in enumerate(self.frames):
+                recorder.write(frame, 0.5 * frame_id)
+        self.assertEqual(10, recorder.frame_count)
+
+        frames = []
+        timestamps = []
+        for file_path in recorder.file_paths:
+            with FrameStoreReader(file_path) as stack:
+                frames.extend(stack[:])
+                timestamps.extend(stack.timestamps)
+        np.testing.assert_array_equal(self.frames, np.array(frames))
+        np.testing.assert_allclose(0.5 * np.arange(10), timestamps)
+        return recorder
+
+    def test_rotate_duration(self):
+        recorder = self.record(2.0, None)
+        self.assertEqual(3, len(recorder.file_paths))
+        self.assertEqual(4, len(FrameStoreReader(recorder.file_paths[0])))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_rotate_size(self):
+        recorder = self.record(None, 3 * 48)
+        self.assertEqual([3, 3, 3, 1], [len(FrameStoreReader(file_path)) for file_path in recorder.file_paths])
+
+        # self.fail("Test if the testcase is working.")
+
+
+    def write_async(self, backpressure):
+        writer = SlowWriter()
+        async_writer = AsyncFrameWriter(writer, (6, 8), queue_size=4, backpressure=backpressure)
+        async_writer.open()
+        if backpressure == BACKPRESSURE_BLOCK:
+            # The writer is released while the capture waits for a free slot.
+            threading.Timer(0.05, writer.event.set).start()
+        for frame_id, frame in enumerate(self.frames):
+            async_writer.write(frame, float(frame_id))
+        writer.event.set()
+        async_writer.close()
+
+        statistics = async_writer.statistics()
+        self.assertEqual(10, statistics["received"])
+        self.assertEqual(len(writer.frames), statistics["encoded"])
+        self.assertEqual(10, statistics["encoded"] + statistics["dropped"])
+        self.assertEqual(0, statistics["queued"])
+        for frame, timestamp in zip(writer.frames, writer.timestamps):
+            np.testing.assert_array_equal(self.frames[int(timestamp)], frame)
+        return writer
+
+    def test_async_writer_block(self):
+        writer = self.write_async(BACKPRESSURE_BLOCK)
+        self.assertEqual(list(range(10)), writer.timestamps)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_async_writer_block_timeout(self):
+        writer = SlowWriter()
+        async_writer = AsyncFrameWriter(writer, (6, 8), queue_size=2, backpressure=BACKPRESSURE_BLOCK,
+                                        block_timeout_s=0.01)
+        async_writer.open()
+        results = [async_writer.write(self.frames[0], 0.0)]
+        while async_writer.queued_frames:
+            time.sleep(0.001)
+        results += [async_writer.write(self.frames[frame_id], float(frame_id)) for frame_id in range(1, 5)]
+        writer.event.set()
+        async_writer.close()
+
+        # The worker holds one frame and the queue two, the next frames are dropped after the timeout.
+        self.assertEqual([True, True, True, False, False], results)
+        self.assertEqual(2, async_writer.dropped_frames)
+        self.assertEqual([0.0, 1.0, 2.0], writer.timestamps)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_async_writer_drop(self):
+        writer = self.write_async(BACKPRESSURE_DROP)
+        # The worker holds one frame while the queue is full.
+        self.assertIn(len(writer.timestamps), (4, 5))
+        self.assertEqual(list(range(len(writer.timestamps))), writer.timestamps)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_async_writer_decimate(self):
+        writer = self.write_async(BACKPRESSURE_DECIMATE)
+        # Past half the queue, every second frame is kept, so the queue fills later than with the drop.
+        self.assertEqual(5, writer.timestamps[-1])
+        self.assertLess(len(writer.timestamps), 6)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_png_burst(self):
+        file_path = os.path.join(self.temporary_path, "burst.png")
+        with PngBurstWriter(file_path) as writer:
+            for frame_id, frame in enumerate(self.frames[:3]):
+                writer.write(frame, 0.5 * frame_id)
+        self.assertEqual(3, writer.frame_count)
+        self.assertGreater(writer.bytes_written, 0)
+
+        from PIL import Image
+        path = os.path.join(self.temporary_path, "burst")
+        np.testing.assert_array_equal(self.frames[2], np.array(Image.open(os.path.join(path, "frame_000002.png"))))
+        np.testing.assert_allclose([0.0, 0.5, 1.0], np.loadtxt(os.path.join(path, "timestamps.txt")))
+
+        # self.fail("Test if the testcase is working.")
+
+
+    def test_changed_frames(self):
+        # Frames 0-3 identical, 4-5 identical, 6-9 identical.
+        frames = self.frames[[0, 0, 0, 0, 4, 4, 6, 6, 6, 6]]
+        file_path = os.path.join(self.temporary_path, "run.frames")
+        writer = ChangedFrameWriter(FrameStoreWriter(file_path, (6, 8), chunk_size=2), ChangeDetector((6, 8), step=1))
+        with writer:
+            for frame_id, frame in enumerate(frames):
+                writer.write(frame, 0.5 * frame_id)
+        self.assertEqual(3, writer.changed_frames)
+        self.assertEqual(7, writer.unchanged_frames)
+
+        with FrameStoreReader(file_path) as stack:
+            # The last frame is written again at the end of the recording.
+            np.testing.assert_allclose([0.0, 2.0, 3.0, 4.5], stack.timestamps)
+            np.testing.assert_array_equal(frames[[0, 4, 6, 9]], stack[:])
+            for frame_id, frame in enumerate(frames):
+                np.testing.assert_array_equal(frame, stack[stack.find_frame(0.5 * frame_id)])
+
+        # self.fail("Test if the testcase is working.")
+
+
+    def test_integrated_frames(self):
+        writer = SlowWriter()
+        writer.event.set()
+        with IntegratedFrameWriter(writer, RunningMeanIntegrator((6, 8), 2)) as integrated_writer:
+            for frame_id, frame in enumerate(self.frames[:3]):
+                integrated_writer.write(frame, float(frame_id))
+
+        self.assertEqual([0.0, 1.0, 2.0], writer.timestamps)
+        np.testing.assert_array_equal(self.frames[0], writer.frames[0])
+        expected = np.floor((self.frames[1].astype(np.float64) + self.frames[2]) / 2.0 + 0.5)
+        np.testing.assert_array_equal(expected, writer.frames[2])
+        self.assertEqual(np.uint8, writer.frames[2].dtype)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
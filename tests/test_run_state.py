@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_run_state
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.run_state`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.run_state import RunStateDetector, get_template_state, STATE_RUNNING, STATE_PAUSED, \
+    STATE_UNKNOWN
+from pysemimaginggui.locator import Template, Match
+
+# Globals and constants variables.
+
+
+class Test_run_state(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.run_state`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random = np.random.RandomState(0)
+        self.pause_image = random.randint(0, 256, size=(12, 40)).astype(np.float32)
+        # The run toolbar only differs by its button.
+        self.run_image = self.pause_image.copy()
+        self.run_image[2:10, 4:12] = 255.0 - self.run_image[2:10, 4:12]
+        templates = [Template("pc_sem_su8230_pause.png", self.pause_image),
+                     Template("pc_sem_su8230_run.png", self.run_image),
+                     Template("pc_sem_su8000_right_handle.png", self.pause_image[:, :20])]
+        self.detector = RunStateDetector(templates, Match(100, 50, 40, 12, 0.99, "pc_sem_su8230_pause.png"))
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_get_template_state(self):
+        self.assertEqual(STATE_PAUSED, get_template_state("pc_sem_su8230_pause.png"))
+        self.assertEqual(STATE_RUNNING, get_template_state("PC_SEM_SU8230_RUN.png"))
+        self.assertIsNone(get_template_state("pc_sem_su8000_right_handle.png"))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_detect_state(self):
+        self.assertEqual(2, len(self.detector.templates))
+        self.assertEqual((100, 50, 40, 12), self.detector.region)
+
+        self.assertEqual(STATE_PAUSED, self.detector.detect_state(self.pause_image.astype(np.uint8)))
+        self.assertEqual(STATE_RUNNING, self.detector.detect_state(self.run_image.astype(np.uint8)))
+        # The toolbar is hidden by another window.
+        self.assertEqual(STATE_UNKNOWN, self.detector.detect_state(np.full((12, 40), 200, dtype=np.uint8)))
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_no_template(self):
+        templates = [Template("pc_sem_su8000_right_handle.png", self.pause_image)]
+        self.assertRaises(ValueError, RunStateDetector, templates, Match(0, 0, 40, 12, 0.99, "handle"))
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
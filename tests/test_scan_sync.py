@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_scan_sync
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.scan_sync`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.frame_source import FrameSource
+from pysemimaginggui.scan_sync import ScanSyncFrameSource, get_scanned_rows, SCAN_STATIC
+
+# Globals and constants variables.
+
+
+class ScanningFrameSource(FrameSource):
+    """Micrograph redrawn line by line, the scan line moves by *rows_per_grab* rows at each grab."""
+    def __init__(self, region, rows_per_grab, number_scans=5, seed=0):
+        self.rows_per_grab = rows_per_grab
+        self.scans = np.random.RandomState(seed).randint(0, 256, size=(number_scans, region[3], region[2]))
+        self.scans = self.scans.astype(np.uint8)
+        self.position = region[3]
+        FrameSource.__init__(self, region)
+
+    def grab(self):
+        height = self._frame.shape[0]
+        scan_id, line = divmod(self.position, height)
+        if scan_id >= len(self.scans):
+            raise StopIteration("No more scan")
+        self._frame[:line] = self.scans[scan_id][:line]
+        self._frame[line:] = self.scans[scan_id - 1][line:]
+        self.position += self.rows_per_grab
+        return self._frame
+
+
+class Test_scan_sync(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.scan_sync`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def test_get_scanned_rows(self):
+        row_changed = np.zeros(40, dtype=bool)
+        self.assertEqual([], get_scanned_rows(row_changed))
+        row_changed[0:3] = True
+        row_changed[20:25] = True
+        row_changed[30:40] = True
+        self.assertEqual([(0, 3), (20, 40)], get_scanned_rows(row_changed, gap_rows=5))
+        self.assertEqual([(0, 3), (20, 25), (30, 40)], get_scanned_rows(row_changed, gap_rows=4))
+
+        # self.fail("Test if the testcase is working.")
+
+    def grab_scans(self, rows_per_grab, **kwargs):
+        frame_source = ScanningFrameSource((0, 0, 50, 40), rows_per_grab)
+        scan_sync = ScanSyncFrameSource(frame_source, poll_interval_s=0.0, **kwargs)
+        frames = []
+        try:
+            while True:
+                frames.append((scan_sync.grab().copy(), scan_sync.is_torn))
+        except StopIteration:
+            pass
+        return frame_source, scan_sync, frames
+
+    def test_complete_frames(self):
+        for rows_per_grab in [1, 3, 7, 13, 30]:
+            frame_source, scan_sync, frames = self.grab_scans(rows_per_grab)
+            # Each scan after the first grab is returned once, complete, except the last one, not ended.
+            self.assertEqual(len(frame_source.scans) - 2, len(frames), rows_per_grab)
+            for scan_id, (frame, is_torn) in enumerate(frames, 1):
+                np.testing.assert_array_equal(frame_source.scans[scan_id], frame)
+                self.assertFalse(is_torn)
+            self.assertGreater(scan_sync.torn_frames, 0)
+            # The torn frame is counted once per grab, not at each poll of the scan, the last grab is interrupted.
+            self.assertLessEqual(scan_sync.torn_frames, len(frames) + 1, rows_per_grab)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_flag_torn_frames(self):
+        frame_source, scan_sync, frames = self.grab_scans(7, reject_torn=False)
+        complete_frames = [frame for frame, is_torn in frames if not is_torn]
+        self.assertEqual(len(frame_source.scans) - 2, len(complete_frames))
+        self.assertEqual(len(frames), scan_sync.complete_frames + scan_sync.torn_frames)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_static(self):
+        frame_source = ScanningFrameSource((0, 0, 50, 40), 0)
+        with ScanSyncFrameSource(frame_source, poll_interval_s=0.0) as scan_sync:
+            np.testing.assert_array_equal(frame_source.scans[0], scan_sync.grab())
+            self.assertEqual(SCAN_STATIC, scan_sync.scan_state)
+
+            scan_sync.interrupt()
+            self.assertRaises(StopIteration, scan_sync.grab)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: tests.test_scheduler
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`pysemimaginggui.scheduler`.
+"""
+
+###############################################################################
+# GUI for pySEM-EELS project.
+# Copyright (C) 2017  Hendrix Demers
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import threading
+import time
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules.
+from pysemimaginggui.scheduler import FrameScheduler
+
+# Globals and constants variables.
+
+
+class FakeClock(object):
+    """Clock advanced by the waits and by the simulated capture times."""
+    def __init__(self):
+        self.time_s = 100.0
+
+    def __call__(self):
+        return self.time_s
+
+    def wait(self, delay_s):
+        self.time_s += delay_s
+        return False
+
+    def is_set(self):
+        return False
+
+
+class Test_scheduler(unittest.TestCase):
+    """
+    TestCase class for the module `pysemimaginggui.scheduler`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.clock = FakeClock()
+        self.scheduler = FrameScheduler(0.1, clock=self.clock)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def testSkeleton(self):
+        """
+        First test to check if the testcase is working with the testing framework.
+        """
+
+        # self.fail("Test if the testcase is working.")
+        self.assertTrue(True)
+
+    def capture(self, capture_time_s):
+        self.assertTrue(self.scheduler.wait(self.clock))
+        timestamp = self.scheduler.mark()
+        self.clock.time_s += capture_time_s
+        return timestamp
+
+    def test_absolute_deadlines(self):
+        # A capture time shorter than the interval does not stretch the period.
+        timestamps = [self.capture(0.03) for _frame_id in range(10)]
+        for frame_id, timestamp in enumerate(timestamps):
+            self.assertAlmostEqual(100.0 + 0.1 * frame_id, timestamp)
+        self.assertEqual(0, self.scheduler.skipped_slots)
+        self.assertAlmostEqual(10.0, self.scheduler.frame_rate)
+        self.assertAlmostEqual(0.0, self.scheduler.jitter_s)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_skip_missed_slots(self):
+        self.capture(0.03)
+        self.capture(0.33)
+        # The slots 2 and 3 are missed, the capture of slot 4 starts at once, late.
+        self.assertAlmostEqual(0.43, self.capture(0.01) - 100.0)
+        self.assertEqual(4, self.scheduler.slot)
+        self.assertEqual(2, self.scheduler.skipped_slots)
+        self.assertAlmostEqual(0.03, self.scheduler.maximum_lateness_s)
+
+        # A capture late by less than one interval is kept, the next deadline is unchanged.
+        self.assertAlmostEqual(0.5, self.capture(0.15) - 100.0)
+        self.assertAlmostEqual(0.65, self.capture(0.01) - 100.0)
+        self.assertAlmostEqual(0.7, self.capture(0.01) - 100.0)
+        self.assertEqual(2, self.scheduler.skipped_slots)
+        self.assertAlmostEqual(0.05, self.scheduler.maximum_lateness_s)
+
+        # self.fail("Test if the testcase is working.")
+
+    def test_stop_event(self):
+        scheduler = FrameScheduler(10.0)
+        stop_event = threading.Event()
+        self.assertTrue(scheduler.wait(stop_event))
+        scheduler.mark()
+
+        threading.Timer(0.02, stop_event.set).start()
+        start_time = time.monotonic()
+        self.assertFalse(scheduler.wait(stop_event))
+        self.assertLess(time.monotonic() - start_time, 5.0)
+
+        # self.fail("Test if the testcase is working.")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+
+    nose.runmodule()